@@ -1,22 +1,34 @@
+import threading
+
 from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from authlib.integrations.flask_client import OAuth
 from config import get_config
 
 # Initialize extensions
-db = SQLAlchemy()
 login_manager = LoginManager()
 oauth = OAuth()
 
-def create_app(config_name=None):
+def _run_all(tasks):
+    for task in tasks:
+        task()
+
+def create_app(config_name=None, config_overrides=None):
     app = Flask(__name__)
 
-    # Load configuration
+    # Load configuration, then any explicit overrides (e.g. from benchmarks)
     app.config.from_object(get_config(config_name))
+    if config_overrides:
+        app.config.update(config_overrides)
+
+    # Take the client address from X-Forwarded-For when running behind trusted proxies
+    if app.config.get("PROXY_FIX_X_FOR"):
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config["PROXY_FIX_X_FOR"])
 
-    # Initialize database connection
-    db.init_app(app)
+    # Initialize the shared database engine and connection pool
+    from .database_setup import configure_engine
+    configure_engine(app.config)
 
     # Initialize OAuth
     oauth.init_app(app)
@@ -36,14 +48,124 @@ def create_app(config_name=None):
     app.register_blueprint(company_routes)
     app.register_blueprint(auth, url_prefix="/auth")  # All auth routes prefixed with /auth
 
+    # Oversized request bodies (MAX_CONTENT_LENGTH) get a JSON 413
+    from .routes import request_too_large
+    app.register_error_handler(413, request_too_large)
+
+    # Background portfolio analyses
+    from .jobs import portfolio_jobs
+    portfolio_jobs.configure(
+        max_workers=app.config.get("PORTFOLIO_JOB_WORKERS"),
+        ttl=app.config.get("PORTFOLIO_JOB_TTL"),
+    )
+
+    # Background description generation
+    from .descriptions import description_worker
+    description_worker.max_workers = app.config.get("DESCRIPTION_WORKERS", description_worker.max_workers)
+    from .utils import configure_llm_cache, set_openai_client, StubOpenAIClient
+    if app.config.get("OPENAI_STUB"):
+        set_openai_client(StubOpenAIClient())
+    configure_llm_cache(
+        app.config.get("LLM_CACHE_PATH"),
+        ttl=app.config.get("LLM_CACHE_TTL"),
+        max_entries=app.config.get("LLM_CACHE_MAX_ENTRIES"),
+    )
+
+    # Database warm-up, run in the background with FAST_START (the default) or during start-up
+    warmups = []
+
+    # Company search index (pg_trgm on PostgreSQL, FTS5 on SQLite)
+    if app.config.get("SEARCH_INDEX_AUTO_CREATE"):
+        def create_search_index():
+            from .database_setup import get_engine
+            from .search import ensure_search_index
+            try:
+                ensure_search_index(get_engine())
+            except Exception:
+                app.logger.exception("Could not create the company search index; using LIKE search.")
+        warmups.append(create_search_index)
+
+    # Precomputed company ranking
+    from .leaderboard import leaderboard
+    leaderboard.max_age = app.config.get("LEADERBOARD_MAX_AGE", leaderboard.max_age)
+
+    # Autocomplete index
+    from .typeahead import typeahead
+    typeahead.max_age = app.config.get("TYPEAHEAD_MAX_AGE", typeahead.max_age)
+
+    # Rendered company pages (invalidated when a description is written, see app.descriptions)
+    from .response_cache import company_page_cache, make_backend
+    company_page_cache.configure(
+        make_backend(
+            app.config.get("RESPONSE_CACHE_BACKEND", "memory"),
+            max_entries=app.config.get("RESPONSE_CACHE_MAX_ENTRIES"),
+            directory=app.config.get("RESPONSE_CACHE_DIR"),
+            url=app.config.get("RESPONSE_CACHE_REDIS_URL"),
+        ),
+        ttl=app.config.get("RESPONSE_CACHE_TTL") or None,
+    )
+
+    # Persisted data version, polled in the background: cached pages are keyed
+    # on it and the in-memory statistics are rebuilt when it changes
+    from .data_version import data_version
+    try:
+        data_version.start(app.config.get("DATA_VERSION_CHECK_INTERVAL"))
+    except Exception:
+        app.logger.exception("Could not read the data version; company pages are not cached.")
+
+    # Load the endpoint/midpoint reference tables into memory
+    if app.config.get("IMPACT_STORE_ENABLED"):
+        def load_impact_store():
+            from .impact_store import impact_store
+            try:
+                impact_store.ensure_loaded()
+            except Exception:
+                app.logger.exception("Could not load the impact store; falling back to database lookups.")
+        warmups.append(load_impact_store)
+
+    # Universe-wide percentiles for the company pages (reused from the impact store when loaded)
+    def build_peer_stats():
+        from .peer_stats import peer_stats
+        try:
+            peer_stats.ensure_built()
+        except Exception:
+            app.logger.exception("Could not build the peer statistics; they are built on first use.")
+    warmups.append(build_peer_stats)
+
+    # Nearest-neighbour index behind /company/<id>/similar and portfolio substitutes
+    def build_similarity_index():
+        from .similarity import similarity
+        try:
+            similarity.index()
+        except Exception:
+            app.logger.exception("Could not build the similarity index; it is built on first use.")
+    warmups.append(build_similarity_index)
+
+    if app.config.get("FAST_START"):
+        # Serve requests at once; until the warm-up finishes, lookups use the database and LIKE search
+        threading.Thread(target=_run_all, args=(warmups,), name="app-warmup", daemon=True).start()
+    else:
+        _run_all(warmups)
+
+    # Request latency, SQL and OpenAI metrics, served at /metrics
+    from .metrics import init_metrics
+    init_metrics(app)
+
+    # Per-route SQL statement budgets (N+1 guard)
+    from .query_budget import init_query_budgets
+    init_query_budgets(app)
+
+    # Close the request-scoped database session
+    from .repository import close_request_session
+    app.teardown_appcontext(close_request_session)
+
     # Define user loader for Flask-Login
-    from .database_setup import User, Session
+    from .user_cache import user_cache
+    user_cache.ttl = app.config.get("USER_CACHE_TTL", user_cache.ttl)
+    user_cache.max_entries = app.config.get("USER_CACHE_MAX_ENTRIES", user_cache.max_entries)
 
     @login_manager.user_loader
     def load_user(user_id):
-        session = Session()
-        user = session.query(User).get(int(user_id))
-        session.close()
-        return user
+        return user_cache.get(int(user_id))
 
     return app
@@ -3,7 +3,8 @@ from app import oauth  # Import the already initialized OAuth object
 from flask import render_template, flash, request
 from werkzeug.security import generate_password_hash, check_password_hash
 from app.database_setup import User, Session
-from flask_login import login_user, logout_user
+from app.user_cache import user_cache
+from flask_login import current_user, login_user, logout_user
 
 auth = Blueprint("auth", __name__)
 
@@ -57,6 +58,7 @@ def signup():
         new_user = User(username=username, email=email, password=password)
         session.add(new_user)
         session.commit()
+        user_cache.invalidate(new_user.id)
         session.close()
 
         flash('Signup successful! Please log in.', 'success')
@@ -67,6 +69,9 @@ def signup():
 
 @auth.route('/logout')
 def logout():
+    if current_user.is_authenticated:
+        user_cache.invalidate(int(current_user.get_id()))
     logout_user()
     flash('Logged out successfully.', 'success')
-    return redirect(url_for('auth.login'))
\ No newline at end of file
+    return redirect(url_for('auth.login'))
+
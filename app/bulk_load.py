@@ -0,0 +1,307 @@
+import csv
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import MetaData, Table, inspect, text
+
+from .database_setup import Base, HOT_PATH_INDEXES
+
+# Rows per chunk when streaming a table into the database.
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def iter_chunks(df, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Split an in-memory DataFrame into row chunks (views, no copies).
+
+    Args:
+        df (DataFrame): The data to split.
+        chunk_rows (int): Rows per chunk.
+
+    Yields:
+        DataFrame: Consecutive slices of `df`.
+    """
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _copy_chunk(conn, table_name, df):
+    """Write a chunk with PostgreSQL ``COPY ... FROM STDIN``."""
+    preparer = conn.dialect.identifier_preparer
+    columns = ", ".join(preparer.quote(str(column)) for column in df.columns)
+    statement = f"COPY {preparer.quote(table_name)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, quoting=csv.QUOTE_MINIMAL)
+    buffer.seek(0)
+
+    cursor = conn.connection.cursor()
+    try:
+        if hasattr(cursor, "copy_expert"):  # psycopg2
+            cursor.copy_expert(statement, buffer)
+        else:  # psycopg 3
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def _insert_chunk(conn, table, df):
+    """
+    Write a chunk with a single multi-row ``executemany`` insert.
+
+    Chunk columns are database column names; the insert parameters are keyed
+    by each column's `key`, which differs for declared midpoint columns
+    (e.g. ``water_use`` has the key ``"Water use"``).
+
+    Raises:
+        ValueError: If a chunk column is not a column of the table.
+    """
+    keys = {column.name: column.key for column in table.columns}
+    unknown = [str(name) for name in df.columns if name not in keys]
+    if unknown:
+        raise ValueError(f"Columns not in table '{table.name}': {', '.join(unknown)}")
+    df = df.rename(columns=keys)
+    records = df.astype(object).where(pd.notna(df), None).to_dict(orient="records")
+    conn.execute(table.insert(), records)
+
+
+def write_chunks(conn, table_name, chunks, table=None):
+    """
+    Stream DataFrame chunks into an existing table.
+
+    PostgreSQL targets use ``COPY FROM STDIN``; other databases fall back to
+    ``executemany`` inserts. Only one chunk is held in memory at a time.
+
+    Args:
+        conn (Connection): Open connection, inside a transaction.
+        table_name (str): Target table.
+        chunks (Iterable[DataFrame]): Rows to write.
+        table (Table): Table definition for the insert fallback; reflected
+            from the database when omitted.
+
+    Returns:
+        int: Number of rows written.
+    """
+    rows = 0
+    for chunk in chunks:
+        if chunk.empty:
+            continue
+        if conn.dialect.name == "postgresql":
+            _copy_chunk(conn, table_name, chunk)
+        else:
+            if table is None:
+                table = Table(table_name, MetaData(), autoload_with=conn)
+            _insert_chunk(conn, table, chunk)
+        rows += len(chunk)
+    return rows
+
+
+def conform_chunks(table, chunks):
+    """
+    Align chunk columns with a declared table: missing columns become NULL,
+    unknown columns are dropped.
+
+    Args:
+        table (Table): Declared table.
+        chunks (Iterable[DataFrame]): Source rows.
+
+    Yields:
+        DataFrame: Chunks with exactly the table's columns, in table order.
+    """
+    names = [column.name for column in table.columns]
+    for chunk in chunks:
+        yield chunk.reindex(columns=names)
+
+
+def ensure_declared_schema(engine, table_names):
+    """
+    Make sure the tables exist with their declared primary keys.
+
+    Tables created by older ``to_sql(if_exists="replace")`` migrations have no
+    primary key; they are dropped and recreated from the model (their rows are
+    about to be reloaded anyway).
+
+    Args:
+        engine (Engine): Target database.
+        table_names (Iterable[str]): Tables about to be loaded.
+    """
+    inspector = inspect(engine)
+    existing = set(inspector.get_table_names())
+    tables = [Base.metadata.tables[name] for name in table_names]
+    for table in tables:
+        declared = [column.name for column in table.primary_key.columns]
+        if table.name in existing and inspector.get_pk_constraint(table.name).get("constrained_columns") != declared:
+            print(f"Table '{table.name}' lacks its declared primary key; recreating it.")
+            table.drop(engine)
+    Base.metadata.create_all(engine, tables=tables)
+
+
+def bulk_load(engine, table_name, chunks):
+    """
+    Truncate a declared table and load the given rows, streaming them in chunks.
+
+    The table keeps its declared schema (primary key, types, indexes); rows
+    are removed and loaded with `write_chunks` in one transaction, so readers
+    see either the old or the new contents.
+
+    Args:
+        engine (Engine): Target database.
+        table_name (str): Target table, declared on `Base`.
+        chunks (Iterable[DataFrame]): Rows to load.
+
+    Returns:
+        dict: Table name, rows loaded, elapsed seconds and rows per second.
+    """
+    table = Base.metadata.tables[table_name]
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text(f"TRUNCATE TABLE {conn.dialect.identifier_preparer.quote(table_name)}"))
+        else:
+            conn.execute(table.delete())
+        rows = write_chunks(conn, table_name, conform_chunks(table, chunks), table)
+    elapsed = time.perf_counter() - start
+    return {
+        "table": table_name,
+        "rows": rows,
+        "seconds": elapsed,
+        "rows_per_second": rows / elapsed if elapsed else 0.0,
+    }
+
+
+def reset_sequences(engine, table_names):
+    """
+    Advance PostgreSQL serial sequences past the ids loaded explicitly.
+
+    Rows copied with their ids (e.g. `users`) leave the sequence behind, and
+    the next generated id would collide. Other databases need nothing.
+
+    Args:
+        engine (Engine): Target database.
+        table_names (Iterable[str]): Tables that were loaded.
+    """
+    if engine.dialect.name != "postgresql":
+        return
+    with engine.begin() as conn:
+        quote = conn.dialect.identifier_preparer.quote
+        for name in table_names:
+            column = Base.metadata.tables[name].autoincrement_column
+            if column is None:
+                continue
+            conn.execute(
+                text(
+                    "SELECT setval(pg_get_serial_sequence(:table, :column), "
+                    f"COALESCE((SELECT MAX({quote(column.name)}) FROM {quote(name)}), 1))"
+                ),
+                {"table": name, "column": column.name},
+            )
+
+
+def _index_names(conn, table_name):
+    """Names of the indexes on a table, including expression-based ones."""
+    if conn.dialect.name == "sqlite":
+        # The SQLite inspector skips expression indexes such as lower(name)
+        rows = conn.exec_driver_sql(f"PRAGMA index_list({conn.dialect.identifier_preparer.quote(table_name)})")
+        return {row[1] for row in rows}
+    return {index["name"] for index in inspect(conn).get_indexes(table_name)}
+
+
+def finalize_tables(engine, table_names):
+    """
+    Create the declared indexes, refresh planner statistics and verify the
+    hot-path indexes after a load.
+
+    Args:
+        engine (Engine): Target database.
+        table_names (Iterable[str]): Tables that were loaded.
+
+    Raises:
+        RuntimeError: If a hot-path index or primary key is missing.
+    """
+    table_names = list(table_names)
+    with engine.begin() as conn:
+        for name in table_names:
+            present = _index_names(conn, name)
+            for index in Base.metadata.tables[name].indexes:
+                if index.name not in present:
+                    index.create(conn)
+    with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            for name in table_names:
+                conn.execute(text(f"ANALYZE {conn.dialect.identifier_preparer.quote(name)}"))
+        else:
+            conn.execute(text("ANALYZE"))
+    verify_hot_path_indexes(engine, [name for name in table_names if name in HOT_PATH_INDEXES])
+
+
+def verify_hot_path_indexes(engine, table_names=None):
+    """
+    Check that the request hot paths are backed by indexes.
+
+    Args:
+        engine (Engine): Database to check.
+        table_names (Iterable[str]): Tables to check, defaults to all of `HOT_PATH_INDEXES`.
+
+    Raises:
+        RuntimeError: Listing every missing primary key or index.
+    """
+    missing = []
+    with engine.connect() as conn:
+        inspector = inspect(conn)
+        for name in table_names or HOT_PATH_INDEXES:
+            declared = [column.name for column in Base.metadata.tables[name].primary_key.columns]
+            if inspector.get_pk_constraint(name).get("constrained_columns") != declared:
+                missing.append(f"{name} primary key ({', '.join(declared)})")
+            present = _index_names(conn, name)
+            missing.extend(f"{name}.{index}" for index in HOT_PATH_INDEXES[name] if index not in present)
+    if missing:
+        raise RuntimeError(f"Hot-path indexes missing: {'; '.join(missing)}")
+
+
+def load_tables(engine, sources, max_workers=4):
+    """
+    Load independent tables in parallel.
+
+    SQLite allows a single writer, so SQLite targets are loaded one table at
+    a time.
+
+    Args:
+        engine (Engine): Target database.
+        sources (dict): Table name -> zero-argument callable returning an
+            iterable of DataFrame chunks. The callable runs in the worker, so
+            reading/parsing the source is parallelised too.
+        max_workers (int): Maximum number of tables loaded at once.
+
+    Returns:
+        list[dict]: One `bulk_load` report per table, in `sources` order.
+            Failed tables have an 'error' entry instead of throughput figures.
+    """
+    if engine.dialect.name == "sqlite":
+        max_workers = 1
+    ensure_declared_schema(engine, sources)
+
+    def run(table_name, source):
+        try:
+            return bulk_load(engine, table_name, source())
+        except Exception as e:
+            return {"table": table_name, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(sources)))) as pool:
+        futures = [pool.submit(run, table_name, source) for table_name, source in sources.items()]
+        return [future.result() for future in futures]
+
+
+def print_report(reports, target):
+    """Print per-table throughput of a `load_tables` run."""
+    for report in reports:
+        if "error" in report:
+            print(f"Error migrating '{report['table']}' table to {target}: {report['error']}")
+        else:
+            print(
+                f"Table '{report['table']}' migrated successfully to {target}: "
+                f"{report['rows']} rows in {report['seconds']:.2f}s "
+                f"({report['rows_per_second']:,.0f} rows/s)."
+            )
@@ -0,0 +1,82 @@
+import time
+
+import numpy as np
+
+from .functions import ENDPOINT_IMPACT_COLUMNS, endpoint_matrix
+from .scenarios import cell_limit, evaluate_scenarios, summarize_scenarios
+
+
+def _competition_rank(values, descending=False):
+    """
+    Rank values with competition ranking (ties share the best rank).
+
+    NaN values are not ranked and get None.
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    keys = -values if descending else values
+    ordered = np.sort(keys[valid])
+    ranks = np.searchsorted(ordered, keys, side="left") + 1
+    return [int(rank) if ok else None for rank, ok in zip(ranks, valid)]
+
+
+def compare_portfolios(portfolios):
+    """
+    Evaluate and rank many portfolios with a single endpoint lookup.
+
+    The instrumentids of all portfolios are resolved together, the holdings
+    are scattered into one portfolios x assets matrix, and every portfolio is
+    evaluated in the same vectorized pass as `app.scenarios`.
+
+    Args:
+        portfolios (dict): Portfolio name -> (instrumentids, allocations).
+
+    Returns:
+        dict: Per-portfolio summaries (totals, per-dimension damages, weighted
+        positive score, coverage, unmatched ids and ranks), the number of
+        distinct assets, elapsed seconds and portfolios per second.
+    """
+    start = time.perf_counter()
+    names = list(portfolios)
+    if not names:
+        raise ValueError("At least one portfolio is required.")
+
+    union = {}
+    columns = []
+    for name in names:
+        assets, allocations = portfolios[name]
+        if len(assets) != len(allocations):
+            raise ValueError(f"Portfolio '{name}' has {len(assets)} instrumentids and {len(allocations)} allocations.")
+        columns.append(np.fromiter((union.setdefault(asset, len(union)) for asset in assets), dtype=np.intp, count=len(assets)))
+    if len(names) * len(union) > cell_limit():
+        raise ValueError(f"Comparison matrix exceeds {cell_limit()} cells.")
+
+    matrix = np.zeros((len(names), len(union)))
+    for row, (name, positions) in enumerate(zip(names, columns)):
+        np.add.at(matrix[row], positions, np.asarray(portfolios[name][1], dtype=float))
+
+    assets = np.asarray(list(union), dtype=object)
+    endpoints, found = endpoint_matrix(assets)
+    evaluation = evaluate_scenarios(matrix, endpoints, found)
+
+    summaries = summarize_scenarios(evaluation, names)
+    score_ranks = _competition_rank(evaluation["positive_score"], descending=True)
+    damage_ranks = _competition_rank(evaluation["total_damage"])
+    dimension_ranks = [_competition_rank(evaluation["damages"][:, i]) for i in range(len(ENDPOINT_IMPACT_COLUMNS))]
+    for row, (summary, positions) in enumerate(zip(summaries, columns)):
+        summary["portfolio"] = summary.pop("scenario")
+        summary["holdings"] = len(positions)
+        summary["unmatched"] = list(dict.fromkeys(assets[positions][~found[positions]].tolist()))
+        summary["rank"] = score_ranks[row]
+        summary["damage_rank"] = damage_ranks[row]
+        summary["dimension_ranks"] = {
+            label: ranks[row] for label, ranks in zip(ENDPOINT_IMPACT_COLUMNS.values(), dimension_ranks)
+        }
+
+    elapsed = time.perf_counter() - start
+    return {
+        "portfolios": summaries,
+        "assets": len(union),
+        "seconds": elapsed,
+        "portfolios_per_second": len(names) / elapsed if elapsed else None,
+    }
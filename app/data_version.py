@@ -0,0 +1,129 @@
+import logging
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import SQLAlchemyError
+
+from .database_setup import DataVersion, get_engine
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two reads of the persisted data version.
+DEFAULT_CHECK_INTERVAL = 30
+
+
+def bump_data_version(engine):
+    """
+    Record that the data of a database changed.
+
+    Called by the migration and delta-sync scripts after loading data, so app
+    workers (and the caches they share) can tell their data is outdated.
+
+    Args:
+        engine (Engine): The database that was loaded.
+
+    Returns:
+        int: The new data version.
+    """
+    DataVersion.__table__.create(engine, checkfirst=True)
+    now = datetime.now(timezone.utc)
+    with engine.begin() as conn:
+        updated = conn.execute(
+            update(DataVersion).where(DataVersion.id == 1)
+            .values(version=DataVersion.version + 1, updated_at=now)
+        )
+        if updated.rowcount == 0:
+            conn.execute(DataVersion.__table__.insert().values(id=1, version=1, updated_at=now))
+        return conn.execute(select(DataVersion.version).where(DataVersion.id == 1)).scalar_one()
+
+
+def read_data_version(engine):
+    """
+    Read the persisted data version of a database.
+
+    Returns:
+        int: The version, 0 if the data was never stamped.
+    """
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(DataVersion.version).where(DataVersion.id == 1)).scalar() or 0
+    except SQLAlchemyError:
+        # The table does not exist before the first stamped load
+        return 0
+
+
+class DataVersionMonitor:
+    """
+    Process-local view of the persisted data version, refreshed by a
+    background thread so requests never query it.
+
+    `current` is None until the version has been read once. Subscribers are
+    called with the new version whenever it changes after that, so in-memory
+    copies of the data can be rebuilt.
+    """
+
+    def __init__(self, interval=DEFAULT_CHECK_INTERVAL):
+        self.interval = interval
+        self.current = None
+        self._thread = None
+        self._stop = threading.Event()
+        self._listeners = []
+
+    def subscribe(self, listener):
+        """
+        Register a callback invoked with the new version after every change.
+
+        Args:
+            listener (Callable[[int], None]): The callback.
+        """
+        self._listeners.append(listener)
+        return listener
+
+    def refresh(self, engine=None):
+        """Read the persisted version now and notify subscribers of a change; returns it."""
+        engine = engine or get_engine()
+        if engine is not None:
+            version = read_data_version(engine)
+            previous, self.current = self.current, version
+            if previous is not None and version != previous:
+                logger.info("Data version changed from %s to %s", previous, version)
+                self._notify(version)
+        return self.current
+
+    def _notify(self, version):
+        for listener in list(self._listeners):
+            try:
+                listener(version)
+            except Exception:
+                # One failing rebuild must not keep the others stale
+                logger.exception("Data version listener %r failed", listener)
+
+    def start(self, interval=None):
+        """Read the version and keep refreshing it every `interval` seconds."""
+        if interval is not None:
+            self.interval = interval
+        self.refresh()
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="data-version", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop the refresh thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Could not read the data version")
+
+
+# Shared monitor started by `create_app`.
+data_version = DataVersionMonitor()
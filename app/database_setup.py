@@ -1,8 +1,11 @@
-from sqlalchemy import create_engine, Column, String, Float, Integer, Boolean
+from sqlalchemy import create_engine, Column, String, Float, Integer, Boolean, DateTime, Index, func
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from flask_login import UserMixin
 import os
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -11,8 +14,137 @@ load_dotenv()
 # Database URL from .env file
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-# SQLAlchemy Engine and Base
-engine = create_engine(DATABASE_URL)
+
+class TimedQueuePool(QueuePool):
+    """
+    QueuePool that records how long callers wait for a connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._wait_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._wait_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+
+def build_engine(url, pool_size=5, max_overflow=10, pool_timeout=30, pool_recycle=1800,
+                 pool_pre_ping=True, statement_timeout_ms=None):
+    """
+    Create the application engine with explicit connection pool settings.
+
+    Args:
+        url (str): Database URL.
+        pool_size (int): Connections kept open in the pool.
+        max_overflow (int): Extra connections allowed above `pool_size`.
+        pool_timeout (int): Seconds to wait for a free connection.
+        pool_recycle (int): Seconds after which a connection is replaced.
+        pool_pre_ping (bool): Test connections before handing them out.
+        statement_timeout_ms (int): PostgreSQL statement timeout, None for no limit.
+
+    Returns:
+        Engine: The configured engine.
+    """
+    connect_args = {}
+    if statement_timeout_ms and url.startswith("postgresql"):
+        connect_args["options"] = f"-c statement_timeout={int(statement_timeout_ms)}"
+    if url.startswith("sqlite") and ":memory:" in url:
+        # In-memory SQLite cannot share connections through a queue pool
+        return create_engine(url, connect_args=connect_args)
+    return create_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=pool_timeout,
+        pool_recycle=pool_recycle,
+        pool_pre_ping=pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+
+def configure_engine(config):
+    """
+    Replace the shared engine with one built from the application config and
+    rebind `Session` to it.
+
+    Args:
+        config (Mapping): Flask app config.
+
+    Returns:
+        Engine: The new engine.
+    """
+    global engine
+    url = config.get("DATABASE_URL") or config.get("SQLALCHEMY_DATABASE_URI")
+    new_engine = build_engine(
+        url,
+        pool_size=config.get("DB_POOL_SIZE", 5),
+        max_overflow=config.get("DB_MAX_OVERFLOW", 10),
+        pool_timeout=config.get("DB_POOL_TIMEOUT", 30),
+        pool_recycle=config.get("DB_POOL_RECYCLE", 1800),
+        pool_pre_ping=config.get("DB_POOL_PRE_PING", True),
+        statement_timeout_ms=config.get("DB_STATEMENT_TIMEOUT_MS"),
+    )
+    old_engine, engine = engine, new_engine
+    Session.configure(bind=engine)
+    if old_engine is not None:
+        old_engine.dispose()
+    return engine
+
+
+def get_engine():
+    """Return the current shared engine."""
+    return engine
+
+
+def pool_status(bind=None):
+    """
+    Get live statistics of the connection pool.
+
+    Returns:
+        dict: Pool size, checked-out and overflow connections, and checkout
+        wait times (when the pool records them).
+    """
+    pool = (bind or engine).pool
+    status = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, TimedQueuePool):
+        status.update({
+            "checkouts": pool.checkouts,
+            "timeouts": pool.timeouts,
+            "wait_seconds_total": pool.wait_total,
+            "wait_seconds_max": pool.wait_max,
+            "wait_seconds_avg": pool.wait_total / pool.checkouts if pool.checkouts else 0.0,
+        })
+    return status
+
+
+# SQLAlchemy Engine and Base. `create_app` replaces the engine with one built
+# from the app config; scripts use this default built from DATABASE_URL.
+engine = build_engine(DATABASE_URL) if DATABASE_URL else None
 Base = declarative_base()
 Session = sessionmaker(bind=engine)
 
@@ -23,6 +155,9 @@ class Company(Base):
     name = Column(String, nullable=False)
     description = Column(String, nullable=True)
 
+# Case-insensitive name lookups (exact-match search)
+Index("ix_companies_lower_name", func.lower(Company.name))
+
 class Midpoint(Base):
     __tablename__ = "midpoints"
     instrumentid = Column(String, primary_key=True)
@@ -46,6 +181,18 @@ class Endpoint(Base):
     avg_score = Column(Float, nullable=True)
     positive_score = Column(Float, nullable=True)
 
+    __table_args__ = (
+        Index("ix_endpoints_positive_score", "positive_score"),  # Leaderboard ordering
+    )
+
+
+class DataVersion(Base):
+    """Single-row stamp bumped by every data load, shared by all app workers."""
+    __tablename__ = "data_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
 
 class User(Base, UserMixin):
     __tablename__ = 'users'
@@ -53,4 +200,13 @@ class User(Base, UserMixin):
     username = Column(String(50), nullable=False, unique=True)
     email = Column(String(100), nullable=False, unique=True)
     password = Column(String(255), nullable=False)  # Hashed password
-    active = Column(Boolean, default=True)
\ No newline at end of file
+    active = Column(Boolean, default=True)
+
+
+# Indexes the request hot paths rely on: table -> index names. Every table is
+# also expected to have its declared primary key on instrumentid.
+HOT_PATH_INDEXES = {
+    "companies": ("ix_companies_lower_name",),
+    "midpoints": (),
+    "endpoints": ("ix_endpoints_positive_score",),
+}
@@ -0,0 +1,173 @@
+import hashlib
+
+from sqlalchemy import inspect, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+
+from .bulk_load import DEFAULT_CHUNK_ROWS
+from .database_setup import Base
+
+# Tables synced by default. `users` is left out so production signups are
+# never overwritten by the local copy.
+DELTA_TABLES = ("companies", "midpoints", "endpoints")
+
+# Columns whose target value is kept on update. Descriptions are generated
+# on the target, so the local copy must not clobber them.
+PRESERVED_COLUMNS = {
+    "companies": ("description",),
+}
+
+# Dialect-specific INSERT constructs supporting ON CONFLICT.
+_UPSERT_INSERTS = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def _digest(values):
+    """Content hash of one row."""
+    return hashlib.blake2b(repr(values).encode(), digest_size=16).digest()
+
+
+def _iter_rows(conn, columns, chunk_rows):
+    """Stream rows of `columns`, one partition at a time."""
+    result = conn.execution_options(yield_per=chunk_rows).execute(select(*columns))
+    for partition in result.partitions():
+        yield partition
+
+
+def row_hashes(engine, table, keys, compared, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Hash every row of a table.
+
+    Args:
+        engine (Engine): Database to read.
+        table (Table): Declared table.
+        keys (list[Column]): Primary key columns.
+        compared (list[Column]): Columns included in the hash.
+        chunk_rows (int): Rows fetched per round trip.
+
+    Returns:
+        dict: Primary key tuple -> row hash.
+    """
+    hashes = {}
+    width = len(keys)
+    with engine.connect() as conn:
+        for rows in _iter_rows(conn, keys + compared, chunk_rows):
+            for row in rows:
+                hashes[tuple(row[:width])] = _digest(tuple(row[width:]))
+    return hashes
+
+
+def _upsert(conn, table, keys, preserve, rows):
+    """Insert rows, updating all but the preserved columns on key conflicts."""
+    insert = _UPSERT_INSERTS.get(conn.dialect.name)
+    if insert is None:
+        raise ValueError(f"Delta sync does not support the '{conn.dialect.name}' dialect.")
+    statement = insert(table)
+    updated = [column for column in table.columns if column not in keys and column.name not in preserve]
+    if updated:
+        statement = statement.on_conflict_do_update(
+            index_elements=keys,
+            set_={column: statement.excluded[column.key] for column in updated},
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=keys)
+    conn.execute(statement, rows)
+
+
+def _delete(conn, table, keys, stale, chunk_rows):
+    """Delete rows by primary key, in chunks."""
+    for start in range(0, len(stale), chunk_rows):
+        chunk = stale[start:start + chunk_rows]
+        if len(keys) == 1:
+            condition = keys[0].in_([key[0] for key in chunk])
+        else:
+            condition = tuple_(*keys).in_(chunk)
+        conn.execute(table.delete().where(condition))
+
+
+def sync_table(source, target, table_name, preserve=None, delete_missing=False, dry_run=False,
+               chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Bring one table of `target` in line with `source`, touching only changed rows.
+
+    Rows are matched on the primary key and compared with a content hash of
+    every non-preserved column. New and changed rows are upserted with
+    ``INSERT ... ON CONFLICT``; preserved columns are only written for new rows.
+
+    Args:
+        source (Engine): Database holding the reference data.
+        target (Engine): Database to update.
+        table_name (str): Table declared on `Base`.
+        preserve (Iterable[str]): Columns whose target value is kept, defaults
+            to `PRESERVED_COLUMNS` for the table.
+        delete_missing (bool): Delete target rows absent from the source.
+        dry_run (bool): Only compute the summary, write nothing (the target
+            table need not exist).
+        chunk_rows (int): Rows read and written per batch.
+
+    Returns:
+        dict: Table name and counts of inserts, updates, unchanged rows and
+            deletes (rows absent from the source, deleted only with `delete_missing`).
+    """
+    table = Base.metadata.tables[table_name]
+    if preserve is None:
+        preserve = PRESERVED_COLUMNS.get(table_name, ())
+    preserve = set(preserve)
+    keys = list(table.primary_key.columns)
+    compared = [column for column in table.columns if column not in keys and column.name not in preserve]
+    kept = [column for column in table.columns if column.name in preserve]
+    columns = keys + compared + kept
+    width, hashed = len(keys), len(keys) + len(compared)
+
+    # A dry run may target a database where the table was never created: every row is new
+    exists = inspect(target).has_table(table.name)
+    target_hashes = row_hashes(target, table, keys, compared, chunk_rows) if exists else {}
+    summary = {"table": table_name, "inserts": 0, "updates": 0, "unchanged": 0, "deletes": 0}
+    seen = set()
+
+    with source.connect() as source_conn, target.begin() as target_conn:
+        for rows in _iter_rows(source_conn, columns, chunk_rows):
+            changed = []
+            for row in rows:
+                key = tuple(row[:width])
+                seen.add(key)
+                existing = target_hashes.get(key)
+                if existing is None:
+                    summary["inserts"] += 1
+                elif existing != _digest(tuple(row[width:hashed])):
+                    summary["updates"] += 1
+                else:
+                    summary["unchanged"] += 1
+                    continue
+                changed.append({column.key: value for column, value in zip(columns, row)})
+            if changed and not dry_run:
+                _upsert(target_conn, table, keys, preserve, changed)
+
+        stale = [key for key in target_hashes if key not in seen]
+        summary["deletes"] = len(stale)
+        if stale and delete_missing and not dry_run:
+            _delete(target_conn, table, keys, stale, chunk_rows)
+    return summary
+
+
+def sync_tables(source, target, tables=DELTA_TABLES, **options):
+    """
+    Delta-sync several tables, see `sync_table`.
+
+    Returns:
+        list[dict]: One summary per table, in `tables` order.
+    """
+    return [sync_table(source, target, table_name, **options) for table_name in tables]
+
+
+def print_summary(summaries, target, dry_run=False, delete_missing=False):
+    """Print the per-table outcome of a `sync_tables` run."""
+    prefix = "[dry run] " if dry_run else ""
+    for summary in summaries:
+        deletes = f"{summary['deletes']} deleted" if delete_missing else f"{summary['deletes']} only on target (kept)"
+        print(
+            f"{prefix}Table '{summary['table']}' synced to {target}: "
+            f"{summary['inserts']} inserted, {summary['updates']} updated, "
+            f"{summary['unchanged']} unchanged, {deletes}."
+        )
@@ -0,0 +1,116 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import func, or_, update
+
+from .database_setup import Session, Company
+from .response_cache import company_page_cache
+from .utils import generate_company_description
+
+logger = logging.getLogger(__name__)
+
+# Shown on the company page while the description is being generated.
+DESCRIPTION_PLACEHOLDER = "A description of this company is being generated. Please check back in a moment."
+
+# Older versions stored OpenAI failures as the description; treat them as missing.
+LEGACY_ERROR_PREFIX = "An error occurred:"
+
+
+def is_missing_description(description):
+    """Whether a stored description is empty or a persisted error message."""
+    return not description or not description.strip() or description.startswith(LEGACY_ERROR_PREFIX)
+
+
+class DescriptionWorker:
+    """
+    Generates missing company descriptions in the background.
+
+    Requests for the same instrumentid are collapsed into a single in-flight
+    generation (single-flight): every caller gets the same future, and the
+    result is committed once.
+    """
+
+    def __init__(self, generate=generate_company_description, max_workers=2):
+        self.generate = generate
+        self.max_workers = max_workers
+        self._in_flight = {}
+        self._lock = threading.RLock()
+        self._executor = None
+        self._listeners = []
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="description")
+        return self._executor
+
+    def request(self, instrumentid, company_name):
+        """
+        Make sure a description is being generated for a company.
+
+        Args:
+            instrumentid (str): The instrumentid of the company.
+            company_name (str): Company name used in the prompt.
+
+        Returns:
+            Future: Resolves to the stored description, or None if nothing was stored.
+        """
+        with self._lock:
+            future = self._in_flight.get(instrumentid)
+            if future is None:
+                future = self._pool().submit(self._generate_and_store, instrumentid, company_name)
+                self._in_flight[instrumentid] = future
+                future.add_done_callback(lambda _: self._done(instrumentid))
+            return future
+
+    def pending(self, instrumentid):
+        """Whether a generation for this instrumentid is currently in flight."""
+        return instrumentid in self._in_flight
+
+    def subscribe(self, listener):
+        """
+        Register a callback invoked with the instrumentid after a description is stored.
+        """
+        self._listeners.append(listener)
+        return listener
+
+    def _done(self, instrumentid):
+        with self._lock:
+            self._in_flight.pop(instrumentid, None)
+
+    def _generate_and_store(self, instrumentid, company_name):
+        description = self.generate(company_name)
+        if not description:
+            return None
+
+        session = Session()
+        try:
+            # Only fill an empty description, so concurrent workers in other
+            # processes cannot overwrite each other.
+            result = session.execute(
+                update(Company)
+                .where(Company.instrumentid == instrumentid)
+                .where(or_(
+                    Company.description.is_(None),
+                    func.trim(Company.description) == "",
+                    Company.description.startswith(LEGACY_ERROR_PREFIX, autoescape=True),
+                ))
+                .values(description=description)
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            logger.exception("Could not store the description of %s", instrumentid)
+            return None
+        finally:
+            session.close()
+
+        if result.rowcount:
+            for listener in self._listeners:
+                listener(instrumentid)
+        return description
+
+
+# Shared worker used by the company pages; their cached copies are dropped once a description is written.
+description_worker = DescriptionWorker()
+description_worker.subscribe(company_page_cache.invalidate_company)
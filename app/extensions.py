@@ -1,4 +0,0 @@
-from flask_sqlalchemy import SQLAlchemy
-
-# Initialize extensions
-db = SQLAlchemy()
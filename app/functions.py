@@ -1,7 +1,61 @@
-from sqlalchemy.orm import sessionmaker
-from .database_setup import engine, Company, Midpoint, Endpoint
+from sqlalchemy import select
+from .database_setup import Midpoint, Endpoint
+from .impact_store import impact_store, ENDPOINT_COLUMNS, MIDPOINT_COLUMNS
+from .repository import session_scope
+import numpy as np
+import logging
+
+# pandas is imported by the portfolio functions that use it, which keeps it
+# out of application start-up.
+
+logger = logging.getLogger(__name__)
+
+# Midpoint attribute name -> display label, in radar chart order.
+MIDPOINT_LABELS = {
+    "water_use": "Water use",
+    "climate_change": "Climate change",
+    "land_use_transformation": "Land Use Transformation",
+    "terrestrial_ecotoxicity": "Terrestrial ecotoxicity",
+    "tropical_ozone_formation": "Trop. Ozone Formation (eco)",
+    "freshwater_ecotoxicity": "Freshwater ecotoxicity",
+    "terrestrial_acidification": "Terrestrial acidification",
+    "marine_ecotoxicity": "Marine ecotoxicity",
+    "freshwater_eutrophication": "Freshwater eutrophication",
+    "marine_eutrophication": "Marine eutrophication",
+}
+
+def asset_impact(endpoint, perc):
+    """
+    Build the endpoint impact dictionary of an asset.
+
+    Args:
+        endpoint (Mapping): Endpoint values by attribute name (a store row,
+            a Core row mapping, ...).
+        perc (float): Percentage allocation of the asset.
+
+    Returns:
+        dict: Dictionary of endpoint impacts.
+    """
+    return {
+        "Damage to marine species": endpoint["damage_to_marine_species"] * perc,
+        "Damage to freshwater species": endpoint["damage_to_freshwater_species"] * perc,
+        "Damage to terrestrial species": endpoint["damage_to_terrestrial_species"] * perc,
+        "positive_score": endpoint["positive_score"]
+    }
+
+
+def asset_midpoint(midpoint):
+    """
+    Build the midpoint dictionary of an asset, keyed by display label.
+
+    Args:
+        midpoint (Mapping): Midpoint values by attribute name.
+
+    Returns:
+        dict: Midpoints in radar chart order.
+    """
+    return {label: midpoint[name] for name, label in MIDPOINT_LABELS.items()}
 
-Session = sessionmaker(bind=engine)
 
 def compute_asset_impact(asset, perc):
     """
@@ -14,19 +68,17 @@ def compute_asset_impact(asset, perc):
     Returns:
         dict: Dictionary of endpoint impacts.
     """
-    session = Session()
-    try:
-        endpoint = session.query(Endpoint).filter_by(instrumentid=asset).first()
-        if not endpoint:
-            raise ValueError(f"Endpoints for asset {asset} not found.")
-        return {
-            "Damage to marine species": endpoint.damage_to_marine_species * perc,
-            "Damage to freshwater species": endpoint.damage_to_freshwater_species * perc,
-            "Damage to terrestrial species": endpoint.damage_to_terrestrial_species * perc,
-            "positive_score": endpoint.positive_score
-        }
-    finally:
-        session.close()
+    if impact_store.loaded:
+        endpoint = impact_store.endpoints.row(asset)
+    else:
+        with session_scope() as session:
+            endpoint = session.execute(
+                select(*(getattr(Endpoint, name).label(name) for name in ENDPOINT_COLUMNS))
+                .where(Endpoint.instrumentid == asset)
+            ).mappings().first()
+    if endpoint is None:
+        raise ValueError(f"Endpoints for asset {asset} not found.")
+    return asset_impact(endpoint, perc)
 
 def compute_asset_midpoint(asset):
     """
@@ -38,57 +90,182 @@ def compute_asset_midpoint(asset):
     Returns:
         dict: Midpoints for the specified asset.
     """
-    session = Session()
-    try:
-        midpoint = session.query(Midpoint).filter_by(instrumentid=asset).first()
-        if not midpoint:
-            raise ValueError(f"Midpoints for asset {asset} not found.")
-        return {
-            "Water use": midpoint.water_use,
-            "Climate change": midpoint.climate_change,
-            "Land Use Transformation": midpoint.land_use_transformation,
-            "Terrestrial ecotoxicity": midpoint.terrestrial_ecotoxicity,
-            "Trop. Ozone Formation (eco)": midpoint.tropical_ozone_formation,
-            "Freshwater ecotoxicity": midpoint.freshwater_ecotoxicity,
-            "Terrestrial acidification": midpoint.terrestrial_acidification,
-            "Marine ecotoxicity": midpoint.marine_ecotoxicity,
-            "Freshwater eutrophication": midpoint.freshwater_eutrophication,
-            "Marine eutrophication": midpoint.marine_eutrophication,
-        }
-    finally:
-        session.close()
-
-def compute_portfolio_impact(portfolio, column="allocation"):
+    if impact_store.loaded:
+        midpoint = impact_store.midpoints.row(asset)
+    else:
+        with session_scope() as session:
+            midpoint = session.execute(
+                select(*(getattr(Midpoint, name).label(name) for name in MIDPOINT_COLUMNS))
+                .where(Midpoint.instrumentid == asset)
+            ).mappings().first()
+    if midpoint is None:
+        raise ValueError(f"Midpoints for asset {asset} not found.")
+    return asset_midpoint(midpoint)
+
+# Maximum number of instrumentids sent in a single ``IN (...)`` clause. Keeps
+# the statement well below driver/database parameter limits on large portfolios.
+LOOKUP_CHUNK_SIZE = 500
+
+ENDPOINT_IMPACT_COLUMNS = {
+    "damage_to_marine_species": "Damage to marine species",
+    "damage_to_freshwater_species": "Damage to freshwater species",
+    "damage_to_terrestrial_species": "Damage to terrestrial species",
+}
+
+
+def fetch_endpoints(session, assets, chunk_size=LOOKUP_CHUNK_SIZE):
+    """
+    Fetch the endpoint rows of many assets with chunked ``IN`` queries.
+
+    Args:
+        session (Session): Open SQLAlchemy session.
+        assets (Iterable[str]): Asset identifiers (instrumentid), duplicates allowed.
+        chunk_size (int): Maximum number of identifiers per query.
+
+    Returns:
+        DataFrame: One row per matched instrumentid with the endpoint damage columns.
+    """
+    import pandas as pd
+
+    unique_assets = list(dict.fromkeys(assets))
+    columns = [Endpoint.instrumentid] + [getattr(Endpoint, name) for name in ENDPOINT_IMPACT_COLUMNS]
+    rows = []
+    for start in range(0, len(unique_assets), chunk_size):
+        chunk = unique_assets[start:start + chunk_size]
+        rows.extend(session.query(*columns).filter(Endpoint.instrumentid.in_(chunk)).all())
+    return pd.DataFrame(rows, columns=["instrumentid", *ENDPOINT_IMPACT_COLUMNS])
+
+
+def lookup_endpoints(assets):
+    """
+    Resolve the endpoint rows of many assets from the in-memory impact store.
+
+    Args:
+        assets (Iterable[str]): Asset identifiers (instrumentid), duplicates allowed.
+
+    Returns:
+        DataFrame: Same shape as `fetch_endpoints`.
+    """
+    import pandas as pd
+
+    table = impact_store.endpoints
+    unique_assets = list(dict.fromkeys(assets))
+    rows, found = table.take(unique_assets)
+    rows = rows[found]
+    frame = pd.DataFrame({"instrumentid": table.ids[rows]})
+    for name in ENDPOINT_IMPACT_COLUMNS:
+        frame[name] = table.column(name)[rows]
+    return frame
+
+
+def endpoint_matrix(assets, chunk_size=LOOKUP_CHUNK_SIZE):
+    """
+    Resolve many assets to a dense endpoint matrix in one lookup.
+
+    The impact store is used when it is loaded; otherwise all rows are read
+    with chunked ``IN`` queries.
+
+    Args:
+        assets (Sequence[str]): Asset identifiers (instrumentid), one per matrix row.
+        chunk_size (int): Maximum number of identifiers per query.
+
+    Returns:
+        tuple[ndarray, ndarray]: Float matrix of shape (len(assets), len(ENDPOINT_COLUMNS))
+        with NaN rows for unknown assets, and the boolean found mask.
+    """
+    assets = list(assets)
+    values = np.full((len(assets), len(ENDPOINT_COLUMNS)), np.nan)
+    if impact_store.loaded:
+        table = impact_store.endpoints
+        rows, found = table.take(assets)
+        values[found] = table.values[rows[found]]
+        return values, found
+
+    position = {}
+    for i, asset in enumerate(assets):
+        position.setdefault(asset, []).append(i)
+    columns = [Endpoint.instrumentid] + [getattr(Endpoint, name) for name in ENDPOINT_COLUMNS]
+    found = np.zeros(len(assets), dtype=bool)
+    unique_assets = list(position)
+    with session_scope() as session:
+        for start in range(0, len(unique_assets), chunk_size):
+            chunk = unique_assets[start:start + chunk_size]
+            for row in session.execute(select(*columns).where(Endpoint.instrumentid.in_(chunk))):
+                rows = position[row[0]]
+                values[rows] = [np.nan if value is None else value for value in row[1:]]
+                found[rows] = True
+    return values, found
+
+
+def match_portfolio_endpoints(portfolio, endpoints, column="allocation"):
+    """
+    Join a portfolio to its endpoint rows and compute the weighted damages.
+
+    Args:
+        portfolio (DataFrame): Portfolio with 'instrumentid' and allocation column.
+        endpoints (DataFrame): Endpoint rows as returned by `fetch_endpoints`.
+        column (str): The column containing the allocation percentages.
+
+    Returns:
+        tuple[DataFrame, list[str]]: Matched holdings (in portfolio order) with their
+        impacts, and the instrumentids that have no endpoint data.
+    """
+    import pandas as pd
+
+    holdings = pd.DataFrame({
+        "instrumentid": portfolio["instrumentid"].to_numpy(),
+        "name": portfolio["name"].to_numpy() if "name" in portfolio.columns else "Unknown",
+        "allocation": portfolio[column].to_numpy(),
+    })
+    merged = holdings.merge(endpoints, on="instrumentid", how="left", indicator=True)
+    found = (merged.pop("_merge") == "both").to_numpy()
+
+    unmatched = list(dict.fromkeys(merged.loc[~found, "instrumentid"]))
+    merged = merged.loc[found].reset_index(drop=True)
+
+    allocation = merged["allocation"].to_numpy(dtype=float)
+    for source, label in ENDPOINT_IMPACT_COLUMNS.items():
+        merged[label] = merged.pop(source).to_numpy(dtype=float) * allocation
+    return merged, unmatched
+
+
+def compute_portfolio_impact(portfolio, column="allocation", report_unmatched=False):
     """
     Calculate the total impact of a portfolio.
 
+    All endpoint rows are looked up in the impact store when it is loaded, or
+    in a handful of chunked ``IN`` queries otherwise, and the weighted damages
+    are computed as column operations. Missing (NULL) damages are returned as
+    None.
+
     Args:
         portfolio (DataFrame): Portfolio as a DataFrame with 'instrumentid' and allocation column.
         column (str): The column containing the allocation percentages.
+        report_unmatched (bool): Also return the instrumentids without endpoint data.
 
     Returns:
-        list[dict]: List of assets with their respective impacts.
-    """
-    session = Session()
-    results = []
-    try:
-        for _, row in portfolio.iterrows():
-            asset = row['instrumentid']
-            perc = row[column]
-            endpoint = session.query(Endpoint).filter_by(instrumentid=asset).first()
-            if not endpoint:
-                continue
-            impacts = {
-                "Damage to marine species": endpoint.damage_to_marine_species * perc,
-                "Damage to freshwater species": endpoint.damage_to_freshwater_species * perc,
-                "Damage to terrestrial species": endpoint.damage_to_terrestrial_species * perc,
-            }
-            results.append({
-                "instrumentid": asset,
-                "name": row.get("name", "Unknown"),
-                "allocation": perc,
-                **impacts,
-            })
-        return results
-    finally:
-        session.close()
+        list[dict]: List of assets with their respective impacts. When
+        `report_unmatched` is set, a tuple of that list and the unmatched instrumentids.
+    """
+    if impact_store.loaded:
+        endpoints = lookup_endpoints(portfolio["instrumentid"])
+    else:
+        with session_scope() as session:
+            endpoints = fetch_endpoints(session, portfolio["instrumentid"])
+
+    matched, unmatched = match_portfolio_endpoints(portfolio, endpoints, column)
+    if unmatched:
+        logger.warning(
+            "No endpoint data for %d instrumentid(s) in portfolio: %s",
+            len(unmatched), ", ".join(map(str, unmatched[:20])),
+        )
+
+    # NaN is not valid JSON; missing damages become None
+    for label in ENDPOINT_IMPACT_COLUMNS.values():
+        missing = matched[label].isna()
+        if missing.any():
+            matched[label] = matched[label].astype(object).where(~missing, None)
+    results = matched.to_dict(orient="records")
+    if report_unmatched:
+        return results, unmatched
+    return results
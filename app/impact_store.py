@@ -0,0 +1,190 @@
+import logging
+import threading
+
+import numpy as np
+
+from .data_version import data_version
+from .database_setup import Session, Midpoint, Endpoint
+
+logger = logging.getLogger(__name__)
+
+# Column order of the in-memory matrices (ORM attribute names).
+ENDPOINT_COLUMNS = (
+    "damage_to_marine_species",
+    "damage_to_freshwater_species",
+    "damage_to_terrestrial_species",
+    "avg_score",
+    "positive_score",
+)
+MIDPOINT_COLUMNS = (
+    "water_use",
+    "climate_change",
+    "land_use_transformation",
+    "terrestrial_ecotoxicity",
+    "tropical_ozone_formation",
+    "freshwater_ecotoxicity",
+    "terrestrial_acidification",
+    "marine_ecotoxicity",
+    "freshwater_eutrophication",
+    "marine_eutrophication",
+)
+
+
+class ImpactTable:
+    """
+    Read-only columnar copy of a reference table.
+
+    Attributes:
+        ids (ndarray): Instrumentids, one per row.
+        values (ndarray): C-contiguous float64 matrix of shape (rows, columns).
+        columns (tuple[str]): Column names of `values`.
+        index (dict): Mapping of instrumentid to row number.
+    """
+
+    def __init__(self, ids, values, columns):
+        self.ids = np.asarray(ids, dtype=object)
+        self.values = np.ascontiguousarray(values, dtype=np.float64).reshape(len(self.ids), len(columns))
+        self.values.setflags(write=False)
+        self.columns = tuple(columns)
+        self.index = {asset: row for row, asset in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def column(self, name):
+        """Return a read-only view of a single column."""
+        return self.values[:, self.columns.index(name)]
+
+    def row(self, asset):
+        """
+        Get the values of one asset.
+
+        Args:
+            asset (str): Asset identifier (instrumentid).
+
+        Returns:
+            dict | None: Column name to value (None for missing values), or None if the asset is unknown.
+        """
+        position = self.index.get(asset)
+        if position is None:
+            return None
+        return {
+            name: (None if np.isnan(value) else float(value))
+            for name, value in zip(self.columns, self.values[position])
+        }
+
+    def take(self, assets):
+        """
+        Resolve many assets to row numbers.
+
+        Args:
+            assets (Iterable[str]): Asset identifiers, duplicates allowed.
+
+        Returns:
+            tuple[ndarray, ndarray]: Row numbers (-1 where unknown) and a boolean found mask.
+        """
+        rows = np.fromiter((self.index.get(asset, -1) for asset in assets), dtype=np.intp)
+        return rows, rows >= 0
+
+
+class ImpactStore:
+    """
+    In-process store of the `endpoints` and `midpoints` tables.
+
+    Both tables are small, read-mostly reference data, so they are loaded once
+    into float64 matrices and served without touching the database. A reload
+    builds new tables and swaps them in atomically, so readers never see a
+    partially loaded store.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tables = None
+        self._listeners = []
+        self.version = 0
+
+    @property
+    def loaded(self):
+        return self._tables is not None
+
+    @property
+    def endpoints(self):
+        return self._require()[0]
+
+    @property
+    def midpoints(self):
+        return self._require()[1]
+
+    def _require(self):
+        tables = self._tables
+        if tables is None:
+            raise RuntimeError("The impact store has not been loaded.")
+        return tables
+
+    def load(self):
+        """
+        (Re)load both tables from the database and notify subscribers.
+
+        Returns:
+            ImpactStore: The store itself.
+        """
+        with self._lock:
+            session = Session()
+            try:
+                endpoints = self._read(session, Endpoint, ENDPOINT_COLUMNS)
+                midpoints = self._read(session, Midpoint, MIDPOINT_COLUMNS)
+            finally:
+                session.close()
+            self._tables = (endpoints, midpoints)
+            self.version += 1
+            listeners = list(self._listeners)
+
+        logger.info(
+            "Impact store v%d loaded: %d endpoints, %d midpoints",
+            self.version, len(endpoints), len(midpoints),
+        )
+        for listener in listeners:
+            listener(self)
+        return self
+
+    reload = load
+
+    def refresh(self, *_):
+        """Reload after a data change, if the store is in use."""
+        if self.loaded:
+            self.load()
+
+    def ensure_loaded(self):
+        """Load the store on first use."""
+        if not self.loaded:
+            self.load()
+        return self
+
+    def clear(self):
+        """Drop the in-memory tables; lookups fall back to the database."""
+        with self._lock:
+            self._tables = None
+            self.version += 1
+
+    def subscribe(self, listener):
+        """
+        Register a callback invoked with the store after every (re)load.
+
+        Args:
+            listener (Callable[[ImpactStore], None]): The callback.
+        """
+        self._listeners.append(listener)
+        return listener
+
+    @staticmethod
+    def _read(session, model, columns):
+        rows = session.query(model.instrumentid, *(getattr(model, name) for name in columns)).all()
+        ids = [row[0] for row in rows]
+        values = np.array([row[1:] for row in rows], dtype=np.float64)
+        return ImpactTable(ids, values, columns)
+
+
+# Shared instance used by the compute functions and routes, reloaded when the
+# persisted data version changes (e.g. after a migration or delta sync).
+impact_store = ImpactStore()
+data_version.subscribe(impact_store.refresh)
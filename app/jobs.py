@@ -0,0 +1,114 @@
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class JobManager:
+    """
+    Minimal in-process job queue backed by a thread pool.
+
+    Jobs are plain callables that receive a `progress` callback as keyword
+    argument. Finished jobs are kept for `ttl` seconds so clients can poll for
+    the result, then evicted. No external broker is needed; job state lives in
+    the worker process that accepted the submission.
+    """
+
+    def __init__(self, max_workers=2, ttl=3600, max_jobs=1000):
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def configure(self, max_workers=None, ttl=None, max_jobs=None):
+        """Update the pool settings; takes effect before the first submission."""
+        if max_workers is not None:
+            self.max_workers = max_workers
+        if ttl is not None:
+            self.ttl = ttl
+        if max_jobs is not None:
+            self.max_jobs = max_jobs
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="portfolio-job")
+        return self._executor
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queue a job.
+
+        Args:
+            fn (Callable): Work to run; called as ``fn(*args, progress=..., **kwargs)``.
+
+        Returns:
+            str: The job id.
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "progress": {},
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+        }
+        with self._lock:
+            self._evict()
+            if len(self._jobs) >= self.max_jobs:
+                raise RuntimeError("Too many pending portfolio jobs, try again later.")
+            self._jobs[job_id] = job
+        self._pool().submit(self._run, job, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job, fn, args, kwargs):
+        job["status"] = "running"
+        job["started_at"] = time.time()
+
+        def progress(**values):
+            job["progress"] = {**job["progress"], **values}
+
+        try:
+            job["result"] = fn(*args, progress=progress, **kwargs)
+            job["status"] = "finished"
+        except Exception as e:
+            logger.exception("Portfolio job %s failed", job["id"])
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+
+    def get(self, job_id):
+        """
+        Get a snapshot of a job.
+
+        Args:
+            job_id (str): The job id returned by `submit`.
+
+        Returns:
+            dict | None: Job state, or None if it is unknown or has expired.
+        """
+        with self._lock:
+            self._evict()
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def _evict(self):
+        """Drop finished jobs older than the TTL. Caller holds the lock."""
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# Shared queue for portfolio analyses.
+portfolio_jobs = JobManager()
@@ -0,0 +1,127 @@
+import threading
+import time
+
+import numpy as np
+
+from .data_version import data_version
+from .database_setup import Session, Company, Endpoint
+from .impact_store import impact_store
+
+
+class Ranking:
+    """
+    Companies sorted once by `positive_score`, best first.
+
+    Companies without a score are left out. Ranks use competition ranking
+    (ties share the best rank) and percentiles give the share of ranked
+    companies with a strictly lower score.
+    """
+
+    def __init__(self, rows):
+        rows = [row for row in rows if row[1] is not None and not np.isnan(row[1])]
+        scores = np.array([row[1] for row in rows], dtype=np.float64)
+        order = np.argsort(-scores, kind="stable")
+        self.ids = [rows[i][0] for i in order]
+        self.names = [rows[i][2] for i in order]
+        self.scores = scores[order]
+        self._ascending = self.scores[::-1].copy()
+        self._position = {instrumentid: i for i, instrumentid in enumerate(self.ids)}
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _item(self, i):
+        return {
+            "rank": self._rank(self.scores[i]),
+            "instrumentid": self.ids[i],
+            "name": self.names[i],
+            "score": float(self.scores[i]) * 100,
+        }
+
+    def _rank(self, score):
+        return len(self) - int(np.searchsorted(self._ascending, score, side="right")) + 1
+
+    def top(self, n=5):
+        """Best `n` companies."""
+        return [self._item(i) for i in range(min(n, len(self)))]
+
+    def bottom(self, n=5):
+        """Worst `n` companies, worst first."""
+        return [self._item(i) for i in range(len(self) - 1, max(len(self) - n, 0) - 1, -1)]
+
+    def page(self, page=1, per_page=50):
+        """
+        Get one page of the ranking.
+
+        Args:
+            page (int): 1-based page number.
+            per_page (int): Companies per page.
+
+        Returns:
+            list[dict]: Ranked companies on that page.
+        """
+        start = (page - 1) * per_page
+        return [self._item(i) for i in range(start, min(start + per_page, len(self)))]
+
+    def rank_of(self, instrumentid):
+        """
+        Get the rank and percentile of one company.
+
+        Returns:
+            dict | None: Rank, percentile and score, or None if the company is not ranked.
+        """
+        i = self._position.get(instrumentid)
+        if i is None:
+            return None
+        score = self.scores[i]
+        below = int(np.searchsorted(self._ascending, score, side="left"))
+        return {
+            "instrumentid": instrumentid,
+            "name": self.names[i],
+            "score": float(score) * 100,
+            "rank": self._rank(score),
+            "total": len(self),
+            "percentile": 100.0 * below / (len(self) - 1) if len(self) > 1 else 100.0,
+        }
+
+
+class Leaderboard:
+    """
+    Lazily built `Ranking`, refreshed after the impact store reloads or the
+    persisted data version changes, or once it is older than `max_age` seconds.
+    """
+
+    def __init__(self, max_age=3600):
+        self.max_age = max_age
+        self._ranking = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, *_):
+        self._ranking = None
+
+    def ranking(self):
+        ranking = self._ranking
+        if ranking is None or (self.max_age and time.time() - ranking.built_at > self.max_age):
+            with self._lock:
+                ranking = self._ranking
+                if ranking is None or (self.max_age and time.time() - ranking.built_at > self.max_age):
+                    ranking = self._ranking = Ranking(self._read())
+        return ranking
+
+    @staticmethod
+    def _read():
+        session = Session()
+        try:
+            return (
+                session.query(Endpoint.instrumentid, Endpoint.positive_score, Company.name)
+                .join(Company, Endpoint.instrumentid == Company.instrumentid)
+                .all()
+            )
+        finally:
+            session.close()
+
+
+leaderboard = Leaderboard()
+impact_store.subscribe(leaderboard.invalidate)
+data_version.subscribe(leaderboard.invalidate)
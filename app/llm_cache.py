@@ -0,0 +1,140 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LLMCache:
+    """
+    Persistent cache of LLM responses stored in a local SQLite file.
+
+    Entries are keyed by a hash of the model, prompt template and prompt
+    parameters, expire after `ttl` seconds and are evicted least recently used
+    first once the cache holds more than `max_entries` rows. The cache lives
+    outside the application database, so replacing the `companies` table does
+    not throw away descriptions that were already paid for.
+    """
+
+    # Run size-based eviction once every this many writes.
+    EVICT_EVERY = 100
+
+    def __init__(self, path, ttl=90 * 24 * 3600, max_entries=100_000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_responses_accessed_at ON llm_responses (accessed_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, template, **params):
+        """
+        Build the cache key of a request.
+
+        Args:
+            model (str): Model name.
+            template (str): Prompt template (including the system prompt).
+            **params: Values substituted into the template.
+
+        Returns:
+            str: Hex digest identifying the request.
+        """
+        payload = json.dumps([model, template, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        Look up a response.
+
+        Args:
+            key (str): Key built with `make_key`.
+
+        Returns:
+            str | None: The cached response, or None on a miss or expired entry.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and row[1] < now - self.ttl):
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE llm_responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, model, response):
+        """
+        Store a successful response.
+
+        Args:
+            key (str): Key built with `make_key`.
+            model (str): Model that produced the response.
+            response (str): The response text.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses (key, model, response, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, now, now),
+            )
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        """Drop expired entries, then the least recently used beyond `max_entries`."""
+        if self.ttl:
+            self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM llm_responses WHERE key IN ("
+            "SELECT key FROM llm_responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def stats(self):
+        """
+        Get cache counters.
+
+        Returns:
+            dict: Hits, misses and number of stored entries.
+        """
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,347 @@
+import contextvars
+import hmac
+import ipaddress
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Statements kept per request for slow-request traces.
+TRACE_MAX_STATEMENTS = 50
+
+# Route label of SQL and OpenAI work done outside a request (background workers, startup).
+BACKGROUND_ROUTE = "background"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    return repr(float(value)) if value != float("inf") else "+Inf"
+
+
+class Counter:
+    """Monotonic counter with labels, rendered in Prometheus text format."""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, *labels):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0.0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Cumulative histogram with labels, rendered in Prometheus text format."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                yield f"{self.name}_bucket", _labels(self.labelnames, labels, [("le", _number(bound))]), cumulative
+            yield f"{self.name}_bucket", _labels(self.labelnames, labels, [("le", "+Inf")]), count
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _labels(self.labelnames, labels), count
+
+
+class RequestStats:
+    """SQL work attributed to one request."""
+
+    __slots__ = ("route", "statements", "sql_seconds", "trace")
+
+    def __init__(self, route, trace=False):
+        self.route = route
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.trace = [] if trace else None
+
+
+class Metrics:
+    """
+    Process-wide request, SQL and OpenAI metrics.
+
+    Request latency is recorded per route (the Flask endpoint name, e.g.
+    ``main.company_details``). SQL statements are counted through engine
+    events and attributed to the route of the request that issued them, or to
+    ``background`` for worker threads. Slow requests (above
+    `slow_request_threshold` seconds) are logged with their statements.
+    """
+
+    def __init__(self):
+        self.request_latency = Histogram(
+            "http_request_duration_seconds", "Request latency by route.", ("route", "method", "status"),
+        )
+        self.request_statements = Histogram(
+            "http_request_sql_statements", "SQL statements per request by route.", ("route",),
+            buckets=(0, 1, 2, 3, 5, 10, 25, 50, 100, 250),
+        )
+        self.sql_statements = Counter("sql_statements_total", "SQL statements executed by route.", ("route",))
+        self.sql_seconds = Counter("sql_duration_seconds_total", "Time spent executing SQL by route.", ("route",))
+        self.openai_latency = Histogram(
+            "openai_request_duration_seconds", "Outbound OpenAI call latency.", ("operation", "outcome"),
+        )
+        self.slow_requests = Counter("http_slow_requests_total", "Requests above the slow-request threshold.", ("route",))
+        self.slow_request_threshold = None
+        self._current = contextvars.ContextVar("request_metrics", default=None)
+        # Bound once so the listeners can be found again with `event.contains`
+        self._before_cursor_execute = self._before_cursor_execute
+        self._after_cursor_execute = self._after_cursor_execute
+
+    def families(self):
+        return (
+            self.request_latency, self.request_statements, self.sql_statements, self.sql_seconds,
+            self.openai_latency, self.slow_requests,
+        )
+
+    # -- SQL -----------------------------------------------------------------
+
+    def instrument_engine(self, engine):
+        """Count statements and DB time of an engine (idempotent)."""
+        if engine is None or event.contains(engine, "after_cursor_execute", self._after_cursor_execute):
+            return engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+        return engine
+
+    @staticmethod
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_start", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("metrics_start")
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        stats = self._current.get()
+        route = stats.route if stats is not None else BACKGROUND_ROUTE
+        self.sql_statements.inc(1, route)
+        self.sql_seconds.inc(elapsed, route)
+        if stats is not None:
+            stats.statements += 1
+            stats.sql_seconds += elapsed
+            if stats.trace is not None and len(stats.trace) < TRACE_MAX_STATEMENTS:
+                stats.trace.append((elapsed, " ".join(statement.split())))
+
+    # -- OpenAI --------------------------------------------------------------
+
+    @contextmanager
+    def time_openai(self, operation):
+        """Record the duration and outcome of an outbound OpenAI call."""
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            yield
+            outcome = "ok"
+        finally:
+            self.openai_latency.observe(time.perf_counter() - start, operation, outcome)
+
+    # -- Requests ------------------------------------------------------------
+
+    def start_request(self, route):
+        """Begin attributing SQL work to `route`; returns a token for `finish_request`."""
+        stats = RequestStats(route, trace=self.slow_request_threshold is not None)
+        return stats, self._current.set(stats), time.perf_counter()
+
+    def finish_request(self, token, method, status, path=None):
+        """Record a finished request started with `start_request`."""
+        stats, context_token, start = token
+        elapsed = time.perf_counter() - start
+        self._current.reset(context_token)
+        self.request_latency.observe(elapsed, stats.route, method, str(status))
+        self.request_statements.observe(stats.statements, stats.route)
+
+        threshold = self.slow_request_threshold
+        if threshold is not None and elapsed >= threshold:
+            self.slow_requests.inc(1, stats.route)
+            slowest = sorted(stats.trace, reverse=True)[:10]
+            logger.warning(
+                "Slow request %s %s (%s) -> %s in %.1f ms: %d SQL statements, %.1f ms in SQL%s",
+                method, path, stats.route, status, elapsed * 1000, stats.statements, stats.sql_seconds * 1000,
+                "".join(f"\n  {duration * 1000:8.2f} ms  {sql[:300]}" for duration, sql in slowest),
+            )
+        return elapsed
+
+    # -- Exposition ----------------------------------------------------------
+
+    def render(self, gauges=()):
+        """
+        Render all metrics in the Prometheus text exposition format.
+
+        Args:
+            gauges (Iterable[tuple[str, str, dict]]): Extra gauges as
+                (name, help, {labels tuple or (): value}).
+
+        Returns:
+            str: The exposition text.
+        """
+        lines = []
+        for family in self.families():
+            lines.append(f"# HELP {family.name} {family.help}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in family.samples())
+        for name, help, values in gauges:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in values.items():
+                lines.append(f"{name}{_labels([label for label, _ in labels], [v for _, v in labels])} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Shared instance wired up by `init_metrics`.
+metrics = Metrics()
+
+
+def _extra_gauges():
+    """Connection pool and LLM cache statistics as gauges."""
+    from .database_setup import get_engine, pool_status
+    from . import utils
+
+    gauges = []
+    engine = get_engine()
+    if engine is not None:
+        status = pool_status(engine)
+        for key, value in status.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                gauges.append((f"db_pool_{key}", f"Connection pool {key.replace('_', ' ')}.", {(): value}))
+    if utils.llm_cache is not None:
+        for key, value in utils.llm_cache.stats().items():
+            gauges.append((f"llm_cache_{key}", f"LLM response cache {key}.", {(): value}))
+    return gauges
+
+
+def parse_networks(value):
+    """
+    Parse a comma-separated list of client addresses and networks.
+
+    Args:
+        value (str): e.g. ``"127.0.0.1, ::1, 10.0.0.0/8"``; ``"*"`` allows any client.
+
+    Returns:
+        list[IPv4Network | IPv6Network] | None: The networks, or None for any client.
+
+    Raises:
+        ValueError: If an entry is not an address or network.
+    """
+    entries = [entry.strip() for entry in (value or "").split(",") if entry.strip()]
+    if "*" in entries:
+        return None
+    return [ipaddress.ip_network(entry, strict=False) for entry in entries]
+
+
+def _address_allowed(address, networks):
+    if networks is None:
+        return True
+    try:
+        address = ipaddress.ip_address(address or "")
+    except ValueError:
+        return False
+    return any(address in network for network in networks)
+
+
+def _token_matches(header, token):
+    scheme, _, value = (header or "").partition(" ")
+    return bool(token) and scheme.lower() == "bearer" and hmac.compare_digest(value.strip(), token)
+
+
+def init_metrics(app):
+    """
+    Register request instrumentation and the ``/metrics`` endpoint on an app.
+
+    The endpoint answers clients whose address is in ``METRICS_ALLOWED_IPS``
+    (loopback by default) and requests with an ``Authorization: Bearer``
+    header matching ``METRICS_TOKEN``; everyone else gets a 403. The address
+    checked is ``request.remote_addr``: behind a reverse proxy that is the
+    proxy, so every request would pass a loopback allow-list. With
+    ``PROXY_FIX_X_FOR`` set, ProxyFix replaces it with the client address
+    from ``X-Forwarded-For``; only enable it when a trusted proxy sets that
+    header, since clients can send it themselves.
+    """
+    from flask import Response, abort, g, request
+    from .database_setup import get_engine
+
+    threshold_ms = app.config.get("SLOW_REQUEST_THRESHOLD_MS")
+    metrics.slow_request_threshold = threshold_ms / 1000 if threshold_ms else None
+    metrics.instrument_engine(get_engine())
+    allowed_networks = parse_networks(app.config.get("METRICS_ALLOWED_IPS", "127.0.0.1,::1"))
+    token = app.config.get("METRICS_TOKEN")
+
+    @app.before_request
+    def _start_request_metrics():
+        g._metrics_token = metrics.start_request(request.endpoint or "unmatched")
+
+    @app.teardown_request
+    def _finish_request_metrics(exc):
+        token = g.pop("_metrics_token", None)
+        if token is not None:
+            status = getattr(g, "_metrics_status", 500 if exc is not None else 200)
+            metrics.finish_request(token, request.method, status, request.path)
+
+    @app.after_request
+    def _record_status(response):
+        g._metrics_status = response.status_code
+        return response
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        if not (_token_matches(request.headers.get("Authorization"), token)
+                or _address_allowed(request.remote_addr, allowed_networks)):
+            abort(403)
+        return Response(metrics.render(_extra_gauges()), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,208 @@
+import logging
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from .database_setup import Session, Midpoint, Endpoint
+from .data_version import data_version
+from .impact_store import ImpactStore, impact_store, ENDPOINT_COLUMNS, MIDPOINT_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+def column_percentiles(values):
+    """
+    Percentile of every value within its column.
+
+    The percentile is the share of the column's other values that are strictly
+    lower, as in the leaderboard: the lowest value gets 0, the highest 100 and
+    ties share the lower percentile. Missing values stay NaN.
+
+    Args:
+        values (ndarray): Matrix of shape (rows, columns), NaN for missing values.
+
+    Returns:
+        ndarray: float32 percentiles (0-100) of the same shape.
+    """
+    percentiles = np.full(values.shape, np.nan, dtype=np.float32)
+    for j, column in enumerate(np.ascontiguousarray(values.T)):
+        order = np.argsort(column)  # NaN sorts last
+        n = len(column) - int(np.count_nonzero(np.isnan(column)))
+        if n == 0:
+            continue
+        order = order[:n]
+        ordered = column[order]
+        # Values strictly below each sorted value: the position of the first of its ties
+        first = np.empty(n, dtype=bool)
+        first[0] = True
+        np.not_equal(ordered[1:], ordered[:-1], out=first[1:])
+        below = np.maximum.accumulate(np.where(first, np.arange(n), 0))
+        percentiles[order, j] = 100.0 * below / (n - 1) if n > 1 else 100.0
+    return percentiles
+
+
+def column_zscores(values):
+    """
+    Standard score of every value within its column; 0 for constant columns.
+
+    Args:
+        values (ndarray): Matrix of shape (rows, columns), NaN for missing values.
+
+    Returns:
+        ndarray: float32 z-scores of the same shape, NaN where values are missing.
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN columns
+        mean = np.nanmean(values, axis=0)
+        std = np.nanstd(values, axis=0)
+    std = np.where(std > 0, std, np.inf)
+    return ((values - mean) / std).astype(np.float32)
+
+
+class PeerTable:
+    """
+    Percentiles and z-scores of one reference table, row-aligned with it.
+
+    Attributes:
+        table (ImpactTable): The raw values.
+        percentiles (ndarray): float32 percentiles (0-100) per row and column.
+        zscores (ndarray): float32 z-scores per row and column.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.percentiles = column_percentiles(table.values)
+        self.zscores = column_zscores(table.values)
+
+    def row(self, asset):
+        """
+        Get the peer-relative values of one asset.
+
+        Returns:
+            dict | None: Column name to {'value', 'percentile', 'zscore'} (None
+            where missing), or None if the asset is unknown.
+        """
+        position = self.table.index.get(asset)
+        if position is None:
+            return None
+        return {
+            name: {
+                "value": None if np.isnan(value) else float(value),
+                "percentile": None if np.isnan(percentile) else float(percentile),
+                "zscore": None if np.isnan(zscore) else float(zscore),
+            }
+            for name, value, percentile, zscore in zip(
+                self.table.columns, self.table.values[position],
+                self.percentiles[position], self.zscores[position],
+            )
+        }
+
+
+class PeerStats:
+    """
+    Universe-wide percentiles and z-scores of every endpoint and midpoint
+    column, computed in one vectorized pass.
+
+    Built from the impact store's tables when it is loaded (and rebuilt after
+    every reload), otherwise from a single read of both tables, repeated
+    whenever the persisted data version changes.
+    """
+
+    def __init__(self):
+        self._tables = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, *_):
+        self._tables = None
+
+    def rebuild(self, store=None):
+        """
+        Recompute the statistics, from `store` when given.
+
+        Args:
+            store (ImpactStore): A loaded store, e.g. passed by its reload notification.
+
+        Returns:
+            PeerStats: The statistics themselves.
+        """
+        tables = self._build(store)
+        with self._lock:
+            self._tables = tables
+        return self
+
+    def refresh(self, *_):
+        """Rebuild after a data change, unless the impact store reload already did."""
+        if not impact_store.loaded:
+            self.rebuild()
+
+    @staticmethod
+    def _build(store):
+        start = time.perf_counter()
+        if store is not None:
+            endpoints, midpoints = store.endpoints, store.midpoints
+        else:
+            session = Session()
+            try:
+                endpoints = ImpactStore._read(session, Endpoint, ENDPOINT_COLUMNS)
+                midpoints = ImpactStore._read(session, Midpoint, MIDPOINT_COLUMNS)
+            finally:
+                session.close()
+        tables = (PeerTable(endpoints), PeerTable(midpoints))
+        logger.info(
+            "Peer statistics built for %d endpoints and %d midpoints in %.1f ms",
+            len(endpoints), len(midpoints), (time.perf_counter() - start) * 1000,
+        )
+        return tables
+
+    def _require(self):
+        tables = self._tables
+        if tables is None:
+            with self._lock:
+                tables = self._tables
+                if tables is None:
+                    tables = self._tables = self._build(impact_store if impact_store.loaded else None)
+        return tables
+
+    def ensure_built(self):
+        """Build the statistics on first use."""
+        self._require()
+        return self
+
+    def percentiles(self, asset):
+        """
+        Get the percentiles of one asset for every endpoint and midpoint column.
+
+        Args:
+            asset (str): Asset identifier (instrumentid).
+
+        Returns:
+            dict: 'endpoints' and 'midpoints', each mapping column names to
+            percentiles (None where the value or the asset is missing).
+        """
+        result = {}
+        for key, table in zip(("endpoints", "midpoints"), self._require()):
+            position = table.table.index.get(asset)
+            if position is None:
+                result[key] = dict.fromkeys(table.table.columns)
+                continue
+            result[key] = {
+                name: None if np.isnan(value) else float(value)
+                for name, value in zip(table.table.columns, table.percentiles[position])
+            }
+        return result
+
+    @property
+    def endpoints(self):
+        return self._require()[0]
+
+    @property
+    def midpoints(self):
+        return self._require()[1]
+
+
+# Shared instance, rebuilt whenever the impact store reloads or the data version changes.
+peer_stats = PeerStats()
+impact_store.subscribe(peer_stats.rebuild)
+data_version.subscribe(peer_stats.refresh)
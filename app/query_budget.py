@@ -0,0 +1,167 @@
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import ContextDecorator
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+|\?")
+_PARAM_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised when a block of code issues more SQL than its budget allows."""
+
+
+def normalize_statement(statement):
+    """
+    Reduce a SQL statement to its shape: literals and bind parameters become
+    ``?`` and parameter lists collapse to ``(?)``, so statements differing
+    only in their parameters compare equal.
+    """
+    statement = _STRING.sub("?", statement)
+    statement = _PARAM.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PARAM_LIST.sub("(?)", statement)
+    return _SPACE.sub(" ", statement).strip()
+
+
+class QueryBudget(ContextDecorator):
+    """
+    Count the SQL statements issued by the current thread and enforce a budget.
+
+    Usable as a context manager or decorator::
+
+        with QueryBudget(max_statements=1, max_repeats=1):
+            get_company_details("ID00001")
+
+        @QueryBudget(max_statements=2, mode="warn")
+        def handler(): ...
+
+    A violation is either too many statements in total, or the same statement
+    shape (see `normalize_statement`) repeated more than `max_repeats` times,
+    the signature of an N+1 query pattern.
+
+    Args:
+        max_statements (int): Maximum statements, None for no limit.
+        max_repeats (int): Maximum executions of one statement shape, None for no limit.
+        mode (str): 'raise' to raise `QueryBudgetExceeded`, 'warn' to log a warning.
+        engine (Engine): Engine to watch, defaults to the shared engine.
+        name (str): Label used in messages.
+    """
+
+    def __init__(self, max_statements=None, max_repeats=None, mode="raise", engine=None, name=None):
+        if mode not in ("raise", "warn"):
+            raise ValueError(f"Unknown query budget mode '{mode}'.")
+        self.max_statements = max_statements
+        self.max_repeats = max_repeats
+        self.mode = mode
+        self.engine = engine
+        self.name = name
+        self.statements = []
+        self._thread = None
+        self._bound = None
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def repeated(self):
+        """Statement shapes executed more than `max_repeats` times, with their counts."""
+        if self.max_repeats is None:
+            return {}
+        counts = Counter(normalize_statement(statement) for statement in self.statements)
+        return {shape: count for shape, count in counts.items() if count > self.max_repeats}
+
+    def violations(self):
+        """Human-readable descriptions of every budget violation."""
+        problems = []
+        if self.max_statements is not None and self.count > self.max_statements:
+            problems.append(f"{self.count} statements (budget {self.max_statements})")
+        for shape, count in self.repeated().items():
+            problems.append(f"repeated {count}x (limit {self.max_repeats}): {shape[:200]}")
+        return problems
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        if self._bound is not None:
+            raise RuntimeError("A QueryBudget cannot be entered twice at the same time.")
+        if self.engine is None:
+            from .database_setup import get_engine
+            engine = get_engine()
+        else:
+            engine = self.engine
+        self.statements = []
+        self._thread = threading.get_ident()
+        self._bound = engine
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.detach()
+        if exc_type is None:
+            self.check()
+        return False
+
+    def detach(self):
+        """Stop counting statements."""
+        if self._bound is not None:
+            event.remove(self._bound, "before_cursor_execute", self._before_cursor_execute)
+            self._bound = None
+
+    def check(self):
+        """Raise or warn about budget violations of the statements seen so far."""
+        problems = self.violations()
+        if not problems:
+            return
+        message = f"Query budget exceeded{f' in {self.name}' if self.name else ''}: " + "; ".join(problems)
+        if self.mode == "raise":
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def init_query_budgets(app):
+    """
+    Enforce the per-route statement budgets of ``QUERY_BUDGETS``.
+
+    ``QUERY_BUDGETS`` maps Flask endpoint names to statement budgets;
+    ``QUERY_BUDGET_MODE`` is 'off', 'warn' or 'raise' (which fails the request,
+    and so the test exercising it) and ``QUERY_BUDGET_MAX_REPEATS`` limits
+    repeated statement shapes.
+    """
+    mode = app.config.get("QUERY_BUDGET_MODE", "off")
+    budgets = dict(app.config.get("QUERY_BUDGETS") or {})
+    if mode == "off" or not budgets:
+        return
+    max_repeats = app.config.get("QUERY_BUDGET_MAX_REPEATS")
+
+    from flask import g, request
+
+    @app.before_request
+    def _start_query_budget():
+        budget = budgets.get(request.endpoint)
+        if budget is not None:
+            g._query_budget = QueryBudget(budget, max_repeats, mode=mode, name=request.endpoint).__enter__()
+
+    @app.after_request
+    def _check_query_budget(response):
+        budget = g.pop("_query_budget", None)
+        if budget is not None:
+            budget.__exit__(None, None, None)
+        return response
+
+    @app.teardown_request
+    def _release_query_budget(exc):
+        # The request failed before after_request; just detach the listener
+        budget = g.pop("_query_budget", None)
+        if budget is not None:
+            budget.detach()
@@ -0,0 +1,77 @@
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from sqlalchemy import select
+
+from .database_setup import Session, Company, Midpoint, Endpoint
+from .impact_store import ENDPOINT_COLUMNS, MIDPOINT_COLUMNS
+
+
+def get_request_session():
+    """
+    Return the session bound to the current application context, opening it
+    on first use. It is closed by `close_request_session` at teardown.
+    """
+    session = g.get("db_session")
+    if session is None:
+        session = g.db_session = Session()
+    return session
+
+
+def close_request_session(exception=None):
+    """Teardown handler closing the request-scoped session."""
+    session = g.pop("db_session", None)
+    if session is not None:
+        session.close()
+
+
+@contextmanager
+def session_scope():
+    """
+    Provide a session for read access.
+
+    Inside a request this is the shared request-scoped session (left open for
+    the rest of the request); elsewhere, e.g. in background workers, a new
+    session is opened and closed on exit.
+    """
+    if has_app_context():
+        yield get_request_session()
+        return
+    session = Session()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+# Single joined statement returning everything a company page needs.
+_COMPANY_BUNDLE = (
+    select(
+        Company.instrumentid,
+        Company.name,
+        Company.description,
+        Endpoint.instrumentid.label("endpoint_id"),
+        *(getattr(Endpoint, name).label(name) for name in ENDPOINT_COLUMNS),
+        Midpoint.instrumentid.label("midpoint_id"),
+        *(getattr(Midpoint, name).label(name) for name in MIDPOINT_COLUMNS),
+    )
+    .select_from(Company)
+    .outerjoin(Endpoint, Endpoint.instrumentid == Company.instrumentid)
+    .outerjoin(Midpoint, Midpoint.instrumentid == Company.instrumentid)
+)
+
+
+def fetch_company_bundle(session, company_id):
+    """
+    Fetch a company with its endpoint and midpoint values in one Core query.
+
+    Args:
+        session (Session): Open SQLAlchemy session.
+        company_id (str): The instrumentid of the company.
+
+    Returns:
+        Row | None: Plain row with the company columns, `endpoint_id`,
+        `midpoint_id` (None when the company has no such data) and every
+        endpoint/midpoint column by attribute name; None if the company is unknown.
+    """
+    return session.execute(_COMPANY_BUNDLE.where(Company.instrumentid == company_id)).first()
@@ -0,0 +1,206 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from .data_version import data_version
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache; the default backend."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, ttl=None):
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class FileSystemCacheBackend:
+    """Cache stored as one pickle file per key, shared by all local workers."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".cache")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def set(self, key, entry, ttl=None):
+        # Write to a temporary file and rename, so readers never see a partial entry
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self._path(key))
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class RedisCacheBackend:
+    """
+    Cache stored in Redis or any client exposing Redis-style get/set/delete.
+
+    Args:
+        url (str): Redis URL, used when no `client` is given (requires the `redis` package).
+        client: Redis-compatible client instance.
+    """
+
+    def __init__(self, url=None, client=None, prefix="bio_portfolio:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("The redis response cache backend requires the 'redis' package.") from e
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        data = self.client.get(self.prefix + key)
+        return pickle.loads(data) if data else None
+
+    def set(self, key, entry, ttl=None):
+        self.client.set(self.prefix + key, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), ex=ttl or None)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
+
+
+def make_backend(name, **options):
+    """
+    Build a cache backend from its configuration name.
+
+    Args:
+        name (str): 'memory', 'filesystem', 'redis' or 'none'.
+        **options: `max_entries`, `directory` or `url` depending on the backend.
+
+    Returns:
+        Backend | None: The backend, or None when caching is disabled.
+    """
+    if not name or name == "none":
+        return None
+    if name == "memory":
+        return MemoryCacheBackend(options.get("max_entries") or 1024)
+    if name == "filesystem":
+        return FileSystemCacheBackend(options["directory"])
+    if name == "redis":
+        return RedisCacheBackend(options.get("url"))
+    raise ValueError(f"Unknown response cache backend '{name}'.")
+
+
+class ResponseCache:
+    """
+    Cache of rendered company pages keyed by company id.
+
+    Every entry records the data version it was rendered from (the stamp the
+    migration and delta-sync scripts persist in the database, see
+    `app.data_version`) and is ignored once the data changes, so entries in
+    backends shared between workers expire for all of them. Nothing is cached
+    before the version is known. Entries carry an ETag
+    and Last-Modified timestamp so clients can revalidate with conditional GETs.
+    """
+
+    def __init__(self, backend=None, ttl=None):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+
+    def configure(self, backend, ttl=None):
+        self.backend = backend
+        self.ttl = ttl
+
+    @staticmethod
+    def _key(company_id):
+        return f"company:{company_id}"
+
+    def get(self, company_id):
+        """
+        Get the cached page of a company.
+
+        Returns:
+            dict | None: Entry with 'body', 'content_type', 'etag' and 'last_modified'.
+        """
+        if self.backend is None:
+            return None
+        try:
+            entry = self.backend.get(self._key(company_id))
+        except Exception:
+            logger.exception("Response cache read failed")
+            return None
+        if entry is None or data_version.current is None or entry["version"] != data_version.current:
+            return None
+        if self.ttl and entry["last_modified"] < time.time() - self.ttl:
+            return None
+        return entry
+
+    def put(self, company_id, body, content_type="text/html; charset=utf-8"):
+        """
+        Store a rendered page.
+
+        Args:
+            company_id (str): The instrumentid of the company.
+            body (bytes): Response body.
+            content_type (str): Response content type.
+
+        Returns:
+            dict: The stored entry.
+        """
+        version = data_version.current
+        entry = {
+            "body": body,
+            "content_type": content_type,
+            "etag": hashlib.sha1(f"{version}:".encode() + body).hexdigest(),
+            "last_modified": time.time(),
+            "version": version,
+        }
+        if self.backend is not None and version is not None:
+            try:
+                self.backend.set(self._key(company_id), entry, ttl=self.ttl)
+            except Exception:
+                logger.exception("Response cache write failed")
+        return entry
+
+    def invalidate_company(self, company_id):
+        """Drop the cached page of a company, e.g. after its description changed."""
+        if self.backend is not None:
+            try:
+                self.backend.delete(self._key(company_id))
+            except Exception:
+                logger.exception("Response cache delete failed")
+
+
+# Shared cache of company pages.
+company_page_cache = ResponseCache()
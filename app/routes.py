@@ -1,74 +1,191 @@
-from flask import Blueprint, request, jsonify, render_template, url_for
-from .services import process_portfolio, get_company_details, search_companies
+from flask import Blueprint, current_app, request, jsonify, render_template, url_for, make_response
+from .services import submit_portfolio_job, process_scenarios, process_comparison, process_substitutes, similar_companies, get_company_details, get_company_description, search_companies
+from .descriptions import DESCRIPTION_PLACEHOLDER
+from .jobs import portfolio_jobs
+from .typeahead import typeahead
+from .leaderboard import leaderboard
+from .response_cache import company_page_cache
 from .utils import calculate_score_color
-from flask_limiter import Limiter
-from sqlalchemy.orm import sessionmaker
-from .database_setup import engine, Endpoint, Company
-from authlib.integrations.flask_client import OAuth
-from flask_limiter.util import get_remote_address
-import plotly.graph_objs as go
+from .database_setup import pool_status
 import json
+from datetime import datetime, timezone
 
 main = Blueprint('main', __name__)
 
-Session = sessionmaker(bind=engine)
+LEADERBOARD_MAX_PER_PAGE = 500
+SIMILAR_MAX_RESULTS = 100
+SUBSTITUTES_MAX_PER_HOLDING = 20
 
 # Index with company search
 @main.route('/', methods=['GET', 'POST'])
 def index():
-    session = Session()
-    try:
-        # Join the `endpoints` and `companies` tables to fetch names
-        top_companies = (
-            session.query(Endpoint.instrumentid, Endpoint.positive_score, Company.name)
-            .join(Company, Endpoint.instrumentid == Company.instrumentid)
-            .order_by(Endpoint.positive_score.desc())
-            .limit(5)
-            .all()
-        )
+    # Top and worst companies come from the precomputed ranking
+    ranking = leaderboard.ranking()
+    top_companies = [
+        {"instrumentid": c["instrumentid"], "score": c["score"], "name": c["name"]} for c in ranking.top(5)
+    ]
+    worst_companies = [
+        {"instrumentid": c["instrumentid"], "score": c["score"], "name": c["name"]} for c in ranking.bottom(5)
+    ]
 
-        worst_companies = (
-            session.query(Endpoint.instrumentid, Endpoint.positive_score, Company.name)
-            .join(Company, Endpoint.instrumentid == Company.instrumentid)
-            .order_by(Endpoint.positive_score.asc())
-            .limit(5)
-            .all()
-        )
+    return render_template(
+        "index.html",
+        top_companies=top_companies,
+        worst_companies=worst_companies,
+    )
+
+
+@main.route('/leaderboard', methods=['GET'])
+def leaderboard_page():
+    """
+    Paginated ranking of companies by positive score, best first.
+    """
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 50, type=int), 1), LEADERBOARD_MAX_PER_PAGE)
+    ranking = leaderboard.ranking()
+    return jsonify({
+        "page": page,
+        "per_page": per_page,
+        "total": len(ranking),
+        "items": ranking.page(page, per_page),
+    })
+
+
+@main.route('/leaderboard/<string:company_id>', methods=['GET'])
+def leaderboard_rank(company_id):
+    """
+    Rank and percentile of one company.
+    """
+    rank = leaderboard.ranking().rank_of(company_id)
+    if rank is None:
+        return jsonify({"error": f"Company with ID {company_id} is not ranked."}), 404
+    return jsonify(rank)
 
-        # Format results for the template
-        top_companies = [
-            {"instrumentid": c[0], "score": c[1] * 100, "name": c[2]} for c in top_companies
-        ]
-        worst_companies = [
-            {"instrumentid": c[0], "score": c[1] * 100, "name": c[2]} for c in worst_companies
-        ]
-
-        return render_template(
-            "index.html",
-            top_companies=top_companies,
-            worst_companies=worst_companies,
-        )
-    finally:
-        session.close()
 
 
+@main.route('/health/db-pool', methods=['GET'])
+def db_pool_status():
+    """
+    Live connection pool statistics of this worker process.
+    """
+    return jsonify(pool_status())
+
 
 # Portfolio calculation (new route)
 @main.route('/portfolio', methods=['GET', 'POST'])
 def portfolio():
     """
     Separate route for portfolio calculation.
+
+    POST submits the uploaded file as a background job and returns its id at
+    once; poll `/portfolio/jobs/<job_id>` for progress and the result.
     """
     if request.method == 'POST':
-        # Handle file upload and portfolio processing here
-        pass  # Placeholder for future implementation
+        file = request.files.get('file')
+        if not file or not file.filename:
+            return jsonify({"error": "A portfolio file is required"}), 400
+        try:
+            job_id = submit_portfolio_job(file)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except RuntimeError as e:
+            return jsonify({"error": str(e)}), 503
+        return jsonify({
+            "job_id": job_id,
+            "status_url": url_for('main.portfolio_job', job_id=job_id),
+        }), 202
     return render_template('portfolio.html')
 
 
-limiter = Limiter(get_remote_address)
+@main.route('/portfolio/scenarios', methods=['POST'])
+def portfolio_scenarios():
+    """
+    Evaluate many allocation scenarios at once.
+
+    Accepts an uploaded allocation matrix (``file``) or a JSON body, see
+    `process_scenarios`, and returns one summary per scenario.
+    """
+    file = request.files.get('file')
+    if file is not None and not file.filename:
+        file = None
+    try:
+        return jsonify(process_scenarios(file=file, payload=request.get_json(silent=True)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@main.route('/portfolio/compare', methods=['POST'])
+def portfolio_compare():
+    """
+    Compare many portfolios side by side.
+
+    Accepts several uploaded files (``files``) or a JSON body, see
+    `process_comparison`, and returns per-portfolio totals and rankings.
+    """
+    files = [file for file in request.files.getlist('files') if file.filename]
+    try:
+        return jsonify(process_comparison(files=files, payload=request.get_json(silent=True)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@main.route('/portfolio/substitutes', methods=['POST'])
+def portfolio_substitutes():
+    """
+    Suggest similar companies with a higher positive score for each holding.
+
+    Accepts an uploaded portfolio (``file``) or a JSON body, see
+    `process_substitutes`.
+    """
+    file = request.files.get('file')
+    if file is not None and not file.filename:
+        file = None
+    payload = request.get_json(silent=True)
+    try:
+        k = int(request.form.get('k') or (payload or {}).get('k', 3))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'k' must be an integer."}), 400
+    k = min(max(k, 1), SUBSTITUTES_MAX_PER_HOLDING)
+    try:
+        return jsonify(process_substitutes(file=file, payload=payload, k=k))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def request_too_large(error):
+    """
+    Reject bodies over `MAX_CONTENT_LENGTH` as JSON, like the other upload errors.
+
+    Registered on the app by `create_app`, since the error can be raised
+    outside any blueprint's views.
+    """
+    limit = current_app.config.get('MAX_CONTENT_LENGTH')
+    return jsonify({"error": f"Request body is too large (limit is {limit} bytes)."}), 413
+
+
+@main.route('/portfolio/jobs/<string:job_id>', methods=['GET'])
+def portfolio_job(job_id):
+    """
+    Poll a portfolio job for its progress and, once finished, its result.
+    """
+    job = portfolio_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    payload = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "progress": job["progress"],
+        "error": job["error"],
+    }
+    if job["status"] == "finished":
+        payload["result"] = job["result"]
+    return jsonify(payload)
+
 
 company_routes = Blueprint('company', __name__)
 
+TYPEAHEAD_MAX_RESULTS = 20
+
 @company_routes.route('/company/search', methods=['GET'])
 def search():
     """
@@ -84,9 +201,26 @@ def search():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
-#@limiter.limit("5 per minute")  # Allow 5 requests per minute
+@company_routes.route('/company/typeahead', methods=['GET'])
+def company_typeahead():
+    """
+    Autocomplete companies by instrumentid or name prefix.
+
+    Returns only instrumentid and name, served from an in-memory prefix index.
+    """
+    query = request.args.get('q') or request.args.get('query')
+    if not query:
+        return jsonify({"error": "Query parameter is required"}), 400
+    limit = min(request.args.get('limit', 10, type=int), TYPEAHEAD_MAX_RESULTS)
+    return jsonify(typeahead.lookup(query, limit=max(limit, 1)))
+
 @main.route('/company/<string:company_id>', methods=['GET'])
 def company_details(company_id):
+    # Serve the rendered page from the response cache while the data is unchanged
+    cached = company_page_cache.get(company_id)
+    if cached is not None:
+        return _cached_response(cached)
+
     try:
         details = get_company_details(company_id)
 
@@ -94,26 +228,73 @@ def company_details(company_id):
         positive_score = details["impact"]["positive_score"] * 100  # Scale score to 0-100
         score_color = calculate_score_color(positive_score)
 
-        # Prepare radar plot data for midpoints
+        # Prepare radar plot data: midpoint percentiles within the whole universe, raw values on hover
         radar_data = {
             "categories": list(details["midpoints"].keys()),
-            "values": list(details["midpoints"].values()),
+            "values": list(details["midpoint_percentiles"].values()),
+            "raw": list(details["midpoints"].values()),
         }
+        endpoint_percentiles = details["endpoint_percentiles"]
 
-        return render_template(
+        html = render_template(
             "company_details.html",
+            company_id=company_id,
             company_name=details["company_name"],
-            description=details["description"],
+            description=details["description"] or DESCRIPTION_PLACEHOLDER,
+            description_pending=details["description_pending"],
             positive_score=positive_score,
             score_color=score_color,
             endpoints={
-                "Marine": details["impact"]["Damage to marine species"],
-                "Freshwater": details["impact"]["Damage to freshwater species"],
-                "Terrestrial": details["impact"]["Damage to terrestrial species"],
+                "Marine": (details["impact"]["Damage to marine species"], endpoint_percentiles["damage_to_marine_species"]),
+                "Freshwater": (details["impact"]["Damage to freshwater species"], endpoint_percentiles["damage_to_freshwater_species"]),
+                "Terrestrial": (details["impact"]["Damage to terrestrial species"], endpoint_percentiles["damage_to_terrestrial_species"]),
             },
             radar_data=json.dumps(radar_data),
         )
     except ValueError as e:
         return render_template("error.html", error=str(e))
+
+    # Pages still waiting for their description are not cached
+    if details["description_pending"]:
+        return html
+    return _cached_response(company_page_cache.put(company_id, html.encode("utf-8")))
+
+
+def _cached_response(entry):
+    """
+    Build a response from a cache entry, answering 304 when the client's
+    ETag or Last-Modified validators still match.
+    """
+    response = make_response(entry["body"])
+    response.content_type = entry["content_type"]
+    response.set_etag(entry["etag"])
+    response.last_modified = datetime.fromtimestamp(entry["last_modified"], tz=timezone.utc)
+    response.cache_control.no_cache = True  # Always revalidate
+    return response.make_conditional(request)
     
 
+@main.route('/company/<string:company_id>/similar', methods=['GET'])
+def company_similar(company_id):
+    """
+    Companies with the most similar biodiversity footprint.
+
+    ``k`` sets the number of results; ``better=1`` keeps only companies with
+    a higher positive score (lower-damage alternatives).
+    """
+    k = min(max(request.args.get('k', 10, type=int), 1), SIMILAR_MAX_RESULTS)
+    better_only = request.args.get('better', '').lower() in ('1', 'true', 'yes')
+    try:
+        return jsonify(similar_companies(company_id, k=k, better_only=better_only))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
+
+
+@main.route('/company/<string:company_id>/description', methods=['GET'])
+def company_description(company_id):
+    """
+    Poll for a company description that is being generated in the background.
+    """
+    try:
+        return jsonify(get_company_description(company_id))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 404
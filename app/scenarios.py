@@ -0,0 +1,253 @@
+import numpy as np
+from flask import current_app, has_app_context
+
+from .functions import ENDPOINT_IMPACT_COLUMNS, endpoint_matrix
+from .impact_store import ENDPOINT_COLUMNS
+
+# Largest scenarios x assets matrix evaluated in one request (float64 cells).
+DEFAULT_MAX_CELLS = 20_000_000
+
+# Positions of the damage and score columns in the endpoint matrix.
+_DAMAGE_INDEX = [ENDPOINT_COLUMNS.index(name) for name in ENDPOINT_IMPACT_COLUMNS]
+_SCORE_INDEX = ENDPOINT_COLUMNS.index("positive_score")
+
+
+def cell_limit():
+    """Configured maximum size of an allocation matrix."""
+    if has_app_context():
+        return current_app.config.get("SCENARIO_MAX_CELLS", DEFAULT_MAX_CELLS)
+    return DEFAULT_MAX_CELLS
+
+
+def shift_worst_to_best(base, scores, fractions, quantile=0.1):
+    """
+    Generate scenarios moving part of the allocation from the worst-scoring
+    holdings to the best-scoring ones.
+
+    Holdings are ranked by `positive_score`. Each scenario removes a fraction
+    of the allocation of every holding in the worst `quantile` and spreads the
+    freed allocation over the best `quantile`, proportionally to their current
+    weights (equally if they hold nothing). Total allocation is unchanged.
+
+    Args:
+        base (ndarray): Base allocation, one value per asset.
+        scores (ndarray): `positive_score` per asset, NaN where unknown.
+        fractions (Sequence[float]): Share of the worst holdings to move, one scenario each.
+        quantile (float): Size of the worst and best groups, e.g. 0.1 for deciles.
+
+    Returns:
+        ndarray: Allocation matrix of shape (len(fractions), len(base)).
+    """
+    base = np.asarray(base, dtype=float)
+    fractions = np.clip(np.asarray(fractions, dtype=float), 0.0, 1.0)[:, None]
+    scenarios = np.repeat(base[None, :], len(fractions), axis=0)
+
+    held = (base > 0) & ~np.isnan(scores)
+    if held.sum() < 2:
+        return scenarios
+    low, high = np.quantile(scores[held], [quantile, 1.0 - quantile])
+    worst = held & (scores <= low)
+    best = held & (scores >= high) & ~worst
+    if not worst.any() or not best.any():
+        return scenarios
+
+    weights = base[best] / base[best].sum()
+    scenarios[:, worst] = base[worst] * (1.0 - fractions)
+    scenarios[:, best] += fractions * base[worst].sum() * weights
+    return scenarios
+
+
+def check_cells(scenarios, assets):
+    """
+    Reject an allocation matrix larger than `cell_limit` before it is built.
+
+    Args:
+        scenarios (int): Number of scenarios (matrix rows).
+        assets (int): Number of assets (matrix columns).
+
+    Raises:
+        ValueError: If the matrix would exceed the limit.
+    """
+    limit = cell_limit()
+    if scenarios * assets > limit:
+        raise ValueError(f"{scenarios} scenarios x {assets} assets exceeds the limit of {limit} cells.")
+
+
+def _rule_number(value, name, cast=float):
+    """Convert a numeric rule field, raising ValueError (a 400) when it is not a number."""
+    if not isinstance(value, bool):
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            pass
+    raise ValueError(f"Scenario rule {name} must be a number.")
+
+
+def _parse_rule(rule):
+    """
+    Validate a rule without generating its scenarios.
+
+    Returns:
+        tuple[float, int, Callable[[], list[float]]]: The quantile, the number
+        of scenarios and a function building their fractions.
+    """
+    if not isinstance(rule, dict):
+        raise ValueError("Each scenario rule must be an object.")
+    if rule.get("rule") != "shift_worst_to_best":
+        raise ValueError(f"Unknown scenario rule '{rule.get('rule')}'.")
+    quantile = _rule_number(rule.get("quantile", 0.1), "quantile")
+    if not 0 < quantile <= 0.5:
+        raise ValueError("Scenario rule quantile must be in (0, 0.5].")
+    if "fractions" in rule:
+        fractions = rule["fractions"]
+        if not isinstance(fractions, list):
+            raise ValueError("Scenario rule fractions must be a list.")
+        fractions = [_rule_number(fraction, "fractions") for fraction in fractions]
+        return quantile, len(fractions), lambda: fractions
+    steps = _rule_number(rule.get("steps", 10), "steps", int)
+    if steps < 1:
+        raise ValueError("Scenario rule steps must be at least 1.")
+    max_fraction = _rule_number(rule.get("max_fraction", 1.0), "max_fraction")
+    return quantile, steps, lambda: np.linspace(0.0, max_fraction, steps + 1)[1:].tolist()
+
+
+def scenario_count(rules):
+    """
+    Number of scenarios `generate_scenarios` would build, base included.
+
+    Args:
+        rules (Iterable[dict]): Rule specifications.
+
+    Returns:
+        int: The scenario count.
+    """
+    return 1 + sum(_parse_rule(rule)[1] for rule in rules)
+
+
+def generate_scenarios(base, scores, rules):
+    """
+    Build an allocation matrix from simple rules; the base allocation comes first.
+
+    Supported rule::
+
+        {"rule": "shift_worst_to_best", "fractions": [0.05, 0.1], "quantile": 0.1}
+        {"rule": "shift_worst_to_best", "steps": 20, "max_fraction": 1.0}
+
+    Args:
+        base (ndarray): Base allocation, one value per asset.
+        scores (ndarray): `positive_score` per asset, NaN where unknown.
+        rules (Iterable[dict]): Rule specifications.
+
+    Returns:
+        tuple[ndarray, list[str]]: Allocation matrix (scenarios, assets) and scenario labels.
+    """
+    blocks = [np.asarray(base, dtype=float)[None, :]]
+    labels = ["base"]
+    for rule in rules:
+        quantile, _, make_fractions = _parse_rule(rule)
+        fractions = make_fractions()
+        blocks.append(shift_worst_to_best(base, scores, fractions, quantile))
+        labels.extend(f"shift {fraction:.0%} worst->best q={quantile:g}" for fraction in fractions)
+    return np.vstack(blocks), labels
+
+
+def evaluate_scenarios(allocations, endpoints, found):
+    """
+    Evaluate every scenario in one vectorized pass over the endpoint matrix.
+
+    Args:
+        allocations (ndarray): Allocation matrix of shape (scenarios, assets).
+        endpoints (ndarray): Endpoint matrix of shape (assets, len(ENDPOINT_COLUMNS)).
+        found (ndarray): Boolean mask of assets with endpoint data.
+
+    Returns:
+        dict: Arrays with one entry per scenario: 'damages' (scenarios x 3),
+        'total_damage', 'positive_score' (allocation-weighted), 'allocation'
+        (total) and 'coverage' (share of the allocation with endpoint data).
+    """
+    allocations = np.asarray(allocations, dtype=float)
+    damages = np.nan_to_num(endpoints[:, _DAMAGE_INDEX])
+    scores = endpoints[:, _SCORE_INDEX]
+    scored = found & ~np.isnan(scores)
+
+    matched = allocations[:, found]
+    total = allocations.sum(axis=1)
+    scored_allocation = allocations[:, scored].sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        positive = (allocations[:, scored] @ scores[scored]) / scored_allocation
+        coverage = matched.sum(axis=1) / total
+    scenario_damages = matched @ damages[found]
+    return {
+        "damages": scenario_damages,
+        "total_damage": scenario_damages.sum(axis=1),
+        "positive_score": positive,
+        "allocation": total,
+        "coverage": coverage,
+    }
+
+
+def _number(value):
+    return None if np.isnan(value) else float(value)
+
+
+def summarize_scenarios(evaluation, labels):
+    """
+    Turn `evaluate_scenarios` arrays into one JSON-ready summary per scenario.
+
+    Returns:
+        list[dict]: Scenario label, total allocation, per-dimension damages,
+        total damage, weighted positive score (x100, as on the site) and coverage.
+    """
+    damages = evaluation["damages"].tolist()
+    summaries = []
+    for i, label in enumerate(labels):
+        summary = {"scenario": label, "allocation": float(evaluation["allocation"][i])}
+        summary.update(zip(ENDPOINT_IMPACT_COLUMNS.values(), damages[i]))
+        score = _number(evaluation["positive_score"][i])
+        summary["total_damage"] = float(evaluation["total_damage"][i])
+        summary["positive_score"] = None if score is None else score * 100
+        summary["coverage"] = _number(evaluation["coverage"][i])
+        summaries.append(summary)
+    return summaries
+
+
+def run_scenarios(assets, allocations=None, labels=None, rules=None):
+    """
+    Evaluate an uploaded allocation matrix or rule-generated scenarios.
+
+    Args:
+        assets (Sequence[str]): Asset ids, one per matrix column.
+        allocations (ndarray): Allocation matrix (scenarios, assets). With
+            `rules`, a single base allocation (one value per asset).
+        labels (Sequence[str]): Scenario labels, default to their index.
+        rules (Iterable[dict]): Rules applied to the base allocation, see `generate_scenarios`.
+
+    Returns:
+        dict: Per-scenario summaries, the number of assets and the unmatched asset ids.
+    """
+    # Bound the matrix size before anything is allocated
+    if rules:
+        check_cells(scenario_count(rules), len(assets))
+    elif isinstance(allocations, (list, tuple)):
+        check_cells(len(allocations), len(assets))
+    allocations = np.atleast_2d(np.asarray(allocations, dtype=float))
+    if allocations.shape[1] != len(assets):
+        raise ValueError(f"Allocation matrix has {allocations.shape[1]} columns for {len(assets)} assets.")
+    check_cells(allocations.shape[0], allocations.shape[1])
+
+    endpoints, found = endpoint_matrix(assets)
+    if rules:
+        if allocations.shape[0] != 1:
+            raise ValueError("Scenario rules need a single base allocation.")
+        allocations, labels = generate_scenarios(allocations[0], endpoints[:, _SCORE_INDEX], rules)
+    elif labels is None:
+        labels = [str(i) for i in range(allocations.shape[0])]
+    if len(labels) != allocations.shape[0]:
+        raise ValueError(f"Got {len(labels)} labels for {allocations.shape[0]} scenarios.")
+
+    evaluation = evaluate_scenarios(allocations, endpoints, found)
+    return {
+        "assets": len(assets),
+        "scenarios": summarize_scenarios(evaluation, labels),
+        "unmatched": list(dict.fromkeys(np.asarray(assets, dtype=object)[~found].tolist())),
+    }
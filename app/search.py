@@ -0,0 +1,257 @@
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Relevance tiers, lower is better.
+TIER_EXACT_ID = 0
+TIER_EXACT_NAME = 1
+TIER_PREFIX = 2
+TIER_SUBSTRING = 3
+TIER_FUZZY = 4
+
+# Trigram-based search cannot match queries shorter than this.
+MIN_TRIGRAM_QUERY = 3
+
+# Fuzzy search ranks only the best FTS candidates (by bm25), and keeps those
+# sharing at least this share of the query's trigrams.
+FUZZY_CANDIDATES = 200
+FUZZY_MIN_SHARE = 0.5
+
+# Engines (by URL) whose search index has been verified, see `search_backend`.
+_backends = {}
+
+_TIER_SQL = """
+    CASE
+        WHEN lower(c.instrumentid) = :q THEN 0
+        WHEN lower(c.name) = :q THEN 1
+        WHEN lower(c.instrumentid) LIKE :prefix ESCAPE '\\' OR lower(c.name) LIKE :prefix ESCAPE '\\' THEN 2
+        WHEN lower(c.instrumentid) LIKE :substring ESCAPE '\\' OR lower(c.name) LIKE :substring ESCAPE '\\' THEN 3
+        ELSE 4
+    END
+"""
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS companies_fts USING fts5(
+        instrumentid, name, content='companies', content_rowid='rowid', tokenize='trigram'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS companies_fts_insert AFTER INSERT ON companies BEGIN
+        INSERT INTO companies_fts (rowid, instrumentid, name) VALUES (new.rowid, new.instrumentid, new.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS companies_fts_delete AFTER DELETE ON companies BEGIN
+        INSERT INTO companies_fts (companies_fts, rowid, instrumentid, name)
+        VALUES ('delete', old.rowid, old.instrumentid, old.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS companies_fts_update AFTER UPDATE OF instrumentid, name ON companies BEGIN
+        INSERT INTO companies_fts (companies_fts, rowid, instrumentid, name)
+        VALUES ('delete', old.rowid, old.instrumentid, old.name);
+        INSERT INTO companies_fts (rowid, instrumentid, name) VALUES (new.rowid, new.instrumentid, new.name);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX IF NOT EXISTS ix_companies_name_trgm ON companies USING gin (lower(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_companies_instrumentid_trgm ON companies USING gin (lower(instrumentid) gin_trgm_ops)",
+]
+
+
+def ensure_search_index(engine, rebuild=False):
+    """
+    Create the company search index if it does not exist yet.
+
+    PostgreSQL gets pg_trgm GIN indexes on ``lower(name)`` and
+    ``lower(instrumentid)``; SQLite gets an FTS5 trigram table over
+    `companies` that triggers keep in sync. Other databases are left alone
+    and searched with plain ``LIKE``.
+
+    `migration.py` runs this after every load. ``CREATE EXTENSION`` needs
+    elevated privileges, so the app only runs it at start-up when
+    ``SEARCH_INDEX_AUTO_CREATE`` is set (the default for development and tests).
+
+    Args:
+        engine (Engine): Engine of the application database.
+        rebuild (bool): Re-index every company (SQLite), e.g. after the
+            `companies` table was replaced by a bulk load.
+
+    Returns:
+        str: The search backend now in use ('postgres', 'sqlite' or 'like').
+    """
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == "postgresql":
+            for statement in _POSTGRES_DDL:
+                conn.execute(text(statement))
+        elif dialect == "sqlite":
+            existed = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'companies_fts'")
+            ).first() is not None
+            for statement in _SQLITE_DDL:
+                conn.execute(text(statement))
+            if rebuild or not existed:
+                conn.execute(text("INSERT INTO companies_fts (companies_fts) VALUES ('rebuild')"))
+    _backends.pop(str(engine.url), None)
+    return search_backend(engine)
+
+
+def search_backend(engine):
+    """
+    Detect which search strategy the database supports.
+
+    The result is cached per engine, so the catalogue is only inspected once.
+
+    Returns:
+        str: 'postgres', 'sqlite' or 'like'.
+    """
+    key = str(engine.url)
+    if key not in _backends:
+        backend = "like"
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name == "postgresql":
+                    found = conn.execute(text(
+                        "SELECT 1 FROM pg_indexes WHERE tablename = 'companies' "
+                        "AND indexname = 'ix_companies_name_trgm'"
+                    )).first()
+                    backend = "postgres" if found else "like"
+                elif engine.dialect.name == "sqlite":
+                    found = conn.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'companies_fts'"
+                    )).first()
+                    backend = "sqlite" if found else "like"
+        except Exception:
+            logger.exception("Could not inspect the search index; using LIKE search.")
+        _backends[key] = backend
+    return _backends[key]
+
+
+def _like_escape(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _params(query, limit):
+    escaped = _like_escape(query)
+    return {"q": query, "prefix": f"{escaped}%", "substring": f"%{escaped}%", "limit": limit}
+
+
+def _fts_phrase(value):
+    return '"' + value.replace('"', '""') + '"'
+
+
+def search(session, query, limit=10, exact_match=False):
+    """
+    Search companies by instrumentid or name, best matches first.
+
+    Results are ranked exact instrumentid, exact name, prefix, substring, then
+    fuzzy (trigram similarity) matches.
+
+    Args:
+        session (Session): Open SQLAlchemy session.
+        query (str): Search query (instrumentid or name).
+        limit (int): Maximum number of results to return.
+        exact_match (bool): Only return case-insensitive exact matches.
+
+    Returns:
+        list[Row]: Rows with instrumentid, name and description.
+    """
+    query = query.strip().lower()
+    if not query:
+        return []
+    params = _params(query, limit)
+
+    if exact_match:
+        return session.execute(text(
+            "SELECT c.instrumentid, c.name, c.description FROM companies c "
+            "WHERE lower(c.instrumentid) = :q OR lower(c.name) = :q "
+            f"ORDER BY {_TIER_SQL}, c.name LIMIT :limit"
+        ), params).all()
+
+    backend = search_backend(session.get_bind())
+    if backend == "postgres":
+        return _search_postgres(session, params)
+    if backend == "sqlite" and len(query) >= MIN_TRIGRAM_QUERY:
+        return _search_sqlite(session, query, params)
+    return _search_like(session, params)
+
+
+def _search_like(session, params):
+    return session.execute(text(
+        "SELECT c.instrumentid, c.name, c.description FROM companies c "
+        "WHERE lower(c.instrumentid) LIKE :substring ESCAPE '\\' OR lower(c.name) LIKE :substring ESCAPE '\\' "
+        f"ORDER BY {_TIER_SQL}, c.name LIMIT :limit"
+    ), params).all()
+
+
+def _search_postgres(session, params):
+    # LIKE and the % (similarity) operator both use the trigram GIN indexes.
+    return session.execute(text(
+        "SELECT c.instrumentid, c.name, c.description FROM companies c "
+        "WHERE lower(c.name) LIKE :substring ESCAPE '\\' OR lower(c.instrumentid) LIKE :substring ESCAPE '\\' "
+        "OR lower(c.name) % :q OR lower(c.instrumentid) % :q "
+        f"ORDER BY {_TIER_SQL}, "
+        "greatest(similarity(lower(c.name), :q), similarity(lower(c.instrumentid), :q)) DESC, c.name "
+        "LIMIT :limit"
+    ), params).all()
+
+
+def _tier(row, query):
+    """Relevance tier of a result row, as computed by `_TIER_SQL`."""
+    instrumentid, name = (row.instrumentid or "").lower(), (row.name or "").lower()
+    if instrumentid == query:
+        return TIER_EXACT_ID
+    if name == query:
+        return TIER_EXACT_NAME
+    if instrumentid.startswith(query) or name.startswith(query):
+        return TIER_PREFIX
+    if query in instrumentid or query in name:
+        return TIER_SUBSTRING
+    return TIER_FUZZY
+
+
+def _trigrams(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+def _search_sqlite(session, query, params):
+    # A phrase of all query trigrams is a substring match.
+    rows = session.execute(text(
+        "SELECT c.instrumentid, c.name, c.description FROM companies_fts "
+        "JOIN companies c ON c.rowid = companies_fts.rowid "
+        "WHERE companies_fts MATCH :match "
+        f"ORDER BY {_TIER_SQL}, bm25(companies_fts), c.name LIMIT :limit"
+    ), {**params, "match": _fts_phrase(query)}).all()
+    # An exact or prefix match is what the user is looking for; fuzzy matches would only add noise
+    if len(rows) >= params["limit"] or (rows and _tier(rows[0], query) <= TIER_PREFIX):
+        return rows
+
+    # Fill up with fuzzy matches: the best bm25 candidates sharing any trigram,
+    # kept when they contain most of the query's trigrams.
+    trigrams = _trigrams(query)
+    fuzzy = " OR ".join(_fts_phrase(trigram) for trigram in sorted(trigrams))
+    candidates = session.execute(text(
+        "SELECT c.instrumentid, c.name, c.description FROM ("
+        "    SELECT rowid, rank FROM companies_fts WHERE companies_fts MATCH :match "
+        "    ORDER BY rank LIMIT :candidates"
+        ") f JOIN companies c ON c.rowid = f.rowid "
+        "ORDER BY f.rank, c.name"
+    ), {"match": fuzzy, "candidates": FUZZY_CANDIDATES}).all()
+    seen = {row.instrumentid for row in rows}
+    for row in candidates:
+        if len(rows) >= params["limit"]:
+            break
+        if row.instrumentid in seen:
+            continue
+        shared = trigrams & (_trigrams((row.instrumentid or "").lower()) | _trigrams((row.name or "").lower()))
+        if len(shared) >= FUZZY_MIN_SHARE * len(trigrams):
+            rows.append(row)
+            seen.add(row.instrumentid)
+    return rows
@@ -1,43 +1,240 @@
-from sqlalchemy.orm import sessionmaker
-from .database_setup import engine, Company, Endpoint, Midpoint
-from .functions import compute_asset_impact, compute_asset_midpoint, compute_portfolio_impact
-from .utils import generate_company_description
-import pandas as pd
-import os
+from sqlalchemy import select
+from .database_setup import Company
+from .functions import MIDPOINT_LABELS, asset_impact, asset_midpoint, compute_portfolio_impact
+from .repository import session_scope, fetch_company_bundle
+from .uploads import detect_format, open_upload, spool_upload, iter_portfolio_frames, read_allocation_matrix
+from .scenarios import run_scenarios
+from .comparison import compare_portfolios
+from .similarity import similar_companies, suggest_substitutes
+from .jobs import portfolio_jobs
+from .search import search
+from .descriptions import description_worker, is_missing_description
+from .peer_stats import peer_stats
 
-# Initialize the SQLAlchemy session
-Session = sessionmaker(bind=engine)
 
-
-def process_portfolio(file):
+def process_portfolio(file, max_bytes=None, progress=None):
     """
     Process the uploaded portfolio file and compute impacts.
 
+    The upload is parsed straight from the request stream; nothing is written
+    to `UPLOAD_FOLDER`. XLSX, CSV and Parquet files are accepted, and large
+    CSV/Parquet files are processed chunk by chunk.
+
+    Args:
+        file (FileStorage): The uploaded file object.
+        max_bytes (int): Size cap for the upload, defaults to the configured limit.
+        progress (Callable[[int], None]): Optional callback receiving the number
+            of portfolio rows processed so far.
+
+    Returns:
+        dict: 'assets', the assets with their respective impacts, and
+        'unmatched', the instrumentids without endpoint data.
+    """
+    file_format = detect_format(file.filename)
+    stream = open_upload(file, max_bytes)
+    return process_portfolio_stream(stream, file_format, progress=progress)
+
+
+def process_portfolio_stream(stream, file_format, progress=None):
+    """
+    Compute impacts for a portfolio read from an open stream.
+
+    Args:
+        stream (IO[bytes]): Readable stream positioned at the start of the file.
+        file_format (str): One of 'xlsx', 'csv' or 'parquet'.
+        progress (Callable[[int], None]): Optional callback receiving the number
+            of portfolio rows processed so far.
+
+    Returns:
+        dict: 'assets', the assets with their respective impacts, and
+        'unmatched', the instrumentids without endpoint data (in portfolio order).
+    """
+    results = []
+    unmatched = {}
+    rows_done = 0
+    for portfolio_df in iter_portfolio_frames(stream, file_format):
+        assets, missing = compute_portfolio_impact(portfolio_df, column="allocation", report_unmatched=True)
+        results.extend(assets)
+        unmatched.update(dict.fromkeys(missing))
+        rows_done += len(portfolio_df)
+        if progress:
+            progress(rows_done)
+    return {"assets": results, "unmatched": list(unmatched)}
+
+
+def submit_portfolio_job(file, max_bytes=None):
+    """
+    Queue a portfolio analysis in the background.
+
+    The upload is copied into a spooled buffer first, because the request
+    stream is closed once the response is sent.
+
     Args:
         file (FileStorage): The uploaded file object.
+        max_bytes (int): Size cap for the upload, defaults to the configured limit.
+
+    Returns:
+        str: Job id to poll with `portfolio_jobs.get`.
+    """
+    file_format = detect_format(file.filename)
+    buffer = spool_upload(file, max_bytes)
+    try:
+        return portfolio_jobs.submit(_run_portfolio_job, buffer, file_format)
+    except Exception:
+        buffer.close()
+        raise
+
+
+def _run_portfolio_job(buffer, file_format, progress):
+    size = buffer.seek(0, 2)
+    buffer.seek(0)
+
+    def report(rows):
+        # Bytes consumed is only an estimate for chunked readers, never exceed 1.
+        progress(rows=rows, fraction=min(buffer.tell() / size, 1.0) if size else None)
+
+    try:
+        results = process_portfolio_stream(buffer, file_format, progress=report)
+        progress(fraction=1.0)
+        return results
+    finally:
+        buffer.close()
+
+
+def _parse_holdings(name, holdings):
+    try:
+        return (
+            [str(holding["instrumentid"]) for holding in holdings],
+            [float(holding["allocation"]) for holding in holdings],
+        )
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Portfolio '{name}': each holding needs an instrumentid and a numeric allocation.") from e
+
+
+def process_scenarios(file=None, payload=None, max_bytes=None):
+    """
+    Evaluate allocation scenarios from an uploaded matrix or a JSON request.
+
+    The upload is a wide file with an 'instrumentid' column and one column
+    per scenario. The JSON body either carries the matrix directly
+    (``{"assets": [...], "allocations": [[...], ...], "labels": [...]}``) or a
+    base portfolio and generation rules
+    (``{"portfolio": [{"instrumentid": ..., "allocation": ...}], "rules": [...]}``).
+
+    Args:
+        file (FileStorage): Uploaded allocation matrix.
+        payload (dict): Parsed JSON body, used when no file is given.
+        max_bytes (int): Size cap for the upload, defaults to the configured limit.
+
+    Returns:
+        dict: Per-scenario summaries, see `app.scenarios.run_scenarios`.
+    """
+    if file is not None:
+        stream = open_upload(file, max_bytes)
+        assets, allocations, labels = read_allocation_matrix(stream, detect_format(file.filename))
+        return run_scenarios(assets, allocations, labels)
+
+    payload = payload or {}
+    if "portfolio" in payload:
+        assets, base = _parse_holdings("portfolio", payload["portfolio"])
+        rules = payload.get("rules") or []
+        if not isinstance(rules, list):
+            raise ValueError("'rules' must be a list of scenario rules.")
+        return run_scenarios(assets, [base], rules=rules)
+
+    if "assets" not in payload or "allocations" not in payload:
+        raise ValueError("Provide an allocation file, 'assets' and 'allocations', or a 'portfolio' with 'rules'.")
+    try:
+        return run_scenarios([str(asset) for asset in payload["assets"]], payload["allocations"], payload.get("labels"))
+    except TypeError as e:
+        raise ValueError("'allocations' must be a numeric scenarios x assets matrix.") from e
+
+
+def process_comparison(files=None, payload=None, max_bytes=None):
+    """
+    Compare many portfolios submitted in one request.
+
+    Portfolios are either uploaded files (one portfolio per file, named after
+    the file) or a JSON body mapping names to holdings
+    (``{"portfolios": {"Client A": [{"instrumentid": ..., "allocation": ...}]}}``,
+    or a list of ``{"name": ..., "holdings": [...]}``).
+
+    Args:
+        files (list[FileStorage]): Uploaded portfolio files.
+        payload (dict): Parsed JSON body, used when no file is given.
+        max_bytes (int): Size cap per uploaded file, defaults to the configured limit.
 
     Returns:
-        list[dict]: List of assets with their respective impacts.
+        dict: Per-portfolio totals, damages and ranks, see `app.comparison.compare_portfolios`.
+    """
+    portfolios = {}
+    if files:
+        for file in files:
+            assets, allocations = [], []
+            stream = open_upload(file, max_bytes)
+            for frame in iter_portfolio_frames(stream, detect_format(file.filename)):
+                assets.extend(frame["instrumentid"].astype(str))
+                allocations.extend(frame["allocation"].astype(float))
+            name = file.filename
+            suffix = 2
+            while name in portfolios:
+                name = f"{file.filename} ({suffix})"
+                suffix += 1
+            portfolios[name] = (assets, allocations)
+        return compare_portfolios(portfolios)
+
+    submitted = (payload or {}).get("portfolios")
+    if isinstance(submitted, dict):
+        items = submitted.items()
+    elif isinstance(submitted, list):
+        try:
+            items = [(str(entry.get("name", i)), entry["holdings"]) for i, entry in enumerate(submitted)]
+        except (AttributeError, KeyError) as e:
+            raise ValueError("Each portfolio needs 'holdings'.") from e
+    else:
+        raise ValueError("Provide portfolio files or a 'portfolios' object.")
+    for name, holdings in items:
+        portfolios[name] = _parse_holdings(name, holdings)
+    return compare_portfolios(portfolios)
+
+
+def process_substitutes(file=None, payload=None, k=3, max_bytes=None):
     """
-    # Save the uploaded file temporarily
-    upload_folder = os.getenv("UPLOAD_FOLDER", "data/uploads")
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
-    file_path = os.path.join(upload_folder, file.filename)
-    file.save(file_path)
+    Suggest lower-damage substitutes for the holdings of a portfolio.
 
-    # Read the portfolio into a DataFrame
-    portfolio_df = pd.read_excel(file_path)
+    The portfolio is an uploaded file or a JSON body
+    (``{"portfolio": [{"instrumentid": ..., "allocation": ...}]}``).
 
-    # Calculate portfolio impacts
-    results = compute_portfolio_impact(portfolio_df, column="allocation")
-    return results
+    Args:
+        file (FileStorage): Uploaded portfolio file.
+        payload (dict): Parsed JSON body, used when no file is given.
+        k (int): Substitutes per holding.
+        max_bytes (int): Size cap for the upload, defaults to the configured limit.
+
+    Returns:
+        dict: Substitutes per holding, see `app.similarity.suggest_substitutes`.
+    """
+    payload = payload or {}
+    if file is not None:
+        assets, allocations = [], []
+        stream = open_upload(file, max_bytes)
+        for frame in iter_portfolio_frames(stream, detect_format(file.filename)):
+            assets.extend(frame["instrumentid"].astype(str))
+            allocations.extend(frame["allocation"].astype(float))
+    elif "portfolio" in payload:
+        assets, allocations = _parse_holdings("portfolio", payload["portfolio"])
+    else:
+        raise ValueError("Provide a portfolio file or a 'portfolio' list.")
+    return suggest_substitutes(assets, allocations, k=k)
 
 
 def search_companies(query, limit=10, exact_match=False):
     """
     Search for companies by instrumentid or name.
 
+    Uses the trigram/full-text search index (see `app.search`) and ranks
+    exact instrumentid matches first, then prefix, substring and fuzzy matches.
+
     Args:
         query (str): Search query (instrumentid or name).
         limit (int): Maximum number of results to return.
@@ -46,74 +243,90 @@ def search_companies(query, limit=10, exact_match=False):
     Returns:
         list[dict]: List of matching companies.
     """
-    session = Session()
-    try:
-        query = query.lower()
-
-        if exact_match:
-            # Exact match by name or instrumentid
-            matches = session.query(Company).filter(
-                (Company.name.ilike(query)) |
-                (Company.instrumentid.ilike(query))
-            ).limit(limit).all()
-        else:
-            # Partial match
-            matches = session.query(Company).filter(
-                (Company.name.ilike(f"%{query}%")) |
-                (Company.instrumentid.ilike(f"%{query}%"))
-            ).limit(limit).all()
-
-        # Convert to list of dictionaries
-        return [
-            {
-                "instrumentid": match.instrumentid,
-                "name": match.name,
-                "description": match.description
-            }
-            for match in matches
-        ]
-    finally:
-        session.close()
+    with session_scope() as session:
+        matches = search(session, query, limit=limit, exact_match=exact_match)
+
+    # Convert to list of dictionaries
+    return [
+        {
+            "instrumentid": match.instrumentid,
+            "name": match.name,
+            "description": match.description
+        }
+        for match in matches
+    ]
 
 
 def get_company_details(company_id):
     """
     Get details for a specific company by instrumentid.
 
+    The company, its endpoints and its midpoints are read with a single joined
+    query on the request-scoped session. A missing description is generated in
+    the background; until it is stored the returned description is None and
+    `description_pending` is set. Universe-wide percentiles of every midpoint
+    and endpoint come from the precomputed peer statistics.
+
     Args:
         company_id (str): The instrumentid of the company.
 
     Returns:
-        dict: Company details including impacts, midpoints, and description.
+        dict: Company details including impacts, midpoints, peer percentiles
+            and description.
     """
-    session = Session()
-    try:
-        # Query the company
-        company = session.query(Company).filter_by(instrumentid=company_id).first()
-        if not company:
-            raise ValueError(f"Company with ID {company_id} not found.")
-
-        # Check if description exists
-        if not company.description or company.description.strip() == "":
-            # Generate a new description
-            description = generate_company_description(company.name)
-            company.description = description  # Update the description in the database
-            session.commit()  # Save changes
-        else:
-            description = company.description
-
-        # Compute the impact for a single company
-        impact = compute_asset_impact(company_id, 100)  # Assume 100% allocation
-
-        # Compute midpoints for a single company
-        midpoints = compute_asset_midpoint(company_id)
-
-        return {
-            "company_id": company_id,
-            "company_name": company.name,
-            "impact": impact,
-            "midpoints": midpoints,
-            "description": description,
-        }
-    finally:
-        session.close()
+    with session_scope() as session:
+        company = fetch_company_bundle(session, company_id)
+    if not company:
+        raise ValueError(f"Company with ID {company_id} not found.")
+
+    # Check if description exists
+    if is_missing_description(company.description):
+        # Generate it in the background; the page shows a placeholder meanwhile
+        description_worker.request(company_id, company.name)
+        description = None
+    else:
+        description = company.description
+
+    values = company._mapping
+    if company.endpoint_id is None:
+        raise ValueError(f"Endpoints for asset {company_id} not found.")
+    if company.midpoint_id is None:
+        raise ValueError(f"Midpoints for asset {company_id} not found.")
+
+    percentiles = peer_stats.percentiles(company_id)
+    return {
+        "company_id": company_id,
+        "company_name": company.name,
+        "impact": asset_impact(values, 100),  # Assume 100% allocation
+        "midpoints": asset_midpoint(values),
+        "midpoint_percentiles": {
+            label: percentiles["midpoints"][name] for name, label in MIDPOINT_LABELS.items()
+        },
+        "endpoint_percentiles": percentiles["endpoints"],
+        "description": description,
+        "description_pending": description is None,
+    }
+
+
+def get_company_description(company_id):
+    """
+    Get the stored description of a company, without generating one.
+
+    Args:
+        company_id (str): The instrumentid of the company.
+
+    Returns:
+        dict: The description (None while missing) and whether generation is in flight.
+    """
+    with session_scope() as session:
+        stored = session.execute(
+            select(Company.description).where(Company.instrumentid == company_id)
+        ).first()
+    if not stored:
+        raise ValueError(f"Company with ID {company_id} not found.")
+    description = None if is_missing_description(stored.description) else stored.description
+    return {
+        "company_id": company_id,
+        "description": description,
+        "pending": description is None and description_worker.pending(company_id),
+    }
@@ -0,0 +1,304 @@
+import logging
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from .data_version import data_version
+from .database_setup import Company
+from .functions import LOOKUP_CHUNK_SIZE
+from .impact_store import impact_store, ENDPOINT_COLUMNS
+from .peer_stats import peer_stats
+from .repository import session_scope
+
+logger = logging.getLogger(__name__)
+
+# Endpoint columns in the feature vectors; the scores are derived from these.
+FEATURE_ENDPOINTS = ENDPOINT_COLUMNS[:3]
+
+# Distances computed per matrix product (queries x universe rows), about 16 MB of float32.
+BLOCK_CELLS = 1 << 22
+
+
+def feature_matrix(endpoints, midpoints):
+    """
+    Build normalized impact vectors for the companies present in both tables.
+
+    Midpoints span several orders of magnitude, so they are log-scaled
+    (``sign(x) * log1p(|x|)``) before every column is standardized to zero
+    mean and unit variance. Missing values become the column mean (0).
+
+    Args:
+        endpoints (ImpactTable): Endpoint values.
+        midpoints (ImpactTable): Midpoint values.
+
+    Returns:
+        tuple[ndarray, ndarray, ndarray]: Instrumentids, float32 vectors of
+        shape (companies, features) and positive scores.
+    """
+    rows, found = midpoints.take(endpoints.ids)
+    ids = endpoints.ids[found]
+    midpoint_values = midpoints.values[rows[found]]
+    endpoint_values = endpoints.values[found]
+    damage = endpoint_values[:, [ENDPOINT_COLUMNS.index(name) for name in FEATURE_ENDPOINTS]]
+    features = np.hstack([damage, np.sign(midpoint_values) * np.log1p(np.abs(midpoint_values))])
+
+    mean = np.zeros(features.shape[1])
+    std = np.ones(features.shape[1])
+    if len(features):
+        present = ~np.isnan(features)
+        counts = np.maximum(present.sum(axis=0), 1)
+        mean = np.where(present, features, 0).sum(axis=0) / counts
+        std = np.sqrt(np.where(present, (features - mean) ** 2, 0).sum(axis=0) / counts)
+    features = (features - mean) / np.where(std > 0, std, 1)
+    features[np.isnan(features)] = 0.0
+    scores = endpoint_values[:, ENDPOINT_COLUMNS.index("positive_score")]
+    return ids, np.ascontiguousarray(features, dtype=np.float32), scores
+
+
+class SimilarityIndex:
+    """
+    Exact k-nearest-neighbour index over normalized impact vectors.
+
+    Queries compare against the whole universe with blocked matrix products
+    (``|a - b|² = |a|² + |b|² - 2 a·b``), keeping a running top-k per query,
+    so a batch of queries costs a few BLAS calls rather than a Python loop.
+
+    Attributes:
+        ids (ndarray): Instrumentids, one per indexed company.
+        vectors (ndarray): float32 feature vectors, see `feature_matrix`.
+        scores (ndarray): Positive score of each company (NaN if missing).
+        index (dict): Mapping of instrumentid to row number.
+    """
+
+    def __init__(self, ids, vectors, scores):
+        self.ids = ids
+        self.vectors = vectors
+        self.scores = scores
+        self.norms = np.einsum("ij,ij->i", vectors, vectors)
+        self.index = {asset: row for row, asset in enumerate(ids)}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, rows, k=10, better_only=False, block_cells=BLOCK_CELLS):
+        """
+        Find the nearest neighbours of indexed companies.
+
+        Args:
+            rows (Sequence[int]): Row numbers of the query companies.
+            k (int): Neighbours per query; the query itself is never returned.
+            better_only (bool): Only return companies with a strictly higher
+                positive score than the query (lower-damage alternatives).
+            block_cells (int): Distances computed per matrix product; the
+                universe is split into blocks of ``block_cells / len(rows)`` rows.
+
+        Returns:
+            tuple[ndarray, ndarray]: Neighbour rows and Euclidean distances,
+            both of shape (len(rows), k), nearest first. Missing neighbours
+            have row -1 and distance inf.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        queries = self.vectors[rows]
+        query_norms = self.norms[rows]
+        query_scores = self.scores[rows]
+        k = max(0, min(k, len(self) - 1))
+        best_rows = np.full((len(rows), k), -1, dtype=np.intp)
+        best = np.full((len(rows), k), np.inf, dtype=np.float32)
+        if k == 0 or len(rows) == 0:
+            return best_rows, best
+
+        block_rows = max(k + 1, block_cells // len(rows))
+        for start in range(0, len(self), block_rows):
+            stop = min(start + block_rows, len(self))
+            distances = queries @ self.vectors[start:stop].T
+            distances *= -2
+            distances += query_norms[:, None]
+            distances += self.norms[start:stop]
+            # Exclude the query itself and, on request, companies that are not better
+            own = (rows >= start) & (rows < stop)
+            distances[own, rows[own] - start] = np.inf
+            if better_only:
+                with np.errstate(invalid="ignore"):
+                    distances[~(self.scores[start:stop] > query_scores[:, None])] = np.inf
+
+            # Top k of the block, merged with the top k so far
+            if distances.shape[1] > k:
+                nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                distances = np.take_along_axis(distances, nearest, axis=1)
+            else:
+                nearest = np.broadcast_to(np.arange(distances.shape[1]), distances.shape)
+            candidates = np.concatenate([best, distances], axis=1)
+            candidate_rows = np.concatenate([best_rows, nearest + start], axis=1)
+            keep = np.argpartition(candidates, k - 1, axis=1)[:, :k]
+            best = np.take_along_axis(candidates, keep, axis=1)
+            best_rows = np.take_along_axis(candidate_rows, keep, axis=1)
+
+        order = np.argsort(best, axis=1, kind="stable")
+        best = np.take_along_axis(best, order, axis=1)
+        best_rows = np.take_along_axis(best_rows, order, axis=1)
+        best_rows[np.isinf(best)] = -1
+        return best_rows, np.sqrt(np.maximum(best, 0))
+
+
+class Similarity:
+    """
+    Lazily built `SimilarityIndex`, rebuilt when the underlying data changes.
+
+    The index is built from the impact store when it is loaded, otherwise
+    from the tables read for the peer statistics, so no extra query is needed.
+    It is rebuilt when those tables are replaced or the persisted data
+    version changes; an index in use is rebuilt in the background by the
+    data-version monitor rather than by the next request.
+    """
+
+    def __init__(self):
+        self._built = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, *_):
+        self._built = None
+
+    def refresh(self, *_):
+        """Rebuild after a data change, if the index was built before."""
+        if self._built is not None:
+            self.invalidate()
+            self.index()
+
+    @staticmethod
+    def _tables():
+        if impact_store.loaded:
+            return impact_store.endpoints, impact_store.midpoints
+        return peer_stats.endpoints.table, peer_stats.midpoints.table
+
+    @staticmethod
+    def _is_current(built, tables):
+        return (
+            built is not None
+            and built[0][0] is tables[0] and built[0][1] is tables[1]
+            and built[1] == data_version.current
+        )
+
+    def index(self):
+        tables = self._tables()
+        built = self._built
+        if not self._is_current(built, tables):
+            with self._lock:
+                built = self._built
+                if not self._is_current(built, tables):
+                    start = time.perf_counter()
+                    built = self._built = (tables, data_version.current, SimilarityIndex(*feature_matrix(*tables)))
+                    logger.info(
+                        "Similarity index built for %d companies in %.1f ms",
+                        len(built[2]), (time.perf_counter() - start) * 1000,
+                    )
+        return built[2]
+
+
+# Shared index used by the similar-company and substitute routes.
+similarity = Similarity()
+data_version.subscribe(similarity.refresh)
+
+
+def _company_names(ids, chunk_size=LOOKUP_CHUNK_SIZE):
+    ids = list(dict.fromkeys(ids))
+    names = {}
+    if not ids:
+        return names
+    with session_scope() as session:
+        for start in range(0, len(ids), chunk_size):
+            chunk = ids[start:start + chunk_size]
+            names.update(session.execute(
+                select(Company.instrumentid, Company.name).where(Company.instrumentid.in_(chunk))
+            ).all())
+    return names
+
+
+def _neighbours(index, rows, distances, query_score):
+    return [
+        {
+            "instrumentid": str(index.ids[row]),
+            "distance": float(distance),
+            "positive_score": None if np.isnan(index.scores[row]) else float(index.scores[row]) * 100,
+            "score_gain": None if np.isnan(query_score) or np.isnan(index.scores[row])
+            else float(index.scores[row] - query_score) * 100,
+        }
+        for row, distance in zip(rows, distances) if row >= 0
+    ]
+
+
+def similar_companies(company_id, k=10, better_only=False):
+    """
+    Find the companies with the most similar biodiversity footprint.
+
+    Args:
+        company_id (str): The instrumentid of the company.
+        k (int): Number of companies to return.
+        better_only (bool): Only return companies with a higher positive score.
+
+    Returns:
+        dict: The company and its neighbours (instrumentid, name, distance,
+        positive score and score gain over the company), nearest first.
+    """
+    index = similarity.index()
+    row = index.index.get(company_id)
+    if row is None:
+        raise ValueError(f"Impact data for asset {company_id} not found.")
+    rows, distances = index.search([row], k, better_only=better_only)
+    neighbours = _neighbours(index, rows[0], distances[0], index.scores[row])
+    names = _company_names([company_id] + [item["instrumentid"] for item in neighbours])
+    for item in neighbours:
+        item["name"] = names.get(item["instrumentid"])
+    score = index.scores[row]
+    return {
+        "instrumentid": company_id,
+        "name": names.get(company_id),
+        "positive_score": None if np.isnan(score) else float(score) * 100,
+        "similar": neighbours,
+    }
+
+
+def suggest_substitutes(assets, allocations, k=3):
+    """
+    Suggest lower-damage alternatives for every holding of a portfolio.
+
+    Each distinct holding is matched to its `k` most similar companies with a
+    higher positive score, all holdings in one batched index query.
+
+    Args:
+        assets (Sequence[str]): Instrumentids of the holdings.
+        allocations (Sequence[float]): Allocation of each holding.
+        k (int): Substitutes per holding.
+
+    Returns:
+        dict: Per holding (in portfolio order, allocations of repeated ids
+        summed) its positive score and substitutes, and the unmatched ids.
+    """
+    index = similarity.index()
+    totals = {}
+    for asset, allocation in zip(assets, allocations):
+        totals[asset] = totals.get(asset, 0.0) + float(allocation)
+    matched = [asset for asset in totals if asset in index.index]
+    unmatched = [asset for asset in totals if asset not in index.index]
+
+    query_rows = [index.index[asset] for asset in matched]
+    rows, distances = index.search(query_rows, k, better_only=True)
+    holdings = []
+    for asset, row, neighbour_rows, neighbour_distances in zip(matched, query_rows, rows, distances):
+        score = index.scores[row]
+        holdings.append({
+            "instrumentid": asset,
+            "allocation": totals[asset],
+            "positive_score": None if np.isnan(score) else float(score) * 100,
+            "substitutes": _neighbours(index, neighbour_rows, neighbour_distances, score),
+        })
+
+    names = _company_names(
+        matched + [item["instrumentid"] for holding in holdings for item in holding["substitutes"]]
+    )
+    for holding in holdings:
+        holding["name"] = names.get(holding["instrumentid"])
+        for item in holding["substitutes"]:
+            item["name"] = names.get(item["instrumentid"])
+    return {"holdings": holdings, "unmatched": unmatched}
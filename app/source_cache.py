@@ -0,0 +1,209 @@
+import hashlib
+import importlib.util
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+# Default location of the Parquet copies of the migration inputs.
+CACHE_DIR = os.path.join("data", ".parquet_cache")
+
+_UNSAFE = re.compile(r"[^\w.-]+")
+
+
+def file_digest(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_sheet(path, sheet, index_col):
+    """Parse one workbook sheet (module level so it can run in a worker process)."""
+    return pd.read_excel(path, sheet_name=sheet, index_col=index_col)
+
+
+class ParquetCache:
+    """
+    Parquet copies of slow-to-parse source files (Excel workbooks, CSVs).
+
+    Each cached frame has a JSON manifest recording the source's mtime, size
+    and SHA-256. A cached frame is served while the mtime and size match; if
+    only the mtime changed the file is re-hashed, so touching a file does not
+    force a re-parse. Without pyarrow the cache is disabled and every read
+    goes to the source.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.enabled = importlib.util.find_spec("pyarrow") is not None
+
+    def _paths(self, source, part):
+        name = os.path.basename(source) + (f".{part}" if part else "")
+        base = os.path.join(self.cache_dir, _UNSAFE.sub("_", name))
+        return base + ".parquet", base + ".json"
+
+    def _fresh(self, source, manifest_path):
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return False
+        stat = os.stat(source)
+        if manifest.get("size") != stat.st_size:
+            return False
+        if manifest.get("mtime_ns") == stat.st_mtime_ns:
+            return True
+        if manifest.get("sha256") != file_digest(source):
+            return False
+        # Same content under a new mtime: remember it to skip the hash next time
+        manifest["mtime_ns"] = stat.st_mtime_ns
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+        return True
+
+    def get(self, source, part=None):
+        """
+        Get the cached frame of a source.
+
+        Args:
+            source (str): Path of the source file.
+            part (str): Part of the source, e.g. a sheet name.
+
+        Returns:
+            DataFrame | None: The cached frame, or None if missing or stale.
+        """
+        if not self.enabled:
+            return None
+        parquet_path, manifest_path = self._paths(source, part)
+        if not os.path.exists(parquet_path) or not self._fresh(source, manifest_path):
+            return None
+        return pd.read_parquet(parquet_path)
+
+    def put(self, source, frame, part=None):
+        """
+        Cache a frame parsed from `source`.
+
+        Args:
+            source (str): Path of the source file.
+            frame (DataFrame): The parsed data.
+            part (str): Part of the source, e.g. a sheet name.
+        """
+        if not self.enabled:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        parquet_path, manifest_path = self._paths(source, part)
+        frame.to_parquet(parquet_path)
+        self._write_manifest(source, manifest_path, part)
+
+    @staticmethod
+    def _write_manifest(source, manifest_path, part):
+        stat = os.stat(source)
+        with open(manifest_path, "w") as f:
+            json.dump({
+                "source": os.path.abspath(source),
+                "part": part,
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": file_digest(source),
+            }, f)
+
+    def iter_csv(self, source, chunk_rows, **options):
+        """
+        Read a CSV file in chunks, from the cache when it is fresh.
+
+        A fresh cache is streamed batch by batch from the Parquet file. On a
+        miss the CSV is parsed in chunks, and each chunk is appended to a new
+        Parquet copy as it is yielded, so at most one chunk is in memory
+        either way. The copy only replaces the cache once the file was read
+        to the end.
+
+        Args:
+            source (str): Path of the CSV file.
+            chunk_rows (int): Rows per chunk.
+            **options: Passed to `pandas.read_csv`.
+
+        Yields:
+            DataFrame: Consecutive chunks of the file.
+        """
+        parquet_path, manifest_path = self._paths(source, None)
+        if self.enabled and os.path.exists(parquet_path) and self._fresh(source, manifest_path):
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+            return
+
+        writer = None
+        tmp_path = parquet_path + ".tmp"
+        try:
+            for chunk in pd.read_csv(source, chunksize=chunk_rows, **options):
+                if self.enabled:
+                    writer = self._append(writer, tmp_path, chunk)
+                yield chunk
+            if writer:
+                writer.close()
+                writer = None
+                os.replace(tmp_path, parquet_path)
+                self._write_manifest(source, manifest_path, None)
+        finally:
+            if writer:
+                writer.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _append(self, writer, path, chunk):
+        """
+        Append a chunk to a Parquet file being written; returns the writer, or
+        False once caching was abandoned because a chunk's types do not fit
+        the file's schema.
+        """
+        if writer is False:
+            return False
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            writer = pq.ParquetWriter(path, table.schema)
+        try:
+            writer.write_table(table.cast(writer.schema))
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError):
+            writer.close()
+            os.remove(path)
+            return False
+        return writer
+
+    def read_sheets(self, source, sheets, index_col=0, max_workers=None):
+        """
+        Read several sheets of a workbook, parsing the stale ones in parallel.
+
+        Args:
+            source (str): Path of the workbook.
+            sheets (Iterable[str]): Sheet names.
+            index_col (int): Column used as the index of every sheet.
+            max_workers (int): Parser processes, defaults to one per stale sheet.
+
+        Returns:
+            dict: Sheet name -> DataFrame, in `sheets` order.
+        """
+        frames = {sheet: self.get(source, sheet) for sheet in sheets}
+        stale = [sheet for sheet, frame in frames.items() if frame is None]
+        if len(stale) == 1:
+            frames[stale[0]] = _read_sheet(source, stale[0], index_col)
+        elif stale:
+            # Excel parsing is pure Python, so sheets are parsed in separate processes
+            workers = min(len(stale), max_workers or os.cpu_count() or 1)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = {sheet: pool.submit(_read_sheet, source, sheet, index_col) for sheet in stale}
+                frames.update((sheet, future.result()) for sheet, future in futures.items())
+        for sheet in stale:
+            self.put(source, frames[sheet], sheet)
+        return frames
+
+
+# Shared instance used by the migration.
+source_cache = ParquetCache()
@@ -0,0 +1,167 @@
+import bisect
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from .data_version import data_version
+from .database_setup import Session, Company
+from .impact_store import impact_store
+
+# Upper bound appended to a prefix to find the end of its range in a sorted list.
+_PREFIX_END = "\U0010ffff"
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(value):
+    """
+    Normalize text for prefix matching: strip accents, casefold, and collapse
+    punctuation and whitespace into single spaces.
+    """
+    value = unicodedata.normalize("NFKD", value or "")
+    value = "".join(ch for ch in value if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", value.casefold()).strip()
+
+
+class PrefixIndex:
+    """
+    Sorted-array prefix index over company instrumentids and names.
+
+    Three sorted key lists are kept, searched in order of relevance:
+    instrumentids, full names, and every word of a name (so "corp" finds
+    "Alpha Corp"). A lookup bisects each list to the range of keys starting
+    with the prefix and walks it until enough distinct companies are found,
+    which keeps lookups independent of the universe size.
+    """
+
+    def __init__(self, companies):
+        self.ids = []
+        self.names = []
+        id_keys, name_keys, word_keys = [], [], []
+        for position, (instrumentid, name) in enumerate(companies):
+            self.ids.append(instrumentid)
+            self.names.append(name)
+            id_keys.append((normalize(instrumentid), position))
+            full_name = normalize(name)
+            name_keys.append((full_name, position))
+            words = full_name.split(" ")
+            for start in range(1, len(words)):
+                word_keys.append((" ".join(words[start:]), position))
+
+        self._lists = []
+        for keys in (id_keys, name_keys, word_keys):
+            keys.sort()
+            self._lists.append(([key for key, _ in keys], [position for _, position in keys]))
+        self.built_at = time.time()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def lookup(self, prefix, limit=10):
+        """
+        Find companies whose instrumentid, name or a name word starts with `prefix`.
+
+        Args:
+            prefix (str): Raw user input.
+            limit (int): Maximum number of companies to return.
+
+        Returns:
+            list[dict]: Companies with instrumentid and name, best matches first.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        found = []
+        seen = set()
+        for keys, positions in self._lists:
+            start = bisect.bisect_left(keys, prefix)
+            end = bisect.bisect_right(keys, prefix + _PREFIX_END, lo=start)
+            for i in range(start, end):
+                position = positions[i]
+                if position not in seen:
+                    seen.add(position)
+                    found.append({"instrumentid": self.ids[position], "name": self.names[position]})
+                    if len(found) >= limit:
+                        return found
+        return found
+
+
+class Typeahead:
+    """
+    Lazily built `PrefixIndex` with an LRU cache of recent lookups.
+
+    The index is rebuilt on first use after the reference data was reloaded,
+    or once it is older than `max_age` seconds (so companies added to the
+    database show up even when the impact store is off).
+    """
+
+    def __init__(self, cache_size=2048, max_age=3600):
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self._index = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+
+    def invalidate(self, *_):
+        with self._lock:
+            self._index = None
+            self._cache.clear()
+
+    def _build(self):
+        session = Session()
+        try:
+            companies = session.query(Company.instrumentid, Company.name).all()
+        finally:
+            session.close()
+        return PrefixIndex(companies)
+
+    def _stale(self, index):
+        return index is None or (self.max_age and time.time() - index.built_at > self.max_age)
+
+    def index(self):
+        index = self._index
+        if self._stale(index):
+            # One thread builds; the others wait for its index instead of building their own
+            with self._build_lock:
+                index = self._index
+                if self._stale(index):
+                    index = self._build()
+                    with self._lock:
+                        self._index = index
+                        self._cache.clear()
+        return index
+
+    def lookup(self, prefix, limit=10):
+        """
+        Autocomplete a prefix, served from the LRU cache when possible.
+
+        Args:
+            prefix (str): Raw user input.
+            limit (int): Maximum number of companies to return.
+
+        Returns:
+            list[dict]: Companies with instrumentid and name.
+        """
+        # Refresh a stale index (and drop its cached lookups) before using the cache
+        index = self.index()
+        key = (normalize(prefix), limit)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        results = index.lookup(prefix, limit)
+
+        with self._lock:
+            self._cache[key] = results
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+
+typeahead = Typeahead()
+impact_store.subscribe(typeahead.invalidate)
+data_version.subscribe(typeahead.invalidate)
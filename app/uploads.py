@@ -0,0 +1,223 @@
+import os
+import tempfile
+
+from flask import current_app, has_app_context
+
+# pandas is imported by the parsers themselves, so importing the app does not load it.
+
+# Hard cap on the size of an uploaded portfolio file.
+DEFAULT_MAX_UPLOAD_BYTES = 50 * 1024 * 1024
+
+# Uploads smaller than this stay in memory when spooled; larger ones roll over
+# to an anonymous temporary file that is removed when closed.
+SPOOL_MEMORY_BYTES = 8 * 1024 * 1024
+
+# Rows per DataFrame when reading CSV/Parquet portfolios incrementally.
+CHUNK_ROWS = 50_000
+
+# Only these columns are ever used downstream.
+PORTFOLIO_COLUMNS = ("instrumentid", "name", "allocation")
+
+SUPPORTED_FORMATS = {
+    ".xlsx": "xlsx",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+def upload_limit():
+    """Return the configured upload size cap in bytes."""
+    if has_app_context():
+        return current_app.config.get("MAX_PORTFOLIO_UPLOAD_BYTES", DEFAULT_MAX_UPLOAD_BYTES)
+    return DEFAULT_MAX_UPLOAD_BYTES
+
+
+def detect_format(filename):
+    """
+    Determine the portfolio file format from its name.
+
+    Args:
+        filename (str): Client-side filename of the upload.
+
+    Returns:
+        str: One of 'xlsx', 'csv' or 'parquet'.
+    """
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in SUPPORTED_FORMATS:
+        allowed = ", ".join(sorted(SUPPORTED_FORMATS))
+        raise ValueError(f"Unsupported portfolio file type '{extension}'. Use one of: {allowed}.")
+    return SUPPORTED_FORMATS[extension]
+
+
+def _stream_size(stream):
+    """Return the size of a seekable stream without consuming it, or None."""
+    try:
+        position = stream.tell()
+        size = stream.seek(0, os.SEEK_END)
+        stream.seek(position)
+        return size
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _check_size(size, max_bytes):
+    if size > max_bytes:
+        raise ValueError(f"Portfolio file is too large ({size} bytes, limit is {max_bytes} bytes).")
+
+
+def open_upload(file, max_bytes=None):
+    """
+    Get a readable, seekable stream over an upload without writing it to disk.
+
+    The request stream is used directly when it is seekable; otherwise it is
+    copied into a spooled buffer.
+
+    Args:
+        file (FileStorage): The uploaded file object.
+        max_bytes (int): Size cap, defaults to the configured limit.
+
+    Returns:
+        IO[bytes]: Stream positioned at the start of the upload.
+    """
+    max_bytes = max_bytes or upload_limit()
+    size = _stream_size(file.stream)
+    if size is None:
+        return spool_upload(file, max_bytes)
+    _check_size(size, max_bytes)
+    file.stream.seek(0)
+    return file.stream
+
+
+def spool_upload(file, max_bytes=None):
+    """
+    Copy an upload into a spooled buffer owned by the caller.
+
+    Use this when the data must outlive the request (the request stream is
+    closed once the response is sent).
+
+    Args:
+        file (FileStorage): The uploaded file object.
+        max_bytes (int): Size cap, defaults to the configured limit.
+
+    Returns:
+        SpooledTemporaryFile: Buffer positioned at the start of the upload.
+    """
+    max_bytes = max_bytes or upload_limit()
+    buffer = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    copied = 0
+    try:
+        while True:
+            block = file.stream.read(64 * 1024)
+            if not block:
+                break
+            copied += len(block)
+            _check_size(copied, max_bytes)
+            buffer.write(block)
+    except Exception:
+        buffer.close()
+        raise
+    buffer.seek(0)
+    return buffer
+
+
+def iter_portfolio_frames(stream, file_format, chunk_rows=CHUNK_ROWS):
+    """
+    Parse a portfolio stream into DataFrames.
+
+    CSV and Parquet files are read incrementally in chunks of `chunk_rows`
+    rows so memory stays flat for very large portfolios; XLSX files are read
+    in one piece.
+
+    Args:
+        stream (IO[bytes]): Readable stream positioned at the start of the file.
+        file_format (str): One of 'xlsx', 'csv' or 'parquet'.
+        chunk_rows (int): Rows per yielded DataFrame for chunked formats.
+
+    Yields:
+        DataFrame: Portfolio rows restricted to the known columns.
+    """
+    import pandas as pd
+
+    if file_format == "csv":
+        reader = pd.read_csv(
+            stream,
+            usecols=lambda column: column in PORTFOLIO_COLUMNS,
+            dtype={"instrumentid": str},
+            chunksize=chunk_rows,
+        )
+        with reader:
+            for frame in reader:
+                yield _validate(frame)
+
+    elif file_format == "parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ValueError("Parquet uploads require the 'pyarrow' package.") from e
+        parquet_file = pq.ParquetFile(stream)
+        columns = [name for name in parquet_file.schema_arrow.names if name in PORTFOLIO_COLUMNS]
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield _ids_as_str(_validate(batch.to_pandas()))
+
+    elif file_format == "xlsx":
+        frame = pd.read_excel(stream, dtype={"instrumentid": str})
+        yield _validate(frame[[c for c in frame.columns if c in PORTFOLIO_COLUMNS]])
+
+    else:
+        raise ValueError(f"Unsupported portfolio file format '{file_format}'.")
+
+
+def _validate(frame):
+    missing = {"instrumentid", "allocation"} - set(frame.columns)
+    if missing:
+        raise ValueError(f"Portfolio file is missing required column(s): {', '.join(sorted(missing))}.")
+    return frame
+
+
+def _ids_as_str(frame):
+    # Parquet keeps the column's own type; ids are matched as strings, like the CSV/XLSX dtype
+    ids = frame["instrumentid"]
+    frame["instrumentid"] = ids.where(ids.isna(), ids.astype(str))
+    return frame
+
+
+def read_allocation_matrix(stream, file_format):
+    """
+    Parse a wide allocation matrix: one row per asset, one column per scenario.
+
+    The file needs an 'instrumentid' column; every other numeric column
+    (except 'name') is a scenario, labelled by its header.
+
+    Args:
+        stream (IO[bytes]): Readable stream positioned at the start of the file.
+        file_format (str): One of 'xlsx', 'csv' or 'parquet'.
+
+    Returns:
+        tuple[list[str], ndarray, list[str]]: Asset ids, the allocation matrix
+        of shape (scenarios, assets) and the scenario labels.
+    """
+    import pandas as pd
+
+    if file_format == "csv":
+        frame = pd.read_csv(stream, dtype={"instrumentid": str})
+    elif file_format == "parquet":
+        try:
+            frame = pd.read_parquet(stream)
+        except ImportError as e:
+            raise ValueError("Parquet uploads require the 'pyarrow' package.") from e
+    elif file_format == "xlsx":
+        frame = pd.read_excel(stream, dtype={"instrumentid": str})
+    else:
+        raise ValueError(f"Unsupported portfolio file format '{file_format}'.")
+
+    if "instrumentid" not in frame.columns:
+        raise ValueError("Allocation file is missing required column(s): instrumentid.")
+    scenarios = [
+        column for column in frame.columns
+        if column not in ("instrumentid", "name") and pd.api.types.is_numeric_dtype(frame[column])
+    ]
+    if not scenarios:
+        raise ValueError("Allocation file has no numeric scenario columns.")
+    matrix = frame[scenarios].fillna(0.0).to_numpy(dtype=float).T
+    return frame["instrumentid"].astype(str).tolist(), matrix, [str(column) for column in scenarios]
@@ -0,0 +1,91 @@
+import threading
+import time
+from collections import OrderedDict
+
+from flask_login import UserMixin
+from sqlalchemy import select
+
+from .database_setup import User
+from .repository import session_scope
+
+
+class CachedUser(UserMixin):
+    """
+    Lightweight, session-independent copy of a `User` for Flask-Login.
+
+    The password hash is deliberately not copied.
+    """
+
+    def __init__(self, id, username, email, active):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.active = active
+
+    @property
+    def is_active(self):
+        return bool(self.active) if self.active is not None else True
+
+    def __repr__(self):
+        return f"<CachedUser {self.id} {self.username!r}>"
+
+
+class UserCache:
+    """
+    Short-TTL, size-bounded cache of logged-in users.
+
+    Flask-Login loads the user on every authenticated request; serving it
+    from here avoids a query per request. Entries expire after `ttl` seconds
+    and the least recently used are dropped beyond `max_entries`.
+    """
+
+    def __init__(self, ttl=60, max_entries=10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        Get a user, loading it on a miss with the request-scoped session.
+
+        Args:
+            user_id (int): The user id.
+
+        Returns:
+            CachedUser | None: The user, or None if it does not exist.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                return entry[1]
+
+        with session_scope() as session:
+            row = session.execute(
+                select(User.id, User.username, User.email, User.active).where(User.id == user_id)
+            ).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        user = CachedUser(*row)
+        with self._lock:
+            self._entries[user_id] = (now + self.ttl, user)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return user
+
+    def invalidate(self, user_id):
+        """Drop a user, e.g. on signup, logout or deactivation."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
@@ -1,39 +1,146 @@
-from openai import OpenAI
 import os
+import logging
+import threading
+import time
+from types import SimpleNamespace
 from dotenv import load_dotenv
+from .metrics import metrics
 
 # Load environment variables
 load_dotenv()
 
-# Database URL from .env file
-client = OpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),  # This is the default and can be omitted
-)
+logger = logging.getLogger(__name__)
 
-def generate_company_description(company_name):
+# OpenAI client, created on first use so importing this module neither needs an
+# API key nor pays for importing the SDK
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    """
+    Return the shared OpenAI client, creating it on first use.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(
+                    api_key=os.getenv("OPENAI_API_KEY"),  # This is the default and can be omitted
+                )
+    return _client
+
+
+def set_openai_client(client):
+    """
+    Replace the shared OpenAI client, e.g. with a `StubOpenAIClient` in tests.
+    """
+    global _client
+    _client = client
+
+
+class StubOpenAIClient:
+    """
+    Offline stand-in for the OpenAI client exposing `chat.completions.create`.
+
+    Returns a canned description after an optional delay, so description
+    generation can be exercised without network access or API quota.
+    """
+
+    def __init__(self, content="{company} is a company. (Stub description.)", delay=0.0):
+        self.content = content
+        self.delay = delay
+        self.calls = 0
+        self.chat = self
+        self.completions = self
+
+    def create(self, model, messages, **kwargs):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        prompt = messages[-1]["content"]
+        company = prompt.split("of the company ", 1)[-1].split(". Use", 1)[0]
+        message = SimpleNamespace(content=self.content.format(company=company))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+DESCRIPTION_MODEL = "gpt-4o-mini"
+DESCRIPTION_SYSTEM_PROMPT = "You are a sustainable financial analyst specialized in biodiversity loss. You never use markdowns."
+DESCRIPTION_PROMPT = "Write a detailed but concise description of the company {company_name}. Use max 150 words"
+
+# Persistent response cache, see `configure_llm_cache`
+llm_cache = None
+
+
+def configure_llm_cache(path, ttl=None, max_entries=None):
+    """
+    Enable the persistent LLM response cache.
+
+    Args:
+        path (str): SQLite file holding the cache; None disables caching.
+        ttl (int): Seconds an entry stays valid.
+        max_entries (int): Maximum number of stored responses.
+
+    Returns:
+        LLMCache | None: The active cache.
+    """
+    global llm_cache
+    from .llm_cache import LLMCache
+
+    if llm_cache is not None:
+        llm_cache.close()
+    llm_cache = None
+    if path:
+        options = {k: v for k, v in {"ttl": ttl, "max_entries": max_entries}.items() if v is not None}
+        llm_cache = LLMCache(path, **options)
+    return llm_cache
+
+
+def generate_company_description(company_name, client=None):
     """
     Generates an AI-written description for a given company using OpenAI's GPT-4o-mini model.
+
+    Responses are served from and stored in the persistent LLM cache when it
+    is configured. Failures are logged and return None; they are never cached.
     """
+    cache_key = None
+    if llm_cache is not None:
+        cache_key = llm_cache.make_key(
+            DESCRIPTION_MODEL,
+            DESCRIPTION_SYSTEM_PROMPT + "\n" + DESCRIPTION_PROMPT,
+            company_name=company_name,
+        )
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
     try:
         # Define the prompt
-        prompt = f"Write a detailed but concise description of the company {company_name}. Use max 150 words"
+        prompt = DESCRIPTION_PROMPT.format(company_name=company_name)
 
         # Call the OpenAI API
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a sustainable financial analyst specialized in biodiversity loss. You never use markdowns."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,  # Adjust creativity level
-            max_tokens=250    # Limit response length
-        )
+        with metrics.time_openai("company_description"):
+            response = (client or get_openai_client()).chat.completions.create(
+                model=DESCRIPTION_MODEL,
+                messages=[
+                    {"role": "system", "content": DESCRIPTION_SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.7,  # Adjust creativity level
+                max_tokens=250    # Limit response length
+            )
         # Extract and return the generated description
-        return response.choices[0].message.content
+        description = response.choices[0].message.content
     
-    except Exception as e:
-        # Handle errors gracefully
-        return f"An error occurred: {str(e)}"
+    except Exception:
+        # Handle errors gracefully; never persist or cache an error
+        logger.exception("Could not generate a description for %s", company_name)
+        return None
+
+    if description and cache_key is not None:
+        llm_cache.set(cache_key, DESCRIPTION_MODEL, description)
+    return description
 
 def calculate_score_color(score):
     """
@@ -0,0 +1,68 @@
+"""
+Compare two benchmark result files.
+
+Usage::
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 1.2
+
+Exits with status 1 if any benchmark's median got slower than `threshold`
+times the baseline.
+"""
+import argparse
+import json
+import sys
+
+
+def compare(baseline, candidate, threshold=1.2):
+    """
+    Compare median timings of two benchmark reports.
+
+    Args:
+        baseline (dict): Report written by `benchmarks.run`.
+        candidate (dict): Report to check against the baseline.
+        threshold (float): Slowdown ratio counted as a regression.
+
+    Returns:
+        list[dict]: Per benchmark: name, both medians, ratio and whether it regressed.
+    """
+    rows = []
+    for name, timing in candidate["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            continue
+        ratio = timing["median_ms"] / before["median_ms"] if before["median_ms"] else float("inf")
+        rows.append({
+            "name": name,
+            "baseline_ms": before["median_ms"],
+            "candidate_ms": timing["median_ms"],
+            "ratio": ratio,
+            "regressed": ratio > threshold,
+        })
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate, args.threshold)
+    width = max((len(row["name"]) for row in rows), default=0)
+    for row in rows:
+        flag = "  REGRESSION" if row["regressed"] else ""
+        print(
+            f"{row['name']:<{width}}  {row['baseline_ms']:9.3f} -> {row['candidate_ms']:9.3f} ms"
+            f"  x{row['ratio']:.2f}{flag}"
+        )
+    return 1 if any(row["regressed"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
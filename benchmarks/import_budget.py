@@ -0,0 +1,103 @@
+"""
+Check the cold-start cost of the application factory.
+
+Usage::
+
+    python -m benchmarks.import_budget --budget 0.8
+
+Each run imports `app` and calls ``create_app("testing")`` in a fresh
+interpreter, with the warm-ups scheduled as in production (``FAST_START``).
+Pass ``--database-url`` with a populated database (e.g. one built by
+`benchmarks.universe`) to include the start-up database work; with
+``--no-fast-start`` the warm-ups run inside `create_app` and count too.
+Exits with status 1 if the fastest run exceeds the budget, or if a dependency
+that should load lazily was imported during start-up.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Seconds allowed for `import app` + `create_app()`, the fastest of the runs.
+DEFAULT_BUDGET = 1.0
+
+# Heavy dependencies imported on first use only, never by create_app.
+LAZY_MODULES = ("pandas", "plotly", "openai", "flask_limiter", "pyarrow")
+
+_PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+create_app("testing", json.loads(os.environ["STARTUP_CONFIG"]))
+done = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - start,
+    "create_app_seconds": done - imported,
+    "total_seconds": done - start,
+    "modules": sorted(name for name in sys.modules if "." not in name),
+}))
+"""
+
+
+def measure_startup(runs=5, env=None, database_url=None, fast_start=True):
+    """
+    Time `create_app` in `runs` fresh interpreters.
+
+    Args:
+        runs (int): Fresh interpreters to time.
+        env (dict): Environment of the runs, defaults to this process's.
+        database_url (str): Database the app starts against, defaults to the testing config's.
+        fast_start (bool): Run the warm-ups in the background, as in production.
+
+    Returns:
+        dict: The fastest run's timings and the top-level modules it imported.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ if env is None else env)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    overrides = {"FAST_START": fast_start}
+    if database_url:
+        overrides.update(DATABASE_URL=database_url, SQLALCHEMY_DATABASE_URI=database_url)
+    env["STARTUP_CONFIG"] = json.dumps(overrides)
+    best = None
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE], capture_output=True, text=True, check=True, cwd=root, env=env,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        if best is None or result["total_seconds"] < best["total_seconds"]:
+            best = result
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fail if app start-up exceeds its time budget.")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="Seconds allowed for import + create_app")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters to time; the fastest counts")
+    parser.add_argument("--database-url", help="Start against this (populated) database")
+    parser.add_argument(
+        "--no-fast-start", dest="fast_start", action="store_false", help="Run the warm-ups inside create_app",
+    )
+    args = parser.parse_args(argv)
+
+    result = measure_startup(args.runs, database_url=args.database_url, fast_start=args.fast_start)
+    eager = [name for name in LAZY_MODULES if name in result["modules"]]
+    print(
+        f"import app {result['import_seconds'] * 1000:7.1f} ms\n"
+        f"create_app {result['create_app_seconds'] * 1000:7.1f} ms\n"
+        f"total      {result['total_seconds'] * 1000:7.1f} ms  (budget {args.budget * 1000:.0f} ms)"
+    )
+    failed = False
+    if result["total_seconds"] > args.budget:
+        print("REGRESSION: start-up exceeds its budget")
+        failed = True
+    if eager:
+        print(f"REGRESSION: imported during start-up: {', '.join(eager)}")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
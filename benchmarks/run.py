@@ -0,0 +1,214 @@
+"""
+Time the application's hot paths against a synthetic universe.
+
+Usage::
+
+    python -m benchmarks.run --companies 100000
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json
+
+Results are written as JSON to ``benchmarks/results/`` (named after the
+commit) so runs can be compared between commits. Exits with status 1 if an
+indexed search is slower than a plain ``LIKE`` scan of the same database.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from .universe import generate_universe, instrument_ids
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+# Portfolio sizes timed for compute_portfolio_impact.
+PORTFOLIO_SIZES = (10, 100, 1_000, 10_000)
+
+# Searches that must not be slower (median) than a plain LIKE scan of the same database.
+INDEXED_SEARCHES = ("exact_id", "name_prefix", "name_substring")
+
+
+def measure(fn, repeat, warmup=1):
+    """
+    Time `fn(i)` for i in range(repeat) after `warmup` untimed calls.
+
+    Returns:
+        dict: Number of runs and mean/median/p95/min/max in milliseconds.
+    """
+    for i in range(warmup):
+        fn(i)
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "mean_ms": statistics.fmean(samples),
+        "median_ms": statistics.median(samples),
+        "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+        "min_ms": samples[0],
+        "max_ms": samples[-1],
+    }
+
+
+def git_commit():
+    """Short hash of the checked-out commit, or None outside a git checkout."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(url, companies, repeat, seed=0):
+    """
+    Run every benchmark against a universe of `companies` companies.
+
+    The app is created with the testing configuration pointed at the
+    universe (`url`), and the OpenAI client is replaced with the offline stub.
+
+    Returns:
+        dict: Benchmark name -> timing summary (see `measure`).
+    """
+    import pandas as pd
+    from sqlalchemy import text
+
+    from app import create_app
+    from app.functions import compute_portfolio_impact
+    from app.impact_store import impact_store
+    from app.leaderboard import leaderboard
+    from app.repository import session_scope
+    from app.search import _params, _search_like
+    from app.services import search_companies, get_company_details
+    from app.utils import set_openai_client, StubOpenAIClient
+
+    app = create_app("testing", {"DATABASE_URL": url, "SQLALCHEMY_DATABASE_URI": url})
+    set_openai_client(StubOpenAIClient())
+    ids = instrument_ids(companies)
+    rng = random.Random(seed)
+    results = {}
+
+    with app.app_context():
+        queries = {
+            "exact_id": ids[len(ids) // 2],
+            "name_prefix": "Green",
+            "name_substring": "ine Hold",
+            "fuzzy": "Pharmaa Stel",
+        }
+        for label, query in queries.items():
+            results[f"search_companies[{label}]"] = measure(lambda i, q=query: search_companies(q), repeat)
+
+            def search_like(i, q=query):
+                with session_scope() as session:
+                    _search_like(session, _params(q.lower(), 10))
+            results[f"search_like[{label}]"] = measure(search_like, max(3, repeat // 5))
+
+        sample = rng.sample(ids, min(len(ids), repeat + 1))
+        results["get_company_details"] = measure(lambda i: get_company_details(sample[i % len(sample)]), repeat)
+
+        for store in (False, True):
+            if store:
+                impact_store.load()
+            else:
+                impact_store.clear()
+            for size in PORTFOLIO_SIZES:
+                portfolio = pd.DataFrame({
+                    "instrumentid": rng.choices(ids, k=size),
+                    "allocation": [rng.random() for _ in range(size)],
+                })
+                results[f"compute_portfolio_impact[{size},{'store' if store else 'sql'}]"] = measure(
+                    lambda i, p=portfolio: compute_portfolio_impact(p), max(3, repeat // 5),
+                )
+        impact_store.clear()
+
+        def leaderboard_sql(i):
+            with session_scope() as session:
+                for order in ("DESC", "ASC"):
+                    session.execute(text(
+                        "SELECT e.instrumentid, e.positive_score, c.name FROM endpoints e "
+                        "JOIN companies c ON c.instrumentid = e.instrumentid "
+                        f"WHERE e.positive_score IS NOT NULL ORDER BY e.positive_score {order} LIMIT 5"
+                    )).all()
+
+        def leaderboard_build(i):
+            leaderboard.invalidate()
+            leaderboard.ranking()
+
+        def leaderboard_top(i):
+            ranking = leaderboard.ranking()
+            ranking.top(5)
+            ranking.bottom(5)
+
+        results["leaderboard[sql_top_bottom]"] = measure(leaderboard_sql, repeat)
+        results["leaderboard[build]"] = measure(leaderboard_build, max(3, repeat // 5))
+        results["leaderboard[top_bottom]"] = measure(leaderboard_top, repeat)
+    return results
+
+
+def check_search(results):
+    """
+    Check that indexed searches beat a plain LIKE scan.
+
+    Returns:
+        list[str]: One message per search slower than its LIKE baseline.
+    """
+    failures = []
+    for label in INDEXED_SEARCHES:
+        indexed = results[f"search_companies[{label}]"]["median_ms"]
+        like = results[f"search_like[{label}]"]["median_ms"]
+        if indexed > like:
+            failures.append(f"search_companies[{label}] {indexed:.3f} ms is slower than LIKE ({like:.3f} ms)")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths on a synthetic universe.")
+    parser.add_argument("--companies", type=int, default=10_000, help="Universe size (10k-1M)")
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the universe and samples")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild the universe even if cached")
+    parser.add_argument("--output", help="Result file, defaults to benchmarks/results/<commit>-<size>.json")
+    args = parser.parse_args(argv)
+
+    url = generate_universe(args.companies, seed=args.seed, force=args.regenerate)
+    results = run_benchmarks(url, args.companies, args.repeat, seed=args.seed)
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "companies": args.companies,
+            "repeat": args.repeat,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{commit or 'local'}-{args.companies}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    width = max(map(len, results))
+    for name, timing in results.items():
+        print(f"{name:<{width}}  median {timing['median_ms']:9.3f} ms  p95 {timing['p95_ms']:9.3f} ms")
+    print(f"\nResults written to {output}")
+
+    failures = check_search(results)
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
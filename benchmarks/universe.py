@@ -0,0 +1,128 @@
+import os
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, func, select
+
+from app.bulk_load import finalize_tables
+from app.database_setup import Base, Company, Midpoint, Endpoint
+from app.impact_store import MIDPOINT_COLUMNS
+from app.search import ensure_search_index
+
+# Where generated universes are kept, one SQLite file per size and seed.
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Rows inserted per executemany batch.
+BATCH_ROWS = 50_000
+
+_NAME_WORDS = (
+    "Alpha", "Beta", "Global", "Green", "Blue", "North", "Pacific", "Atlantic", "United", "National",
+    "Energy", "Mining", "Foods", "Pharma", "Bank", "Capital", "Motors", "Steel", "Chemicals", "Textiles",
+    "Software", "Telecom", "Retail", "Logistics", "Water", "Forest", "Agri", "Marine", "Solar", "Holdings",
+)
+_SUFFIXES = ("Corp", "Inc", "Group", "AG", "SA", "PLC", "Ltd", "NV")
+
+
+def universe_path(companies, seed=0):
+    """Path of the SQLite file holding a universe of `companies` companies."""
+    return os.path.join(DATA_DIR, f"universe-{companies}-{seed}.db")
+
+
+def instrument_ids(companies):
+    """Instrumentids of a synthetic universe, in generation order."""
+    return [f"BM{i:07d}" for i in range(companies)]
+
+
+def _company_rows(ids, rng, start):
+    words = np.array(_NAME_WORDS, dtype=object)
+    first = words[rng.integers(len(words), size=len(ids))]
+    second = words[rng.integers(len(words), size=len(ids))]
+    suffix = np.array(_SUFFIXES, dtype=object)[rng.integers(len(_SUFFIXES), size=len(ids))]
+    described = rng.random(len(ids)) < 0.5
+    return [
+        {
+            "instrumentid": instrumentid,
+            "name": f"{a} {b} {i} {s}",
+            "description": f"{a} {b} {i} {s} is a synthetic company." if has_description else None,
+        }
+        for i, (instrumentid, a, b, s, has_description) in enumerate(zip(ids, first, second, suffix, described), start)
+    ]
+
+
+def _endpoint_rows(ids, rng):
+    damages = rng.beta(2, 5, size=(len(ids), 3))
+    average = damages.mean(axis=1)
+    return [
+        {
+            "instrumentid": instrumentid,
+            "damage_to_marine_species": float(marine),
+            "damage_to_freshwater_species": float(freshwater),
+            "damage_to_terrestrial_species": float(terrestrial),
+            "avg_score": float(avg),
+            "positive_score": float(1 - avg),
+        }
+        for instrumentid, (marine, freshwater, terrestrial), avg in zip(ids, damages, average)
+    ]
+
+
+def _midpoint_rows(ids, rng):
+    # Midpoints span several orders of magnitude, like the real data
+    values = rng.lognormal(mean=0.0, sigma=3.0, size=(len(ids), len(MIDPOINT_COLUMNS)))
+    columns = [getattr(Midpoint, name).key for name in MIDPOINT_COLUMNS]
+    return [
+        {"instrumentid": instrumentid, **dict(zip(columns, map(float, row)))}
+        for instrumentid, row in zip(ids, values)
+    ]
+
+
+def generate_universe(companies, seed=0, path=None, force=False):
+    """
+    Create a SQLite database with `companies` synthetic companies and matching
+    midpoints and endpoints, indexed like a migrated database.
+
+    An existing file with the right number of companies is reused unless
+    `force` is set.
+
+    Args:
+        companies (int): Number of companies.
+        seed (int): Random seed; the same size and seed give the same data.
+        path (str): Target file, defaults to `universe_path`.
+        force (bool): Regenerate even if the file exists.
+
+    Returns:
+        str: Database URL of the universe.
+    """
+    path = path or universe_path(companies, seed)
+    url = f"sqlite:///{os.path.abspath(path)}"
+    if os.path.exists(path) and not force:
+        engine = create_engine(url)
+        try:
+            with engine.connect() as conn:
+                if conn.execute(select(func.count()).select_from(Company)).scalar() == companies:
+                    return url
+        except Exception:
+            pass
+        finally:
+            engine.dispose()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    ids = instrument_ids(companies)
+    with engine.begin() as conn:
+        for offset in range(0, companies, BATCH_ROWS):
+            batch = ids[offset:offset + BATCH_ROWS]
+            conn.execute(Company.__table__.insert(), _company_rows(batch, rng, offset))
+            conn.execute(Endpoint.__table__.insert(), _endpoint_rows(batch, rng))
+            conn.execute(Midpoint.__table__.insert(), _midpoint_rows(batch, rng))
+
+    finalize_tables(engine, ["companies", "midpoints", "endpoints"])
+    ensure_search_index(engine, rebuild=True)
+    engine.dispose()
+    print(f"Generated {companies:,} companies in {time.perf_counter() - start:.1f}s: {path}")
+    return url
@@ -9,12 +9,66 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'default_secret_key')  # Ensure a strong key in production
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # Disable tracking to save resources
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'data/uploads')  # Default upload folder
+    MAX_PORTFOLIO_UPLOAD_BYTES = int(os.getenv('MAX_PORTFOLIO_UPLOAD_BYTES', 50 * 1024 * 1024))  # Portfolio upload size cap
+    MAX_CONTENT_LENGTH = MAX_PORTFOLIO_UPLOAD_BYTES + 1024 * 1024  # Request body cap (upload cap plus form overhead), larger bodies get a 413 before parsing
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')  # Load OpenAI API Key
     FLASK_DEBUG = False
     TESTING = False
     OAUTH_CLIENT_ID = os.getenv("OAUTH_CLIENT_ID")
     OAUTH_CLIENT_SECRET = os.getenv("OAUTH_CLIENT_SECRET")
     OAUTH_REDIRECT_URI = os.getenv("OAUTH_REDIRECT_URI")
+    # Database engine and connection pool; DATABASE_URL falls back to SQLALCHEMY_DATABASE_URI
+    DATABASE_URL = os.getenv('DATABASE_URL')
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))  # Connections kept open per worker process
+    DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))  # Extra connections allowed under load
+    DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', 30))  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))  # Replace connections older than this
+    DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() in ('1', 'true', 'yes')  # Test connections on checkout
+    DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', 0)) or None  # PostgreSQL statement timeout
+    PORTFOLIO_JOB_WORKERS = int(os.getenv('PORTFOLIO_JOB_WORKERS', 2))  # Background portfolio analysis threads
+    PORTFOLIO_JOB_TTL = int(os.getenv('PORTFOLIO_JOB_TTL', 3600))  # Seconds a finished job result is kept
+    DESCRIPTION_WORKERS = int(os.getenv('DESCRIPTION_WORKERS', 2))  # Background description generation threads
+    OPENAI_STUB = os.getenv('OPENAI_STUB', 'false').lower() in ('1', 'true', 'yes')  # Use the offline stub client
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'data/llm_cache.sqlite3')  # Persistent LLM response cache, empty to disable
+    LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', 90 * 24 * 3600))  # Seconds a cached response stays valid
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', 100000))  # Size cap, least recently used evicted first
+    SEARCH_INDEX_AUTO_CREATE = os.getenv('SEARCH_INDEX_AUTO_CREATE', 'false').lower() in ('1', 'true', 'yes')  # Create the search index at startup; migration.py builds it otherwise
+    LEADERBOARD_MAX_AGE = int(os.getenv('LEADERBOARD_MAX_AGE', 3600))  # Seconds before the ranking is rebuilt
+    TYPEAHEAD_MAX_AGE = int(os.getenv('TYPEAHEAD_MAX_AGE', 3600))  # Seconds before the autocomplete index is rebuilt
+    RESPONSE_CACHE_BACKEND = os.getenv('RESPONSE_CACHE_BACKEND', 'memory')  # memory, filesystem, redis or none
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))  # Memory backend size
+    RESPONSE_CACHE_DIR = os.getenv('RESPONSE_CACHE_DIR', 'data/response_cache')  # Filesystem backend directory
+    RESPONSE_CACHE_REDIS_URL = os.getenv('RESPONSE_CACHE_REDIS_URL', 'redis://localhost:6379/0')  # Redis backend
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 0))  # Seconds, 0 keeps pages until the data changes
+    DATA_VERSION_CHECK_INTERVAL = int(os.getenv('DATA_VERSION_CHECK_INTERVAL', 30))  # Seconds between checks for a new data load
+    USER_CACHE_TTL = int(os.getenv('USER_CACHE_TTL', 60))  # Seconds a logged-in user is served from memory
+    USER_CACHE_MAX_ENTRIES = int(os.getenv('USER_CACHE_MAX_ENTRIES', 10000))  # Users kept in the cache
+    SCENARIO_MAX_CELLS = int(os.getenv('SCENARIO_MAX_CELLS', 20_000_000))  # Largest scenarios x assets matrix per request
+    SLOW_REQUEST_THRESHOLD_MS = int(os.getenv('SLOW_REQUEST_THRESHOLD_MS', 0)) or None  # Log a SQL trace for slower requests, 0 disables
+    # /metrics is served to clients in METRICS_ALLOWED_IPS (comma-separated addresses or networks, '*' for any,
+    # empty for none) and to requests sending "Authorization: Bearer <METRICS_TOKEN>". Behind a reverse proxy every
+    # request comes from the proxy's address, so set PROXY_FIX_X_FOR to check the client address it forwards instead.
+    METRICS_ALLOWED_IPS = os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1')
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 0))  # Trusted proxies setting X-Forwarded-For, 0 disables ProxyFix
+    QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'off')  # off, warn or raise when a route exceeds its budget
+    QUERY_BUDGET_MAX_REPEATS = int(os.getenv('QUERY_BUDGET_MAX_REPEATS', 3))  # Same statement shape allowed this often per request
+    # SQL statement budget per route; one statement of headroom covers loading the logged-in user
+    QUERY_BUDGETS = {
+        "main.index": 2,
+        "main.company_details": 2,
+        "main.company_description": 2,
+        "main.leaderboard_page": 2,
+        "main.leaderboard_rank": 2,
+        "main.company_similar": 1,
+        "company.search": 3,
+        "company.company_typeahead": 2,
+    }
+    # Run the start-up warm-ups (search index, impact store, peer statistics, similarity index) in a
+    # background thread instead of during create_app; until they finish, lookups build what they need
+    FAST_START = os.getenv("FAST_START", "true").lower() in ("1", "true", "yes")
+    # Serve endpoint/midpoint lookups from the in-process impact store
+    IMPACT_STORE_ENABLED = os.getenv("IMPACT_STORE_ENABLED", "false").lower() in ("1", "true", "yes")
 
 
 class DevelopmentConfig(Config):
@@ -22,13 +76,20 @@ class DevelopmentConfig(Config):
     FLASK_ENV = 'development'
     FLASK_DEBUG = True  # Enable Flask debugging for development
     SQLALCHEMY_DATABASE_URI = os.getenv('DEV_DATABASE_URL', 'sqlite:///data/dev_app.db')  # SQLite for local dev
+    SEARCH_INDEX_AUTO_CREATE = os.getenv('SEARCH_INDEX_AUTO_CREATE', 'true').lower() in ('1', 'true', 'yes')  # Local databases get the index at startup
 
 
 class TestingConfig(Config):
     """Testing-specific configuration."""
     FLASK_ENV = 'testing'
     TESTING = True  # Enable testing mode
+    OPENAI_STUB = True  # Never call the OpenAI API from tests
+    LLM_CACHE_PATH = None  # Do not share cached responses between test runs
+    QUERY_BUDGET_MODE = 'raise'  # Fail tests that exceed a route's query budget
+    SEARCH_INDEX_AUTO_CREATE = True  # Test databases get the search index at startup
+    FAST_START = False  # Warm up inside create_app, so tests never race the warm-up thread
     SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URL', 'sqlite:///data/test_app.db')  # SQLite for testing
+    DATABASE_URL = SQLALCHEMY_DATABASE_URI  # Never run tests against DATABASE_URL
 
 
 class ProductionConfig(Config):
@@ -1,8 +1,78 @@
 from sqlalchemy import create_engine
+from functools import partial
 import pandas as pd
 from app.database_setup import Base
+from app.bulk_load import DEFAULT_CHUNK_ROWS, iter_chunks, load_tables, print_report, finalize_tables, reset_sequences
+from app.data_version import bump_data_version
+from app.delta_sync import DELTA_TABLES, sync_tables, print_summary
+from app.search import ensure_search_index
+from app.source_cache import source_cache
+import argparse
 import os
 
+# Snake-case names of the midpoint CSV columns
+MIDPOINT_RENAMES = {
+    "Water use": "water_use",
+    "Climate change": "climate_change",
+    "Land Use Transformation": "land_use_transformation",
+    "Terrestial ecotoxicity": "terrestrial_ecotoxicity",
+    "Trop. Ozone Formation (eco)": "tropical_ozone_formation",
+    "Freshwater ecotoxicity": "freshwater_ecotoxicity",
+    "Terrestrial acidification": "terrestrial_acidification",
+    "Marine ecotoxicity": "marine_ecotoxicity",
+    "Freshwater eutrophication": "freshwater_eutrophication",
+    "Marine eutrophication": "marine_eutrophication",
+}
+
+
+# Sheets of the pathway workbook and the endpoint column built from each
+PATHWAY_SHEETS = {
+    "marine": "damage_to_marine_species",
+    "freshwater": "damage_to_freshwater_species",
+    "terrestrial": "damage_to_terrestrial_species",
+}
+
+
+def read_companies():
+    """Read the companies CSV (Parquet-cached) in chunks."""
+    return source_cache.iter_csv("data/companies.csv", DEFAULT_CHUNK_ROWS)
+
+
+def read_midpoints():
+    """Read the midpoints CSV (Parquet-cached) in chunks, with snake_case column names."""
+    return (
+        chunk.rename(columns=MIDPOINT_RENAMES)
+        for chunk in source_cache.iter_csv("data/midpoints.csv", DEFAULT_CHUNK_ROWS)
+    )
+
+
+def read_endpoints():
+    """
+    Build the endpoints table from the three pathway sheets, in chunks.
+
+    The sheets are parsed in parallel (or served from the Parquet cache) and
+    joined on instrumentid; ids missing from a sheet get no score for it.
+    """
+    path_pathways = "data/norm_pathways_all_companies.xlsx"
+    sheets = source_cache.read_sheets(path_pathways, PATHWAY_SHEETS)
+
+    endpoints_df = pd.concat(
+        [sheets[sheet]["Relative Score"].rename(column) for sheet, column in PATHWAY_SHEETS.items()],
+        axis=1,
+        join="outer",
+    )
+    incomplete = int(endpoints_df.isna().any(axis=1).sum())
+    if incomplete:
+        print(f"Warning: {incomplete} instrumentids are missing from at least one pathway sheet.")
+    endpoints_df = endpoints_df.rename_axis("instrumentid").reset_index()
+
+    endpoints_df["avg_score"] = endpoints_df[
+        ['damage_to_freshwater_species', 'damage_to_marine_species', 'damage_to_terrestrial_species']
+    ].mean(axis=1)
+    endpoints_df["positive_score"] = 1 - endpoints_df["avg_score"]
+    return iter_chunks(endpoints_df)
+
+
 def migrate_to_local_db():
     """
     Migrate data from CSV and Excel files to the local SQLite database.
@@ -11,60 +81,13 @@ def migrate_to_local_db():
     local_engine = create_engine("sqlite:///data/local_database.db")
     Base.metadata.create_all(local_engine)
 
-    # Migrate Companies Table
-    try:
-        companies_df = pd.read_csv("data/companies.csv")
-        companies_df.to_sql("companies", local_engine, if_exists="replace", index=False)
-        print("Table 'companies' migrated successfully to local database.")
-    except Exception as e:
-        print(f"Error migrating 'companies' table to local database: {e}")
-
-    # Migrate Midpoints Table
-    try:
-        midpoints_df = pd.read_csv("data/midpoints.csv")
-        midpoints_df.rename(
-            columns={
-                "Water use": "water_use",
-                "Climate change": "climate_change",
-                "Land Use Transformation": "land_use_transformation",
-                "Terrestial ecotoxicity": "terrestrial_ecotoxicity",
-                "Trop. Ozone Formation (eco)": "tropical_ozone_formation",
-                "Freshwater ecotoxicity": "freshwater_ecotoxicity",
-                "Terrestrial acidification": "terrestrial_acidification",
-                "Marine ecotoxicity": "marine_ecotoxicity",
-                "Freshwater eutrophication": "freshwater_eutrophication",
-                "Marine eutrophication": "marine_eutrophication",
-            },
-            inplace=True,
-        )
-        midpoints_df.to_sql("midpoints", local_engine, if_exists="replace", index=False)
-        print("Table 'midpoints' migrated successfully to local database.")
-    except Exception as e:
-        print(f"Error migrating 'midpoints' table to local database: {e}")
-
-    # Migrate Endpoints Table from Excel
-    try:
-        path_pathways = "data/norm_pathways_all_companies.xlsx"
-        df_mar = pd.read_excel(path_pathways, sheet_name="marine", index_col=0)
-        df_fre = pd.read_excel(path_pathways, sheet_name="freshwater", index_col=0)
-        df_ter = pd.read_excel(path_pathways, sheet_name="terrestrial", index_col=0)
-
-        endpoints_df = pd.DataFrame({
-            "instrumentid": df_mar.index,
-            "damage_to_marine_species": df_mar["Relative Score"],
-            "damage_to_freshwater_species": df_fre["Relative Score"],
-            "damage_to_terrestrial_species": df_ter["Relative Score"]
-        }).reset_index(drop=True)
-
-        endpoints_df["avg_score"] = endpoints_df[
-            ['damage_to_freshwater_species', 'damage_to_marine_species', 'damage_to_terrestrial_species']
-        ].mean(axis=1)
-        endpoints_df["positive_score"] = 1 - endpoints_df["avg_score"]
-
-        endpoints_df.to_sql("endpoints", local_engine, if_exists="replace", index=False)
-        print("Table 'endpoints' migrated successfully to local database.")
-    except Exception as e:
-        print(f"Error migrating 'endpoints' table to local database: {e}")
+    # Stream each source into its table
+    reports = load_tables(local_engine, {
+        "companies": read_companies,
+        "midpoints": read_midpoints,
+        "endpoints": read_endpoints,
+    })
+    print_report(reports, "local database")
 
         # Create Users Table
     try:
@@ -74,10 +97,28 @@ def migrate_to_local_db():
     except Exception as e:
         print(f"Error creating 'users' table in local database: {e}")
 
+    # Build the hot-path indexes and refresh statistics; fails loudly if one is missing
+    finalize_tables(local_engine, ["companies", "midpoints", "endpoints"])
+    print("Indexes verified and statistics updated in local database.")
 
-def migrate_local_to_aws():
+    # Re-index the freshly loaded companies for search
+    try:
+        ensure_search_index(local_engine, rebuild=True)
+        print("Company search index rebuilt in local database.")
+    except Exception as e:
+        print(f"Error building the company search index in local database: {e}")
+
+    # Let running app workers know their cached pages are outdated
+    print(f"Local database data version is now {bump_data_version(local_engine)}.")
+
+
+def migrate_local_to_aws(max_workers=4):
     """
     Migrate data from the local SQLite database to AWS RDS.
+
+    Tables are streamed in chunks (PostgreSQL COPY on the target) and loaded
+    in parallel. `users` is not part of the full reload, so accounts created
+    on AWS survive; sync it explicitly with `sync_local_to_aws`.
     """
     # Local database connection
     local_engine = create_engine("sqlite:///data/local_database.db")
@@ -85,26 +126,92 @@ def migrate_local_to_aws():
     # AWS database connection
     aws_engine = create_engine(os.getenv("DATABASE_URL"))
 
-    # Transfer each table
+    # Transfer each reference table; the users table only has to exist
+    tables = ["companies", "midpoints", "endpoints"]
+    Base.metadata.create_all(aws_engine, tables=[Base.metadata.tables["users"]])
+    reports = load_tables(
+        aws_engine,
+        {table: partial(pd.read_sql_table, table, local_engine, chunksize=DEFAULT_CHUNK_ROWS) for table in tables},
+        max_workers=max_workers,
+    )
+    print_report(reports, "AWS")
+
+    # Build the hot-path indexes and refresh statistics; fails loudly if one is missing
+    finalize_tables(aws_engine, tables)
+    print("Indexes verified and statistics updated on AWS.")
+
+    # Make sure the trigram search indexes exist
     try:
-        tables = ["companies", "midpoints", "endpoints", "users"]
-        for table in tables:
-            df = pd.read_sql_table(table, local_engine)
-            df.to_sql(table, aws_engine, if_exists="replace", index=False)
-            print(f"Table '{table}' migrated successfully to AWS.")
+        ensure_search_index(aws_engine)
+        print("Company search index created on AWS.")
     except Exception as e:
-        print(f"Error migrating tables to AWS: {e}")
+        print(f"Error building the company search index on AWS: {e}")
+
+    # Let running app workers know their cached pages are outdated
+    print(f"AWS data version is now {bump_data_version(aws_engine)}.")
+
+
+def sync_local_to_aws(tables=DELTA_TABLES, dry_run=False, delete_missing=False):
+    """
+    Delta-sync the local SQLite database to AWS RDS.
+
+    Only new and changed rows are upserted; generated descriptions on AWS are
+    kept and `users` is not touched unless listed in `tables`.
+
+    Args:
+        tables (Iterable[str]): Tables to sync.
+        dry_run (bool): Only print what would change.
+        delete_missing (bool): Delete AWS rows that no longer exist locally.
+
+    Returns:
+        list[dict]: Per-table summaries of inserts, updates and deletes.
+    """
+    local_engine = create_engine("sqlite:///data/local_database.db")
+    aws_engine = create_engine(os.getenv("DATABASE_URL"))
+
+    # Make sure the declared tables and indexes exist before upserting; a dry run issues no DDL
+    if not dry_run:
+        Base.metadata.create_all(aws_engine, tables=[Base.metadata.tables[table] for table in tables])
+
+    summaries = sync_tables(local_engine, aws_engine, tables, dry_run=dry_run, delete_missing=delete_missing)
+    print_summary(summaries, "AWS", dry_run=dry_run, delete_missing=delete_missing)
+
+    if not dry_run:
+        # Upserted ids (users) must not collide with the next generated one
+        reset_sequences(aws_engine, tables)
+        # Refresh statistics and check the hot-path indexes
+        finalize_tables(aws_engine, tables)
+        try:
+            ensure_search_index(aws_engine)
+        except Exception as e:
+            print(f"Error building the company search index on AWS: {e}")
+        if any(summary["inserts"] or summary["updates"] or (delete_missing and summary["deletes"]) for summary in summaries):
+            print(f"AWS data version is now {bump_data_version(aws_engine)}.")
+    return summaries
 
 
 def main():
     """
-    Perform the full migration: CSV/Excel -> Local DB -> AWS RDS.
+    Perform the migration: CSV/Excel -> Local DB -> AWS RDS.
+
+    By default AWS receives a full copy; ``--delta`` upserts only the rows
+    that changed instead.
     """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--delta", action="store_true", help="Sync only changed rows to AWS")
+    parser.add_argument("--dry-run", action="store_true", help="With --delta, only report what would change")
+    parser.add_argument("--delete-missing", action="store_true", help="With --delta, delete AWS rows missing locally")
+    args = parser.parse_args()
+
     print("Step 1: Migrating CSV and Excel files to local database...")
     migrate_to_local_db()
 
-    print("\nStep 2: Migrating local database to AWS RDS...")
-    migrate_local_to_aws()
+    if args.delta:
+        print("\nStep 2: Syncing changes from local database to AWS RDS...")
+        sync_local_to_aws(dry_run=args.dry_run, delete_missing=args.delete_missing)
+    else:
+        print("\nStep 2: Migrating local database to AWS RDS...")
+        migrate_local_to_aws()
 
     print("\nMigration completed successfully!")
 
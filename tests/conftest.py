@@ -0,0 +1,67 @@
+import os
+import sys
+
+import pytest
+
+# Make the application importable when pytest runs from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def database_url(tmp_path):
+    """URL of a fresh SQLite database in `tmp_path` with every declared table."""
+    from sqlalchemy import create_engine
+    from app.database_setup import Base
+
+    url = f"sqlite:///{tmp_path / 'test_app.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    engine.dispose()
+    return url
+
+
+@pytest.fixture
+def seed(database_url):
+    """Insert rows into the test database: ``seed("companies", [{...}, ...])``."""
+    from sqlalchemy import create_engine
+    from app.database_setup import Base
+
+    def insert(table, rows):
+        engine = create_engine(database_url)
+        with engine.begin() as conn:
+            conn.execute(Base.metadata.tables[table].insert(), rows)
+        engine.dispose()
+
+    return insert
+
+
+@pytest.fixture
+def make_app(database_url):
+    """Build apps on the testing config, backed by the test database."""
+    from app import create_app
+    from app.data_version import data_version
+    from app.database_setup import get_engine
+    from app.impact_store import impact_store
+    from app.leaderboard import leaderboard
+    from app.peer_stats import peer_stats
+    from app.similarity import similarity
+    from app.typeahead import typeahead
+
+    def make(**overrides):
+        return create_app("testing", {
+            "DATABASE_URL": database_url,
+            "SQLALCHEMY_DATABASE_URI": database_url,
+            "RESPONSE_CACHE_BACKEND": "none",
+            **overrides,
+        })
+
+    yield make
+
+    # The in-memory data lives in module singletons shared by every app
+    data_version.stop()
+    data_version.current = None
+    impact_store.clear()
+    for cache in (peer_stats, leaderboard, typeahead, similarity):
+        cache.invalidate()
+    if get_engine() is not None:
+        get_engine().dispose()
@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import select, update
+
+from app.database_setup import User, get_engine
+from app.user_cache import user_cache
+
+
+@pytest.fixture
+def app(seed, make_app):
+    seed("users", [{"id": 1, "username": "alice", "email": "alice@example.com", "password": "x", "active": True}])
+    yield make_app()
+    user_cache.clear()
+
+
+@pytest.fixture
+def invalidated(monkeypatch):
+    calls = []
+    invalidate = user_cache.invalidate
+
+    def record(user_id):
+        calls.append(user_id)
+        invalidate(user_id)
+
+    monkeypatch.setattr(user_cache, "invalidate", record)
+    return calls
+
+
+def _log_in(client, user_id):
+    with client.session_transaction() as session:
+        session["_user_id"] = str(user_id)
+        session["_fresh"] = True
+
+
+def test_signup_invalidates_the_new_user(app, invalidated):
+    response = app.test_client().post("/auth/signup", data={
+        "username": "bob", "email": "bob@example.com", "password": "secret",
+    })
+
+    assert response.status_code == 302
+    with get_engine().connect() as conn:
+        user_id = conn.execute(select(User.id).where(User.email == "bob@example.com")).scalar_one()
+    assert invalidated == [user_id]
+
+
+def test_duplicate_signup_invalidates_nothing(app, invalidated):
+    response = app.test_client().post("/auth/signup", data={
+        "username": "alice2", "email": "alice@example.com", "password": "secret",
+    })
+
+    assert response.status_code == 302
+    assert invalidated == []
+
+
+def test_logout_invalidates_the_user(app, invalidated):
+    client = app.test_client()
+    _log_in(client, 1)
+    client.get("/")
+    assert user_cache.get(1).username == "alice"
+
+    # Changed behind the cache's back: the cached copy is served until logout
+    with get_engine().begin() as conn:
+        conn.execute(update(User).where(User.id == 1).values(username="alice.renamed"))
+    assert user_cache.get(1).username == "alice"
+
+    response = client.get("/auth/logout")
+
+    assert response.status_code == 302
+    assert invalidated == [1]
+    assert user_cache.get(1).username == "alice.renamed"
+
+
+def test_logout_when_anonymous(app, invalidated):
+    assert app.test_client().get("/auth/logout").status_code == 302
+    assert invalidated == []
@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, select
+
+from app.bulk_load import load_tables, write_chunks
+from app.database_setup import Base, Midpoint
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'load.db'}")
+    yield engine
+    engine.dispose()
+
+
+def test_midpoints_round_trip(engine):
+    columns = [column.name for column in Midpoint.__table__.columns if column.name != "instrumentid"]
+    frame = pd.DataFrame(
+        [["A", *range(1, len(columns) + 1)], ["B", *([None] + list(range(2, len(columns) + 1)))]],
+        columns=["instrumentid", *columns],
+    )
+
+    reports = load_tables(engine, {"midpoints": lambda: [frame]})
+
+    assert reports[0]["rows"] == 2
+    with engine.connect() as conn:
+        rows = {row[0]: row[1:] for row in conn.execute(select(Midpoint.__table__))}
+    assert rows["A"] == tuple(float(value) for value in range(1, len(columns) + 1))
+    assert rows["B"][0] is None
+    assert all(value is not None for value in rows["B"][1:])
+
+
+def test_write_chunks_rejects_unknown_columns(engine):
+    Base.metadata.create_all(engine, tables=[Midpoint.__table__])
+    frame = pd.DataFrame({"instrumentid": ["A"], "not_a_column": [1.0]})
+    with engine.begin() as conn, pytest.raises(ValueError, match="not_a_column"):
+        write_chunks(conn, "midpoints", [frame], Midpoint.__table__)
@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import event
+
+from app.database_setup import Base, get_engine
+from app.services import get_company_details
+
+
+def _midpoint(asset, value):
+    return {
+        column.key: value if column.key != "instrumentid" else asset
+        for column in Base.metadata.tables["midpoints"].columns
+    }
+
+
+@pytest.fixture
+def app(seed, make_app):
+    seed("companies", [
+        {"instrumentid": "ID01", "name": "Alpha", "description": "Written by hand."},
+        {"instrumentid": "ID02", "name": "Beta", "description": "Written by hand."},
+        {"instrumentid": "ID03", "name": "Gamma", "description": "No impact data."},
+    ])
+    seed("endpoints", [
+        {"instrumentid": asset, "damage_to_marine_species": marine, "damage_to_freshwater_species": 0.2,
+         "damage_to_terrestrial_species": 0.3, "avg_score": 0.2, "positive_score": score}
+        for asset, marine, score in (("ID01", 0.1, 0.8), ("ID02", 0.4, 0.3))
+    ])
+    seed("midpoints", [_midpoint("ID01", 1.0), _midpoint("ID02", 2.0)])
+    return make_app()
+
+
+@pytest.fixture
+def statements(app):
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement)
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_details_are_read_with_one_query(app, statements):
+    with app.app_context():
+        details = get_company_details("ID01")
+
+    assert len(statements) == 1
+    assert details["company_name"] == "Alpha"
+    assert details["description"] == "Written by hand."
+    assert details["impact"]["Damage to marine species"] == pytest.approx(10.0)
+    assert set(details["midpoints"].values()) == {1.0}
+    assert details["endpoint_percentiles"]["damage_to_marine_species"] == pytest.approx(0.0)
+
+
+@pytest.mark.parametrize("company_id, message", [
+    ("ID99", "Company with ID ID99 not found."),
+    ("ID03", "Endpoints for asset ID03 not found."),
+])
+def test_missing_data(app, statements, company_id, message):
+    with app.app_context(), pytest.raises(ValueError, match=message):
+        get_company_details(company_id)
+    assert len(statements) == 1
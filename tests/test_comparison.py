@@ -0,0 +1,66 @@
+import pytest
+
+from app.comparison import _competition_rank
+
+
+def test_competition_rank_ties_and_nan():
+    values = [0.5, 0.8, 0.8, float("nan"), 0.1]
+
+    assert _competition_rank(values) == [2, 3, 3, None, 1]
+    assert _competition_rank(values, descending=True) == [3, 1, 1, None, 4]
+    assert _competition_rank([]) == []
+
+
+@pytest.fixture
+def client(seed, make_app):
+    seed("endpoints", [
+        {"instrumentid": asset, "damage_to_marine_species": damage, "damage_to_freshwater_species": damage,
+         "damage_to_terrestrial_species": damage, "avg_score": 0.5, "positive_score": score}
+        for asset, damage, score in (("A", 0.1, 0.8), ("B", 0.1, 0.8), ("C", 0.3, 0.2), ("D", 0.2, 0.5))
+    ])
+    return make_app().test_client()
+
+
+def _holdings(*pairs):
+    return [{"instrumentid": asset, "allocation": allocation} for asset, allocation in pairs]
+
+
+def test_tied_portfolios_share_a_rank(client):
+    response = client.post("/portfolio/compare", json={"portfolios": {
+        "low": _holdings(("C", 10)),
+        "first": _holdings(("A", 10)),
+        "second": _holdings(("B", 10)),
+        "mixed": _holdings(("A", 5), ("C", 5)),
+        "unknown": _holdings(("X", 10)),
+    }})
+
+    assert response.status_code == 200
+    result = response.get_json()
+    summaries = {summary["portfolio"]: summary for summary in result["portfolios"]}
+    assert result["assets"] == 4
+
+    assert {name: summaries[name]["rank"] for name in summaries} == {
+        "first": 1, "second": 1, "mixed": 3, "low": 4, "unknown": None,
+    }
+    assert summaries["first"]["damage_rank"] == summaries["second"]["damage_rank"]
+    assert summaries["mixed"]["damage_rank"] == summaries["first"]["damage_rank"] + 2
+    assert summaries["low"]["damage_rank"] == summaries["mixed"]["damage_rank"] + 1
+    assert summaries["first"]["dimension_ranks"] == summaries["second"]["dimension_ranks"]
+    assert summaries["unknown"]["unmatched"] == ["X"]
+    assert summaries["mixed"]["holdings"] == 2
+
+
+def test_holdings_are_summed_per_asset(client):
+    response = client.post("/portfolio/compare", json={"portfolios": [
+        {"name": "split", "holdings": _holdings(("D", 4), ("D", 6))},
+        {"name": "whole", "holdings": _holdings(("D", 10))},
+    ]})
+
+    split, whole = response.get_json()["portfolios"]
+    assert split["total_damage"] == pytest.approx(whole["total_damage"])
+    assert (split["rank"], whole["rank"]) == (1, 1)
+
+
+def test_malformed_request(client):
+    assert client.post("/portfolio/compare", json={"portfolios": "A"}).status_code == 400
+    assert client.post("/portfolio/compare", json={"portfolios": [{"name": "x"}]}).status_code == 400
@@ -0,0 +1,37 @@
+import pytest
+from sqlalchemy import exc, text
+
+from app.database_setup import get_engine
+
+
+def test_pool_reuses_connections(make_app):
+    app = make_app(DB_POOL_SIZE=2, DB_MAX_OVERFLOW=0)
+    engine = get_engine()
+
+    connections = set()
+    for _ in range(5):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            connections.add(id(conn.connection.dbapi_connection))
+
+    assert len(connections) == 1
+    status = app.test_client().get("/health/db-pool").get_json()
+    assert status["pool"] == "TimedQueuePool"
+    assert status["checkouts"] >= 5
+    assert status["checked_out"] == 0
+    assert status["timeouts"] == 0
+
+
+def test_pool_timeouts_are_reported(make_app):
+    app = make_app(DB_POOL_SIZE=1, DB_MAX_OVERFLOW=0, DB_POOL_TIMEOUT=0.05)
+    engine = get_engine()
+
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+
+    status = app.test_client().get("/health/db-pool").get_json()
+    assert status["timeouts"] == 1
+    assert status["size"] == 1
+    assert status["checked_out"] == 0
+    assert status["wait_seconds_max"] >= 0.05
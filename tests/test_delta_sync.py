@@ -0,0 +1,135 @@
+import pytest
+from sqlalchemy import create_engine, inspect, select
+
+from app.database_setup import Base
+from app.delta_sync import DELTA_TABLES, print_summary, row_hashes, sync_tables
+
+COMPANIES = Base.metadata.tables["companies"]
+ENDPOINTS = Base.metadata.tables["endpoints"]
+
+
+def _engine(path, rows=None):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[Base.metadata.tables[table] for table in DELTA_TABLES])
+    with engine.begin() as conn:
+        for table, table_rows in (rows or {}).items():
+            conn.execute(Base.metadata.tables[table].insert(), table_rows)
+    return engine
+
+
+def _endpoint(asset, score):
+    return {"instrumentid": asset, "damage_to_marine_species": 0.1, "positive_score": score}
+
+
+@pytest.fixture
+def source(tmp_path):
+    return _engine(tmp_path / "local.db", {
+        "companies": [
+            {"instrumentid": "A", "name": "Alpha", "description": "Local A"},
+            {"instrumentid": "B", "name": "Bravo renamed", "description": None},
+            {"instrumentid": "C", "name": "Charlie", "description": None},
+        ],
+        "endpoints": [_endpoint("A", 0.5), _endpoint("B", 0.9), _endpoint("C", 0.1)],
+    })
+
+
+@pytest.fixture
+def target(tmp_path):
+    return _engine(tmp_path / "aws.db", {
+        "companies": [
+            {"instrumentid": "A", "name": "Alpha", "description": "Generated A"},
+            {"instrumentid": "B", "name": "Bravo", "description": "Generated B"},
+            {"instrumentid": "D", "name": "Delta", "description": None},
+        ],
+        "endpoints": [_endpoint("A", 0.5), _endpoint("B", 0.8), _endpoint("D", 0.3)],
+    })
+
+
+def _counts(summaries):
+    return {s["table"]: (s["inserts"], s["updates"], s["unchanged"], s["deletes"]) for s in summaries}
+
+
+def _rows(engine, table):
+    with engine.connect() as conn:
+        return {row[0]: tuple(row[1:]) for row in conn.execute(select(table).order_by(table.c.instrumentid))}
+
+
+def test_counts_and_writes(source, target):
+    summaries = sync_tables(source, target, ("companies", "endpoints"))
+
+    assert _counts(summaries) == {"companies": (1, 1, 1, 1), "endpoints": (1, 1, 1, 1)}
+    companies = _rows(target, COMPANIES)
+    assert sorted(companies) == ["A", "B", "C", "D"]  # D is only deleted with delete_missing
+    assert companies["B"][0] == "Bravo renamed"
+    assert companies["A"][1] == "Generated A"  # descriptions generated on the target are kept
+    assert companies["B"][1] == "Generated B"
+    assert _rows(target, ENDPOINTS) == _rows(source, ENDPOINTS) | {"D": _rows(target, ENDPOINTS)["D"]}
+
+    # A second run finds nothing left to do
+    assert _counts(sync_tables(source, target, ("companies", "endpoints"))) == {
+        "companies": (0, 0, 3, 1), "endpoints": (0, 0, 3, 1),
+    }
+
+
+def test_delete_missing(source, target):
+    summaries = sync_tables(source, target, ("endpoints",), delete_missing=True)
+
+    assert _counts(summaries) == {"endpoints": (1, 1, 1, 1)}
+    assert sorted(_rows(target, ENDPOINTS)) == ["A", "B", "C"]
+
+
+def test_dry_run_writes_nothing(source, target):
+    before = {table: _rows(target, Base.metadata.tables[table]) for table in ("companies", "endpoints")}
+
+    summaries = sync_tables(source, target, ("companies", "endpoints"), dry_run=True, delete_missing=True)
+
+    assert _counts(summaries) == {"companies": (1, 1, 1, 1), "endpoints": (1, 1, 1, 1)}
+    assert {table: _rows(target, Base.metadata.tables[table]) for table in before} == before
+
+
+def test_dry_run_against_a_database_without_tables(source, tmp_path):
+    empty = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+
+    summaries = sync_tables(source, empty, dry_run=True)
+
+    assert _counts(summaries) == {"companies": (3, 0, 0, 0), "midpoints": (0, 0, 0, 0), "endpoints": (3, 0, 0, 0)}
+    assert inspect(empty).get_table_names() == []
+
+
+def test_dry_run_migration_issues_no_ddl(source, tmp_path, monkeypatch, capsys):
+    import migration
+
+    (tmp_path / "data").mkdir()
+    (tmp_path / "local.db").rename(tmp_path / "data" / "local_database.db")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'aws.db'}")
+
+    migration.sync_local_to_aws(dry_run=True)
+
+    assert inspect(create_engine(f"sqlite:///{tmp_path / 'aws.db'}")).get_table_names() == []
+    assert "[dry run] Table 'companies' synced to AWS: 3 inserted" in capsys.readouterr().out
+
+
+def test_row_hashes_are_stable(source, target):
+    keys = list(ENDPOINTS.primary_key.columns)
+    compared = [column for column in ENDPOINTS.columns if column not in keys]
+
+    hashes = row_hashes(source, ENDPOINTS, keys, compared)
+    assert row_hashes(source, ENDPOINTS, keys, compared, chunk_rows=1) == hashes
+    assert row_hashes(target, ENDPOINTS, keys, compared)[("A",)] == hashes[("A",)]
+    assert row_hashes(target, ENDPOINTS, keys, compared)[("B",)] != hashes[("B",)]
+
+    sync_tables(source, target, ("endpoints",), delete_missing=True)
+    assert row_hashes(target, ENDPOINTS, keys, compared) == hashes
+
+
+def test_print_summary(capsys):
+    summary = {"table": "endpoints", "inserts": 1, "updates": 2, "unchanged": 3, "deletes": 4}
+
+    print_summary([summary], "AWS", dry_run=True)
+    print_summary([summary], "AWS", delete_missing=True)
+
+    assert capsys.readouterr().out.splitlines() == [
+        "[dry run] Table 'endpoints' synced to AWS: 1 inserted, 2 updated, 3 unchanged, 4 only on target (kept).",
+        "Table 'endpoints' synced to AWS: 1 inserted, 2 updated, 3 unchanged, 4 deleted.",
+    ]
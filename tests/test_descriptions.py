@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+from sqlalchemy import event, select
+
+from app.database_setup import Company, Session, get_engine
+from app.descriptions import DescriptionWorker
+from app.utils import StubOpenAIClient, generate_company_description
+
+
+@pytest.fixture
+def app(seed, make_app):
+    seed("companies", [
+        {"instrumentid": "ID01", "name": "Alpha", "description": None},
+        {"instrumentid": "ID02", "name": "Beta", "description": "Written by hand."},
+    ])
+    return make_app()
+
+
+@pytest.fixture
+def updates(app):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE COMPANIES"):
+            statements.append(statement)
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def _worker(client):
+    return DescriptionWorker(generate=lambda name: generate_company_description(name, client=client), max_workers=4)
+
+
+def _description(instrumentid):
+    session = Session()
+    try:
+        return session.scalar(select(Company.description).where(Company.instrumentid == instrumentid))
+    finally:
+        session.close()
+
+
+def test_concurrent_requests_generate_once(updates):
+    client = StubOpenAIClient(delay=0.2)
+    worker = _worker(client)
+    stored = []
+    worker.subscribe(stored.append)
+
+    futures = []
+    barrier = threading.Barrier(8)
+
+    def request():
+        barrier.wait()
+        futures.append(worker.request("ID01", "Alpha"))
+
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(future) for future in futures}) == 1
+    assert futures[0].result(timeout=5) == "Alpha is a company. (Stub description.)"
+    assert client.calls == 1
+    assert len(updates) == 1
+    assert stored == ["ID01"]
+    assert _description("ID01") == "Alpha is a company. (Stub description.)"
+
+
+def test_existing_description_is_never_overwritten(updates):
+    worker = _worker(StubOpenAIClient())
+    stored = []
+    worker.subscribe(stored.append)
+
+    worker.request("ID02", "Beta").result(timeout=5)
+
+    assert _description("ID02") == "Written by hand."
+    assert stored == []
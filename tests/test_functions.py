@@ -0,0 +1,87 @@
+import numbers
+
+import pandas as pd
+import pytest
+
+from app.database_setup import Endpoint, Session
+from app.functions import compute_portfolio_impact
+from app.impact_store import impact_store
+
+ENDPOINTS = {
+    "ID01": (0.1, 0.2, 0.3),
+    "ID02": (0.5, 0.25, 0.125),
+    "ID03": (0.4, None, 0.6),
+}
+
+
+@pytest.fixture(params=["sql", "store"])
+def app(request, seed, make_app):
+    seed("endpoints", [
+        {"instrumentid": asset, "damage_to_marine_species": marine,
+         "damage_to_freshwater_species": freshwater, "damage_to_terrestrial_species": terrestrial}
+        for asset, (marine, freshwater, terrestrial) in ENDPOINTS.items()
+    ])
+    return make_app(IMPACT_STORE_ENABLED=request.param == "store")
+
+
+def per_row_impact(portfolio, column="allocation"):
+    """The original row-by-row implementation the vectorized one must reproduce."""
+    session = Session()
+    results = []
+    try:
+        for _, row in portfolio.iterrows():
+            asset = row['instrumentid']
+            perc = row[column]
+            endpoint = session.query(Endpoint).filter_by(instrumentid=asset).first()
+            if not endpoint:
+                continue
+            impacts = {
+                "Damage to marine species": endpoint.damage_to_marine_species * perc,
+                "Damage to freshwater species": endpoint.damage_to_freshwater_species * perc,
+                "Damage to terrestrial species": endpoint.damage_to_terrestrial_species * perc,
+            }
+            results.append({
+                "instrumentid": asset,
+                "name": row.get("name", "Unknown"),
+                "allocation": perc,
+                **impacts,
+            })
+        return results
+    finally:
+        session.close()
+
+
+@pytest.mark.parametrize("allocations", [[10, 20, 30, 5, 35], [0.1, 0.2, 0.3, 0.05, 0.35]])
+@pytest.mark.parametrize("named", [True, False])
+def test_matches_per_row_implementation(app, allocations, named):
+    portfolio = pd.DataFrame({
+        "instrumentid": ["ID02", "ID01", "ID02", "UNKNOWN", "ID01"],
+        "allocation": allocations,
+    })
+    if named:
+        portfolio.insert(1, "name", ["Beta", "Alpha", "Beta again", "Nobody", "Alpha again"])
+
+    expected = per_row_impact(portfolio)
+    results, unmatched = compute_portfolio_impact(portfolio, report_unmatched=True)
+
+    assert unmatched == ["UNKNOWN"]
+    assert [list(result) for result in results] == [list(row) for row in expected]
+    for result, row in zip(results, expected):
+        assert result["instrumentid"] == row["instrumentid"]
+        assert result["name"] == row["name"]
+        assert result["allocation"] == row["allocation"]
+        assert isinstance(result["allocation"], type(allocations[0]))
+        for key in ("Damage to marine species", "Damage to freshwater species", "Damage to terrestrial species"):
+            assert isinstance(result[key], numbers.Real)
+            assert result[key] == pytest.approx(row[key])
+
+
+def test_null_damages_become_none(app):
+    portfolio = pd.DataFrame({"instrumentid": ["ID03", "ID01"], "allocation": [2.0, 1.0]})
+
+    results = compute_portfolio_impact(portfolio)
+
+    assert results[0]["Damage to marine species"] == pytest.approx(0.8)
+    assert results[0]["Damage to freshwater species"] is None
+    assert results[0]["Damage to terrestrial species"] == pytest.approx(1.2)
+    assert results[1]["Damage to freshwater species"] == pytest.approx(0.2)
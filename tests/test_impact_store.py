@@ -0,0 +1,51 @@
+import pytest
+from sqlalchemy import insert, update
+
+from app.data_version import bump_data_version, data_version
+from app.database_setup import Company, Endpoint, get_engine
+from app.functions import compute_asset_impact
+from app.impact_store import impact_store
+from app.typeahead import typeahead
+
+
+@pytest.fixture
+def app(seed, make_app):
+    seed("companies", [{"instrumentid": "ID01", "name": "Alpha"}, {"instrumentid": "ID02", "name": "Beta"}])
+    seed("endpoints", [
+        {"instrumentid": asset, "damage_to_marine_species": marine, "damage_to_freshwater_species": 0.1,
+         "damage_to_terrestrial_species": 0.1, "avg_score": 0.2, "positive_score": 0.8}
+        for asset, marine in (("ID01", 0.5), ("ID02", 0.1))
+    ])
+    return make_app(IMPACT_STORE_ENABLED=True)
+
+
+def _change_data(engine):
+    with engine.begin() as conn:
+        conn.execute(update(Endpoint).where(Endpoint.instrumentid == "ID01").values(damage_to_marine_species=0.9))
+        conn.execute(insert(Company).values(instrumentid="ID03", name="Alphabet"))
+    bump_data_version(engine)
+
+
+def test_store_reloads_on_data_version_change(app):
+    engine = get_engine()
+    assert impact_store.loaded
+    store_version = impact_store.version
+    assert impact_store.endpoints.row("ID01")["damage_to_marine_species"] == 0.5
+
+    _change_data(engine)
+    assert impact_store.endpoints.row("ID01")["damage_to_marine_species"] == 0.5
+    data_version.refresh(engine)
+
+    assert impact_store.version == store_version + 1
+    assert impact_store.endpoints.row("ID01")["damage_to_marine_species"] == 0.9
+    assert compute_asset_impact("ID01", 2)["Damage to marine species"] == pytest.approx(1.8)
+
+
+def test_typeahead_rebuilds_on_data_version_change(app):
+    engine = get_engine()
+    assert [item["instrumentid"] for item in typeahead.lookup("alpha")] == ["ID01"]
+
+    _change_data(engine)
+    data_version.refresh(engine)
+
+    assert [item["instrumentid"] for item in typeahead.lookup("alpha")] == ["ID01", "ID03"]
@@ -0,0 +1,106 @@
+import io
+import threading
+import time
+
+import pytest
+
+from app import jobs as jobs_module
+from app.jobs import JobManager
+
+
+class Clock:
+    """Stand-in for the `time` module with a manually advanced clock."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+def _wait(manager, job_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.get(job_id)
+        if job is None or job["status"] in ("finished", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_result_progress_and_failure():
+    manager = JobManager()
+
+    def work(value, progress):
+        progress(rows=1)
+        progress(fraction=1.0)
+        return value * 2
+
+    def fail(progress):
+        raise ValueError("Bad portfolio")
+
+    finished = _wait(manager, manager.submit(work, 21))
+    failed = _wait(manager, manager.submit(fail))
+
+    assert (finished["status"], finished["result"], finished["progress"]) == ("finished", 42, {"rows": 1, "fraction": 1.0})
+    assert (failed["status"], failed["error"], failed["result"]) == ("failed", "Bad portfolio", None)
+    assert manager.get("unknown") is None
+
+
+def test_finished_jobs_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(jobs_module, "time", clock)
+    manager = JobManager(ttl=60)
+    release = threading.Event()
+
+    done = manager.submit(lambda progress: "done")
+    running = manager.submit(lambda progress: release.wait(5))
+    _wait(manager, done)
+
+    clock.now += 59
+    assert manager.get(done)["status"] == "finished"
+    clock.now += 2
+    assert manager.get(done) is None
+    # Unfinished jobs are never evicted
+    assert manager.get(running) is not None
+    release.set()
+
+
+def test_max_jobs_rejects_new_submissions():
+    manager = JobManager(max_workers=1, max_jobs=2)
+    release = threading.Event()
+
+    first = manager.submit(lambda progress: release.wait(5))
+    manager.submit(lambda progress: release.wait(5))
+    with pytest.raises(RuntimeError):
+        manager.submit(lambda progress: None)
+
+    release.set()
+    _wait(manager, first)
+
+
+def test_portfolio_route_runs_a_job(seed, make_app):
+    seed("endpoints", [
+        {"instrumentid": "ID01", "damage_to_marine_species": 0.1, "damage_to_freshwater_species": 0.2,
+         "damage_to_terrestrial_species": 0.3, "avg_score": 0.2, "positive_score": 0.8},
+    ])
+    client = make_app().test_client()
+    csv = b"instrumentid,allocation\nID01,50\nID99,50\n"
+
+    response = client.post("/portfolio", data={"file": (io.BytesIO(csv), "portfolio.csv")})
+
+    assert response.status_code == 202
+    status_url = response.get_json()["status_url"]
+    deadline = time.monotonic() + 5
+    while (job := client.get(status_url).get_json())["status"] not in ("finished", "failed"):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    assert job["status"] == "finished"
+    assert job["progress"]["fraction"] == 1.0
+    assert job["result"]["unmatched"] == ["ID99"]
+    assert [(asset["instrumentid"], asset["Damage to marine species"]) for asset in job["result"]["assets"]] == [
+        ("ID01", pytest.approx(5.0)),
+    ]
+
+    assert client.post("/portfolio", data={}).status_code == 400
+    assert client.get("/portfolio/jobs/unknown").status_code == 404
@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import update
+
+from app.data_version import bump_data_version, data_version
+from app.database_setup import Endpoint, get_engine
+from app.leaderboard import Ranking
+
+
+@pytest.fixture
+def ranking():
+    return Ranking([
+        ("D", 0.5, "Delta"),
+        ("B", 0.8, "Bravo"),
+        ("E", None, "Echo"),
+        ("A", 0.9, "Alpha"),
+        ("F", float("nan"), "Foxtrot"),
+        ("C", 0.8, "Charlie"),
+    ])
+
+
+def test_ties_share_the_best_rank(ranking):
+    assert len(ranking) == 4
+    assert [(item["instrumentid"], item["rank"]) for item in ranking.top(10)] == [
+        ("A", 1), ("B", 2), ("C", 2), ("D", 4),
+    ]
+    assert [item["instrumentid"] for item in ranking.bottom(2)] == ["D", "C"]
+    assert ranking.rank_of("C")["rank"] == 2
+
+
+def test_percentiles(ranking):
+    assert ranking.rank_of("A")["percentile"] == 100.0
+    assert ranking.rank_of("B")["percentile"] == pytest.approx(100 / 3)
+    assert ranking.rank_of("C")["percentile"] == pytest.approx(100 / 3)
+    assert ranking.rank_of("D")["percentile"] == 0.0
+    assert ranking.rank_of("E") is None
+    assert Ranking([("A", 0.3, "Alpha")]).rank_of("A")["percentile"] == 100.0
+
+
+def test_page_bounds(ranking):
+    assert [item["instrumentid"] for item in ranking.page(1, 3)] == ["A", "B", "C"]
+    assert [item["instrumentid"] for item in ranking.page(2, 3)] == ["D"]
+    assert ranking.page(3, 3) == []
+    assert Ranking([]).page(1, 10) == []
+
+
+def test_routes_follow_a_data_version_change(seed, make_app):
+    ids = [f"ID{i:02d}" for i in range(10)]
+    seed("companies", [{"instrumentid": asset, "name": f"Company {asset}"} for asset in ids])
+    seed("endpoints", [{"instrumentid": asset, "positive_score": i / 100} for i, asset in enumerate(ids)])
+    client = make_app().test_client()
+
+    assert client.get("/leaderboard/ID05").get_json()["rank"] == 5
+    page = client.get("/leaderboard?page=0&per_page=100000").get_json()
+    assert (page["page"], page["per_page"], page["total"], len(page["items"])) == (1, 500, 10, 10)
+    assert client.get("/leaderboard?page=3&per_page=4").get_json()["items"][-1]["instrumentid"] == "ID00"
+    assert client.get("/leaderboard/UNKNOWN").status_code == 404
+
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.execute(update(Endpoint).where(Endpoint.instrumentid == "ID05").values(positive_score=0.99))
+    bump_data_version(engine)
+    data_version.refresh(engine)
+
+    rank = client.get("/leaderboard/ID05").get_json()
+    assert (rank["rank"], rank["score"]) == (1, pytest.approx(99))
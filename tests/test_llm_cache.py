@@ -0,0 +1,96 @@
+import pytest
+
+from app import llm_cache as llm_cache_module
+from app import utils
+from app.llm_cache import LLMCache
+from app.utils import StubOpenAIClient, configure_llm_cache, generate_company_description
+
+
+class Clock:
+    """Stand-in for the `time` module with a manually advanced clock."""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache_module, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = LLMCache(str(tmp_path / "llm" / "cache.db"), ttl=100, max_entries=3)
+    cache.EVICT_EVERY = 1
+    yield cache
+    cache.close()
+
+
+def test_keys_depend_on_every_input():
+    key = LLMCache.make_key("model", "Describe {company_name}", company_name="Alpha")
+
+    assert key == LLMCache.make_key("model", "Describe {company_name}", company_name="Alpha")
+    assert key != LLMCache.make_key("other", "Describe {company_name}", company_name="Alpha")
+    assert key != LLMCache.make_key("model", "Summarize {company_name}", company_name="Alpha")
+    assert key != LLMCache.make_key("model", "Describe {company_name}", company_name="Beta")
+
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.set("a", "model", "Alpha")
+    clock.now += 99
+    assert cache.get("a") == "Alpha"
+
+    # Reading an entry does not extend its lifetime
+    clock.now += 2
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 1, "entries": 0}
+
+
+def test_expired_entries_are_evicted_on_write(cache, clock):
+    cache.set("a", "model", "Alpha")
+    clock.now += 101
+    cache.set("b", "model", "Bravo")
+
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(cache, clock):
+    for key in "abc":
+        cache.set(key, "model", key.upper())
+        clock.now += 1
+    assert cache.get("a") == "A"
+    clock.now += 1
+
+    cache.set("d", "model", "D")
+
+    assert cache.stats()["entries"] == 3
+    assert cache.get("b") is None
+    assert [cache.get(key) for key in "acd"] == ["A", "C", "D"]
+
+
+def test_entries_survive_reopening(tmp_path, clock):
+    path = str(tmp_path / "cache.db")
+    cache = LLMCache(path)
+    cache.set("a", "model", "Alpha")
+    cache.close()
+
+    reopened = LLMCache(path)
+    assert reopened.get("a") == "Alpha"
+    reopened.close()
+
+
+def test_descriptions_are_served_from_the_cache(tmp_path):
+    client = StubOpenAIClient()
+    configure_llm_cache(str(tmp_path / "cache.db"))
+    try:
+        first = generate_company_description("Alpha", client=client)
+        assert generate_company_description("Alpha", client=client) == first
+        assert client.calls == 1
+        assert utils.llm_cache.stats()["hits"] == 1
+    finally:
+        configure_llm_cache(None)
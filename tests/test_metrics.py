@@ -0,0 +1,54 @@
+import pytest
+
+from app.metrics import parse_networks
+
+
+def _get(app, address, authorization=None, forwarded_for=None):
+    headers = {}
+    if authorization:
+        headers["Authorization"] = authorization
+    if forwarded_for:
+        headers["X-Forwarded-For"] = forwarded_for
+    return app.test_client().get("/metrics", headers=headers, environ_base={"REMOTE_ADDR": address})
+
+
+def test_parse_networks():
+    assert parse_networks("*") is None
+    assert parse_networks("") == []
+    assert [str(network) for network in parse_networks(" 127.0.0.1, 10.1.2.3/8 ")] == ["127.0.0.1/32", "10.0.0.0/8"]
+    with pytest.raises(ValueError):
+        parse_networks("localhost")
+
+
+def test_allow_list(make_app):
+    app = make_app(METRICS_ALLOWED_IPS="127.0.0.1, 10.0.0.0/8")
+
+    response = _get(app, "127.0.0.1")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert b"# TYPE" in response.data
+    assert _get(app, "10.20.30.40").status_code == 200
+    assert _get(app, "192.168.1.5").status_code == 403
+
+
+def test_bearer_token(make_app):
+    app = make_app(METRICS_ALLOWED_IPS="", METRICS_TOKEN="s3cret")
+
+    assert _get(app, "127.0.0.1").status_code == 403
+    assert _get(app, "192.168.1.5", "Bearer s3cret").status_code == 200
+    assert _get(app, "192.168.1.5", "bearer s3cret").status_code == 200
+    assert _get(app, "192.168.1.5", "Bearer wrong").status_code == 403
+    assert _get(app, "192.168.1.5", "Basic s3cret").status_code == 403
+
+
+def test_no_token_configured(make_app):
+    app = make_app(METRICS_ALLOWED_IPS="")
+
+    assert _get(app, "127.0.0.1", "Bearer ").status_code == 403
+
+
+def test_forwarded_address_is_checked_behind_a_proxy(make_app):
+    app = make_app(METRICS_ALLOWED_IPS="127.0.0.1", PROXY_FIX_X_FOR=1)
+
+    assert _get(app, "127.0.0.1", forwarded_for="203.0.113.7").status_code == 403
+    assert _get(app, "10.0.0.2", forwarded_for="127.0.0.1").status_code == 200
@@ -0,0 +1,29 @@
+import pytest
+from sqlalchemy import update
+
+from app.data_version import bump_data_version, data_version
+from app.database_setup import Endpoint, get_engine
+from app.peer_stats import peer_stats
+
+
+@pytest.fixture
+def app(seed, make_app):
+    ids = [f"ID{i:02d}" for i in range(30)]
+    seed("companies", [{"instrumentid": asset, "name": f"Company {asset}"} for asset in ids])
+    seed("endpoints", [{"instrumentid": asset, "positive_score": i / 100} for i, asset in enumerate(ids)])
+    seed("midpoints", [{"instrumentid": asset} for asset in ids])
+    return make_app()
+
+
+def test_percentiles_follow_a_data_version_change(app):
+    engine = get_engine()
+    assert data_version.current == 0
+    assert peer_stats.percentiles("ID05")["endpoints"]["positive_score"] == pytest.approx(100 * 5 / 29)
+
+    with engine.begin() as conn:
+        conn.execute(update(Endpoint).where(Endpoint.instrumentid == "ID05").values(positive_score=0.99))
+    bump_data_version(engine)
+    data_version.refresh(engine)
+
+    assert data_version.current == 1
+    assert peer_stats.percentiles("ID05")["endpoints"]["positive_score"] == 100.0
@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import select
+
+from app.database_setup import Company, Endpoint, Session
+from app.query_budget import QueryBudget, QueryBudgetExceeded
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app(QUERY_BUDGETS={"n_plus_one": 10}, QUERY_BUDGET_MAX_REPEATS=2)
+    session = Session()
+    try:
+        for i in range(5):
+            session.add(Company(instrumentid=f"ID{i}", name=f"Company {i}"))
+            session.add(Endpoint(instrumentid=f"ID{i}", positive_score=i / 10))
+        session.commit()
+    finally:
+        session.close()
+    return app
+
+
+def _scores_one_by_one():
+    session = Session()
+    try:
+        ids = session.scalars(select(Company.instrumentid)).all()
+        return [session.get(Endpoint, instrumentid).positive_score for instrumentid in ids]
+    finally:
+        session.close()
+
+
+def test_budget_raises_on_n_plus_one(app):
+    with pytest.raises(QueryBudgetExceeded, match="repeated 5x"):
+        with QueryBudget(max_statements=10, max_repeats=2, mode="raise"):
+            _scores_one_by_one()
+
+
+def test_budget_allows_batched_query(app):
+    with QueryBudget(max_statements=1, max_repeats=1, mode="raise") as budget:
+        session = Session()
+        try:
+            session.execute(select(Company.instrumentid, Endpoint.positive_score).join(
+                Endpoint, Endpoint.instrumentid == Company.instrumentid
+            )).all()
+        finally:
+            session.close()
+    assert budget.count == 1
+
+
+def test_route_budget_raises_in_raise_mode(app):
+    app.add_url_rule("/n-plus-one", "n_plus_one", lambda: {"scores": _scores_one_by_one()})
+
+    assert app.config["QUERY_BUDGET_MODE"] == "raise"
+    with pytest.raises(QueryBudgetExceeded, match="n_plus_one"):
+        app.test_client().get("/n-plus-one")
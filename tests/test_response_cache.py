@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import update
+
+from app.data_version import bump_data_version, data_version
+from app.database_setup import Base, Company, get_engine
+from app.descriptions import description_worker
+from app.response_cache import company_page_cache
+
+
+@pytest.fixture
+def app(seed, make_app):
+    seed("companies", [{"instrumentid": "ID01", "name": "Alpha", "description": "Written by hand."}])
+    seed("endpoints", [{
+        "instrumentid": "ID01", "damage_to_marine_species": 0.1, "damage_to_freshwater_species": 0.2,
+        "damage_to_terrestrial_species": 0.3, "avg_score": 0.2, "positive_score": 0.8,
+    }])
+    seed("midpoints", [{
+        column.key: 1.0 if column.key != "instrumentid" else "ID01"
+        for column in Base.metadata.tables["midpoints"].columns
+    }])
+    return make_app(RESPONSE_CACHE_BACKEND="memory")
+
+
+def test_conditional_get_answers_304(app):
+    client = app.test_client()
+
+    first = client.get("/company/ID01")
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert b"Written by hand." in first.data
+
+    again = client.get("/company/ID01", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+    stale = client.get("/company/ID01", headers={"If-None-Match": '"not-the-etag"'})
+    assert stale.status_code == 200
+
+
+def test_data_version_change_changes_the_etag(app):
+    client = app.test_client()
+    etag = client.get("/company/ID01").headers["ETag"]
+
+    engine = get_engine()
+    bump_data_version(engine)
+    data_version.refresh(engine)
+
+    response = client.get("/company/ID01", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_stored_description_invalidates_the_page(app):
+    client = app.test_client()
+    etag = client.get("/company/ID01").headers["ETag"]
+
+    # Cleared behind the cache's back: the cached page is still served
+    with get_engine().begin() as conn:
+        conn.execute(update(Company).where(Company.instrumentid == "ID01").values(description=None))
+    assert client.get("/company/ID01").headers["ETag"] == etag
+
+    description_worker.request("ID01", "Alpha").result(timeout=5)
+
+    response = client.get("/company/ID01", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert b"Alpha is a company. (Stub description.)" in response.data
+
+
+def test_invalidation_is_registered_once(make_app):
+    make_app()
+    make_app()
+
+    assert description_worker._listeners.count(company_page_cache.invalidate_company) == 1
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from app.functions import ENDPOINT_IMPACT_COLUMNS
+from app.impact_store import ENDPOINT_COLUMNS
+from app.scenarios import evaluate_scenarios, scenario_count
+
+
+def evaluate_by_hand(allocations, endpoints, found):
+    """Scenario totals computed one scenario and one asset at a time."""
+    damage_columns = [ENDPOINT_COLUMNS.index(name) for name in ENDPOINT_IMPACT_COLUMNS]
+    score_column = ENDPOINT_COLUMNS.index("positive_score")
+    results = []
+    for allocation in allocations:
+        damages = [0.0] * len(damage_columns)
+        weighted_score = scored = matched = 0.0
+        for value, row, is_found in zip(allocation, endpoints, found):
+            if not is_found:
+                continue
+            matched += value
+            for i, column in enumerate(damage_columns):
+                if not np.isnan(row[column]):
+                    damages[i] += value * row[column]
+            if not np.isnan(row[score_column]):
+                weighted_score += value * row[score_column]
+                scored += value
+        results.append({
+            "damages": damages,
+            "total_damage": sum(damages),
+            "positive_score": weighted_score / scored if scored else np.nan,
+            "allocation": sum(allocation),
+            "coverage": matched / sum(allocation) if sum(allocation) else np.nan,
+        })
+    return results
+
+
+def test_evaluate_scenarios_matches_a_loop():
+    rng = np.random.default_rng(7)
+    assets = 12
+    endpoints = rng.random((assets, len(ENDPOINT_COLUMNS)))
+    endpoints[2, :] = np.nan
+    endpoints[5, ENDPOINT_COLUMNS.index("positive_score")] = np.nan
+    endpoints[8, ENDPOINT_COLUMNS.index(next(iter(ENDPOINT_IMPACT_COLUMNS)))] = np.nan
+    found = ~np.isnan(endpoints).all(axis=1)
+    allocations = rng.random((6, assets)) * 100
+    allocations[3, :] = 0.0
+    allocations[4, found] = 0.0
+
+    evaluation = evaluate_scenarios(allocations, endpoints, found)
+
+    for i, expected in enumerate(evaluate_by_hand(allocations, endpoints, found)):
+        for key in ("total_damage", "positive_score", "allocation", "coverage"):
+            assert evaluation[key][i] == pytest.approx(expected[key], nan_ok=True)
+        assert evaluation["damages"][i].tolist() == pytest.approx(expected["damages"])
+
+
+def test_scenario_count():
+    rules = [
+        {"rule": "shift_worst_to_best", "fractions": [0.1, "0.2"]},
+        {"rule": "shift_worst_to_best", "steps": 5, "max_fraction": 0.5},
+    ]
+    assert scenario_count(rules) == 8
+
+
+@pytest.mark.parametrize("rules", [
+    ["shift_worst_to_best"],
+    {"rule": "shift_worst_to_best"},
+    [{"rule": "shift_worst_to_best", "quantile": "tenth"}],
+    [{"rule": "shift_worst_to_best", "quantile": None}],
+    [{"rule": "shift_worst_to_best", "steps": [3]}],
+    [{"rule": "shift_worst_to_best", "steps": True}],
+    [{"rule": "shift_worst_to_best", "max_fraction": {}}],
+    [{"rule": "shift_worst_to_best", "fractions": [0.1, None]}],
+    [{"rule": "shift_worst_to_best", "fractions": "0.1"}],
+    [{"rule": "unknown"}],
+])
+def test_malformed_rules_are_rejected(make_app, rules):
+    client = make_app().test_client()
+
+    response = client.post("/portfolio/scenarios", json={
+        "portfolio": [{"instrumentid": "A", "allocation": 1.0}, {"instrumentid": "B", "allocation": 2.0}],
+        "rules": rules,
+    })
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,62 @@
+import pytest
+from sqlalchemy import delete, insert, update
+
+from app.database_setup import Company, Session, get_engine
+from app.search import search, search_backend
+
+
+@pytest.fixture
+def app(seed, make_app):
+    seed("companies", [
+        {"instrumentid": "X4", "name": "Acme Industries Big"},
+        {"instrumentid": "X3", "name": "Big Acme Corp"},
+        {"instrumentid": "X2", "name": "Acme Holdings"},
+        {"instrumentid": "X1", "name": "Acme"},
+        {"instrumentid": "ACME", "name": "Zeta"},
+        {"instrumentid": "W1", "name": "Big Widget Co"},
+        {"instrumentid": "W2", "name": "Widgat Corp"},
+        {"instrumentid": "W3", "name": "Gizmo Shop"},
+    ])
+    return make_app()
+
+
+def _ids(query, limit=10):
+    session = Session()
+    try:
+        return [row.instrumentid for row in search(session, query, limit=limit)]
+    finally:
+        session.close()
+
+
+def test_uses_the_fts_index(app):
+    assert search_backend(get_engine()) == "sqlite"
+
+
+def test_tiers_exact_prefix_substring(app):
+    # Exact id, exact name, prefixes, then substrings
+    ids = _ids("acme")
+    assert ids[:2] == ["ACME", "X1"]
+    assert set(ids[2:4]) == {"X2", "X4"}
+    assert ids[4:] == ["X3"]
+    assert _ids("ACME", limit=2) == ["ACME", "X1"]
+
+
+def test_fuzzy_matches_come_last(app):
+    # "Widgat" shares half of the trigrams of "widget", "Gizmo" none
+    assert _ids("widget") == ["W1", "W2"]
+
+
+def test_index_follows_inserts_updates_and_deletes(app):
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.execute(insert(Company).values(instrumentid="N1", name="Newco Labs"))
+    assert _ids("newco") == ["N1"]
+
+    with engine.begin() as conn:
+        conn.execute(update(Company).where(Company.instrumentid == "N1").values(name="Renamed Labs"))
+    assert _ids("newco") == []
+    assert _ids("renamed") == ["N1"]
+
+    with engine.begin() as conn:
+        conn.execute(delete(Company).where(Company.instrumentid == "N1"))
+    assert _ids("renamed") == []
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from sqlalchemy import update
+
+from app.data_version import bump_data_version, data_version
+from app.database_setup import Endpoint, get_engine
+from app.similarity import SimilarityIndex
+
+
+def brute_force(vectors, scores, query, k, better_only):
+    distances = np.sqrt(((vectors - vectors[query]) ** 2).sum(axis=1))
+    allowed = np.arange(len(vectors)) != query
+    if better_only:
+        allowed &= scores > scores[query]
+    candidates = [row for row in np.argsort(distances, kind="stable") if allowed[row]][:k]
+    return candidates, distances[candidates]
+
+
+@pytest.fixture
+def index():
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(60, 5)).astype(np.float32)
+    scores = rng.uniform(size=60)
+    scores[[3, 17]] = np.nan
+    return SimilarityIndex(np.array([f"ID{i:02d}" for i in range(60)], dtype=object), vectors, scores)
+
+
+@pytest.mark.parametrize("better_only", [False, True])
+@pytest.mark.parametrize("k", [1, 5, 59, 100])
+def test_search_matches_brute_force(index, k, better_only):
+    queries = [0, 3, 17, 42, 59]
+    # A tiny block size forces several blocks and merges of the running top k
+    rows, distances = index.search(queries, k, better_only=better_only, block_cells=40)
+
+    assert rows.shape == distances.shape == (len(queries), min(k, len(index) - 1))
+    for query, found, found_distances in zip(queries, rows, distances):
+        expected, expected_distances = brute_force(index.vectors, index.scores, query, k, better_only)
+        hits = found[found >= 0]
+        assert query not in hits
+        assert hits.tolist() == list(expected)
+        np.testing.assert_allclose(found_distances[:len(hits)], expected_distances, rtol=1e-4, atol=1e-4)
+        # Missing neighbours (e.g. too few better companies) are padded
+        assert np.isinf(found_distances[len(hits):]).all()
+
+
+def test_search_without_neighbours(index):
+    single = SimilarityIndex(index.ids[:1], index.vectors[:1], index.scores[:1])
+    rows, distances = single.search([0], 10)
+    assert rows.shape == distances.shape == (1, 0)
+
+
+def test_similar_companies_follow_a_data_version_change(seed, make_app):
+    ids = [f"ID{i:02d}" for i in range(12)]
+    seed("companies", [{"instrumentid": asset, "name": f"Company {asset}"} for asset in ids])
+    seed("endpoints", [
+        {"instrumentid": asset, "damage_to_marine_species": i, "damage_to_freshwater_species": i % 3,
+         "damage_to_terrestrial_species": i % 5, "positive_score": i / 60}
+        for i, asset in enumerate(ids)
+    ])
+    seed("midpoints", [{"instrumentid": asset, "water_use": i} for i, asset in enumerate(ids)])
+    client = make_app().test_client()
+    assert client.get("/company/ID05/similar").get_json()["positive_score"] == pytest.approx(100 * 5 / 60)
+
+    engine = get_engine()
+    with engine.begin() as conn:
+        conn.execute(update(Endpoint).where(Endpoint.instrumentid == "ID05").values(positive_score=0.99))
+    bump_data_version(engine)
+    data_version.refresh(engine)
+
+    assert client.get("/company/ID05/similar").get_json()["positive_score"] == pytest.approx(99)
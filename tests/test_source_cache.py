@@ -0,0 +1,37 @@
+import pandas as pd
+import pytest
+
+from app.source_cache import ParquetCache
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "companies.csv"
+    pd.DataFrame({"instrumentid": [f"ID{i:03d}" for i in range(10)], "value": range(10)}).to_csv(path, index=False)
+    return str(path)
+
+
+def test_iter_csv_streams_miss_and_hit(tmp_path, source):
+    cache = ParquetCache(str(tmp_path / "cache"))
+
+    missed = list(cache.iter_csv(source, 4))
+    assert cache.get(source) is not None
+    hit = list(cache.iter_csv(source, 4))
+
+    for chunks in (missed, hit):
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+        frame = pd.concat(chunks, ignore_index=True)
+        assert frame["instrumentid"].tolist() == [f"ID{i:03d}" for i in range(10)]
+        assert frame["value"].tolist() == list(range(10))
+
+
+def test_iter_csv_partial_read_is_not_cached(tmp_path, source):
+    cache = ParquetCache(str(tmp_path / "cache"))
+
+    chunks = cache.iter_csv(source, 4)
+    next(chunks)
+    chunks.close()
+
+    assert cache.get(source) is None
@@ -0,0 +1,85 @@
+from sqlalchemy import insert
+
+from app.database_setup import Company, get_engine
+from app.typeahead import PrefixIndex, Typeahead, normalize, typeahead
+
+COMPANIES = [
+    ("ALP1", "Beta Alpine Holdings"),
+    ("BET2", "Alpha Corp"),
+    ("ALPHA9", "Zeta Industries"),
+    ("ZZZ3", "Société Générale"),
+    ("ZZZ4", "Alpha-Beta Partners"),
+]
+
+
+def _ids(results):
+    return [item["instrumentid"] for item in results]
+
+
+def test_normalize():
+    assert normalize("  Société--Générale, S.A. ") == "societe generale s a"
+    assert normalize(None) == ""
+
+
+def test_ids_then_names_then_words():
+    index = PrefixIndex(COMPANIES)
+
+    # Instrumentid matches first, then full names in order, then later name words
+    assert _ids(index.lookup("alp")) == ["ALP1", "ALPHA9", "ZZZ4", "BET2"]
+    assert _ids(index.lookup("beta")) == ["ALP1", "ZZZ4"]
+    assert _ids(index.lookup("corp")) == ["BET2"]
+    assert _ids(index.lookup("SOCIETE gen")) == ["ZZZ3"]
+    assert _ids(index.lookup("generale")) == ["ZZZ3"]
+
+
+def test_limit_and_no_match():
+    index = PrefixIndex(COMPANIES)
+
+    assert _ids(index.lookup("alp", limit=2)) == ["ALP1", "ALPHA9"]
+    assert index.lookup("omega") == []
+    assert index.lookup(" -- ") == []
+
+
+def test_lookups_are_cached_until_invalidated():
+    calls = []
+
+    class Counting(Typeahead):
+        def _build(self):
+            calls.append(1)
+            return PrefixIndex(COMPANIES[: len(calls) + 2])
+
+    cache = Counting()
+    assert _ids(cache.lookup("zzz")) == []
+    assert cache.lookup("zzz") is cache.lookup("ZZZ")
+    assert len(calls) == 1
+
+    cache.invalidate()
+
+    assert _ids(cache.lookup("zzz")) == ["ZZZ3"]
+    assert len(calls) == 2
+
+
+def test_stale_index_is_rebuilt(monkeypatch):
+    cache = Typeahead(max_age=60)
+    monkeypatch.setattr(cache, "_build", lambda: PrefixIndex(COMPANIES))
+    first = cache.index()
+    assert cache.index() is first
+
+    first.built_at -= 61
+
+    assert cache.index() is not first
+
+
+def test_new_companies_appear_after_a_rebuild(seed, make_app):
+    seed("companies", [{"instrumentid": "ID01", "name": "Alpha"}])
+    client = make_app().test_client()
+    assert _ids(client.get("/company/typeahead?q=alp").get_json()) == ["ID01"]
+
+    with get_engine().begin() as conn:
+        conn.execute(insert(Company).values(instrumentid="ID02", name="Alpine"))
+    assert _ids(client.get("/company/typeahead?q=alp").get_json()) == ["ID01"]
+
+    typeahead.invalidate()
+
+    assert _ids(client.get("/company/typeahead?q=alp").get_json()) == ["ID01", "ID02"]
+    assert client.get("/company/typeahead").status_code == 400
@@ -0,0 +1,74 @@
+import io
+
+import pandas as pd
+import pytest
+from werkzeug.datastructures import FileStorage
+
+from app.services import process_portfolio
+from app.uploads import iter_portfolio_frames, open_upload
+
+PORTFOLIO = pd.DataFrame({
+    "instrumentid": ["1", "2", "3", "4", "5"],
+    "name": ["A", "B", "C", "D", "E"],
+    "allocation": [0.1, 0.2, 0.3, 0.2, 0.2],
+    "ignored": [1, 2, 3, 4, 5],
+})
+
+
+def _file(frame, file_format):
+    stream = io.BytesIO()
+    if file_format == "csv":
+        frame.to_csv(stream, index=False)
+    elif file_format == "parquet":
+        frame.to_parquet(stream, index=False)
+    else:
+        frame.to_excel(stream, index=False)
+    stream.seek(0)
+    return stream
+
+
+@pytest.mark.parametrize("file_format, chunks", [("csv", [2, 2, 1]), ("parquet", [2, 2, 1]), ("xlsx", [5])])
+def test_frames_are_streamed(file_format, chunks):
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    frames = list(iter_portfolio_frames(_file(PORTFOLIO, file_format), file_format, chunk_rows=2))
+
+    assert [len(frame) for frame in frames] == chunks
+    frame = pd.concat(frames, ignore_index=True)
+    assert list(frame.columns) == ["instrumentid", "name", "allocation"]
+    assert frame["instrumentid"].tolist() == PORTFOLIO["instrumentid"].tolist()
+    assert frame["allocation"].tolist() == PORTFOLIO["allocation"].tolist()
+
+
+@pytest.mark.parametrize("file_format", ["csv", "parquet", "xlsx"])
+def test_numeric_ids_match_as_strings(seed, make_app, file_format):
+    if file_format == "parquet":
+        pytest.importorskip("pyarrow")
+    seed("endpoints", [
+        {"instrumentid": asset, "damage_to_marine_species": 0.1, "damage_to_freshwater_species": 0.2,
+         "damage_to_terrestrial_species": 0.3}
+        for asset in ("1", "2")
+    ])
+    app = make_app()
+    portfolio = pd.DataFrame({"instrumentid": [1, 2, 3], "allocation": [0.5, 0.25, 0.25]})
+
+    with app.app_context():
+        result = process_portfolio(FileStorage(_file(portfolio, file_format), filename=f"p.{file_format}"))
+
+    assert [asset["instrumentid"] for asset in result["assets"]] == ["1", "2"]
+    assert result["unmatched"] == ["3"]
+
+
+def test_upload_over_the_size_limit():
+    with pytest.raises(ValueError, match="too large"):
+        open_upload(FileStorage(io.BytesIO(b"x" * 100), filename="p.csv"), max_bytes=10)
+
+
+@pytest.mark.parametrize("path", ["/portfolio", "/portfolio/scenarios", "/auth/signup"])
+def test_request_body_over_the_limit_gets_json_413(make_app, path):
+    client = make_app(MAX_CONTENT_LENGTH=1000).test_client()
+
+    response = client.post(path, data={"file": (io.BytesIO(b"x" * 5000), "p.csv")})
+
+    assert response.status_code == 413
+    assert "too large" in response.get_json()["error"]